@@ -0,0 +1,73 @@
+"""
+Filter Engine
+Declarative row filters for a review funnel. A funnel is a list of named
+stages, each with zero or more predicates (functions from the frame to a
+boolean array). Every predicate sees the full, unfiltered frame and the
+results are AND-ed into one running mask, so no filtered copy is made
+until the caller applies a mask once. Surviving row counts are recorded
+per stage and wall time per predicate.
+
+    funnel = [
+        ("initial_search", []),
+        ("has_tasks", [has_tasks]),
+        ("available", [is_available, has_license]),
+    ]
+    result = run_funnel(data_df, funnel)
+    result.counts          # rows left after each stage
+    result.apply(data_df)  # rows passing every stage
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+
+class FunnelResult:
+    """
+    Outcome of running a funnel over a frame
+
+    `counts` holds the rows surviving each stage and `timings` the seconds
+    spent in each predicate, keyed by predicate name.
+    """
+
+    def __init__(self, index, masks, counts, timings):
+        self.index = index
+        self.masks = masks
+        self.counts = counts
+        self.timings = timings
+
+    def mask(self, stage=None):
+        """
+        Boolean array of the rows surviving `stage` (default: the last stage)
+        """
+        if stage is None:
+            stage = self.counts.index[-1]
+        return self.masks[stage]
+
+    def apply(self, frame, stage=None):
+        """
+        The rows of `frame` surviving `stage`, as a single selection
+        """
+        return frame.loc[self.mask(stage)]
+
+
+def run_funnel(frame, stages):
+    """
+    Evaluate (stage_name, [predicate, ...]) stages over `frame`
+
+    Predicates after the point where no rows are left are not evaluated.
+    """
+    mask = np.ones(len(frame), dtype=bool)
+    masks, counts, timings = {}, {}, {}
+    for stage_name, predicates in stages:
+        for predicate in predicates:
+            if not mask.any():
+                break
+            start = time.perf_counter()
+            mask &= np.asarray(predicate(frame), dtype=bool)
+            timings[predicate.__name__] = time.perf_counter() - start
+        masks[stage_name] = mask.copy()
+        counts[stage_name] = int(mask.sum())
+    return FunnelResult(frame.index, masks, pd.Series(counts, dtype=np.int64),
+                        pd.Series(timings, dtype=float))
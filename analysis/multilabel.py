@@ -0,0 +1,140 @@
+"""
+Multi-Label Encoding
+Multi-hot encoding for comma-separated label columns such as `tasks`,
+`platforms` and `annotation_style`. The strings are parsed once into a
+vocabulary and one bitmask per row, packed into uint64 words (one word per
+64 labels), so indicator columns, exclusions and label counts are numpy
+bit operations instead of per-row Python set logic. The packed words can
+be stored as frame columns (`bit_frame`) and read back with `from_frame`,
+so the labels are parsed and packed only once.
+"""
+
+import numpy as np
+import pandas as pd
+
+WORD_BITS = 64
+
+
+def _pack(matrix):
+    """
+    Pack an (n, k) boolean matrix into (n, ceil(k / 64)) little-endian uint64 words
+    """
+    n_rows, n_labels = matrix.shape
+    n_words = max(1, -(-n_labels // WORD_BITS))
+    padded = np.zeros((n_rows, n_words * WORD_BITS), dtype=bool)
+    padded[:, :n_labels] = matrix
+    return np.packbits(padded, axis=1, bitorder="little").view("<u8")
+
+
+class MultiHot:
+    """
+    Row-aligned label sets as bitmasks over a sorted vocabulary
+
+    Rows with a missing value have no labels.
+    """
+
+    def __init__(self, vocabulary, bits, index=None):
+        self.vocabulary = list(vocabulary)
+        self.bits = bits
+        self.index = index if index is not None else pd.RangeIndex(len(bits))
+        self._codes = {label: code for code, label in enumerate(self.vocabulary)}
+
+    @classmethod
+    def from_strings(cls, values, sep=", ", vocabulary=None):
+        """
+        Parse a Series of separated label strings (NaN for none)
+
+        Labels outside a given `vocabulary` are ignored; by default the
+        vocabulary is every label that occurs, sorted.
+        """
+        values = pd.Series(values)
+        labels = values.reset_index(drop=True).str.split(sep).explode()
+        labels = labels[labels.notna() & (labels != "")]
+        if vocabulary is None:
+            vocabulary = sorted(labels.unique())
+        codes = pd.Categorical(labels, categories=vocabulary).codes
+        known = codes >= 0
+
+        matrix = np.zeros((len(values), len(vocabulary)), dtype=bool)
+        matrix[labels.index.to_numpy()[known], codes[known]] = True
+        return cls(vocabulary, _pack(matrix), values.index)
+
+    @classmethod
+    def from_frame(cls, frame, prefix):
+        """
+        The encoding stored in a frame by `bit_frame` and `indicator_frame`
+
+        The bitmask is read from the `<prefix>#<word>` columns as stored,
+        without re-packing; the vocabulary is the order of the
+        `<prefix>=<label>` indicator columns.
+        """
+        columns = [c for c in frame.columns if isinstance(c, str)]
+        vocabulary = [c[len(prefix) + 1:] for c in columns if c.startswith(f"{prefix}=")]
+        words = [c for c in columns if c.startswith(f"{prefix}#")]
+        return cls(vocabulary, frame[words].to_numpy(dtype="<u8"), frame.index)
+
+    def __len__(self):
+        return len(self.bits)
+
+    def mask(self, labels):
+        """
+        Word mask selecting the given labels (unknown labels are ignored)
+        """
+        mask = np.zeros(self.bits.shape[1], dtype="<u8")
+        for label in labels:
+            code = self._codes.get(label)
+            if code is not None:
+                mask[code // WORD_BITS] |= np.uint64(1) << np.uint64(code % WORD_BITS)
+        return mask
+
+    def any_of(self, labels):
+        """
+        Boolean array: rows carrying at least one of `labels`
+        """
+        return (self.bits & self.mask(labels)).any(axis=1)
+
+    def without(self, labels):
+        """
+        Copy with `labels` cleared from every row
+        """
+        return MultiHot(self.vocabulary, self.bits & ~self.mask(labels), self.index)
+
+    def take(self, rows):
+        """
+        Subset by boolean mask or positions
+        """
+        return MultiHot(self.vocabulary, self.bits[rows], self.index[rows])
+
+    def to_matrix(self):
+        """
+        Unpack into an (n, len(vocabulary)) boolean matrix
+        """
+        unpacked = np.unpackbits(self.bits.view(np.uint8), axis=1, bitorder="little")
+        return unpacked[:, :len(self.vocabulary)].astype(bool)
+
+    def indicator_frame(self, prefix):
+        """
+        One boolean `<prefix>=<label>` column per vocabulary label
+        """
+        return pd.DataFrame(self.to_matrix(), index=self.index,
+                            columns=[f"{prefix}={label}" for label in self.vocabulary])
+
+    def bit_frame(self, prefix):
+        """
+        The packed bitmask as uint64 `<prefix>#<word>` columns, one per 64 labels
+        """
+        return pd.DataFrame(self.bits, index=self.index,
+                            columns=[f"{prefix}#{word}" for word in range(self.bits.shape[1])])
+
+    def counts(self):
+        """
+        Number of rows carrying each label, in vocabulary order
+        """
+        return pd.Series(self.to_matrix().sum(axis=0, dtype=np.int64), index=self.vocabulary)
+
+    def to_lists(self):
+        """
+        Each row's labels as a list, in vocabulary order
+        """
+        matrix = self.to_matrix()
+        return [[self.vocabulary[j] for j in np.flatnonzero(row)] for row in matrix]
@@ -1,21 +1,52 @@
+"""
+Dataset Review Statistics
+Summary statistics, the review table and the search funnel plot for the
+datasets considered in the CLPsych review. Run from the repository root:
+
+    python analysis/statistics.py
+
+The work is split into stage functions (load -> sizes -> features ->
+filtering funnel -> distributions / LaTeX table). Each stage's output is
+cached on disk under a key hashed from its input and its own code, so a
+change to a late stage, e.g. the LaTeX table, reuses the parsed and
+expanded frames. Stages can also be used on their own:
+
+    from analysis.statistics import run_analysis
+    results = run_analysis()
+    results["filter_counts"]
+"""
+
 ###################
 ### Globals
 ###################
 
 DATA_DIR = "./supplemental_data/"
 PLOT_DIR = "./logs/"
+CACHE_DIR = "./.analysis_cache/"
 
 ###################
 ### Imports
 ###################
 
 ## Standard Libraries
+import argparse
+import glob
+import hashlib
+import inspect
+import os
 from datetime import datetime
 
 ## External Libraries
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+
+## Local
+try:
+    from filter_engine import FunnelResult, run_funnel
+    from multilabel import MultiHot
+except ImportError:  # imported as analysis.statistics
+    from analysis.filter_engine import FunnelResult, run_funnel
+    from analysis.multilabel import MultiHot
 
 ###################
 ### Helper Functions
@@ -24,36 +55,6 @@ import matplotlib.pyplot as plt
 ## Flatten
 flatten = lambda l: [item for sublist in l for item in sublist]
 
-## Union of Sets
-set_union = lambda s: sorted(list(set.union(*[i for i in s if isinstance(i, set)])))
-
-def format_float(num):
-    num = num.replace("(","").replace(")","")
-    mult = 1.0
-    if num.endswith("k"):
-        num = num[:-1]
-        mult = 1000.0
-    num = float(num) * mult
-    return num
-    
-def process_size(size):
-    if pd.isnull(size):
-        return np.nan
-    if size == "na":
-        return "N/A"
-    sizes = size.split(", ")
-    sizes = [s.split() for s in sizes]
-    sizes = dict((x, format_float(y)) for x, y in sizes)
-    return sizes
-
-def process_tasks(tasks):
-    if pd.isnull(tasks):
-        return np.nan
-    if tasks == "na":
-        return "N/A"
-    tasks = set(tasks.split(", "))
-    return tasks
-
 def process_availability(availability):
     if pd.isnull(availability):
         return "Unknown"
@@ -74,20 +75,6 @@ def process_availability(availability):
     else:
         raise ValueError("Encountered unaccounted availability")
 
-def process_platforms(platforms):
-    if pd.isnull(platforms):
-        return np.nan
-    platforms = set(platforms.split(", "))
-    return platforms
-
-def process_annotation_style(style):
-    if pd.isnull(style):
-        return np.nan
-    if style == "na":
-        return "N/A"
-    style = set(style.split(", "))
-    return style
-
 def process_sources(sources):
     sources = str(sources)
     sources = sources.split(", ")
@@ -168,98 +155,126 @@ def get_clean_reference(row):
         reference = reference.format(authors, year)
     return reference
 
-def sum_relevant_sizes(size_dict):
-    acceptable_keys = ["combined",
-                       "control",
-                       "depression",
-                       "depression_(low-mild)",
-                       "depression_(high)",
-                       "mental_health_(combined)",
-                       "increase_activity",
-                       "constant_activity",
-                       "decrease_activity",
-                       "suicide_(ideation)",
-                       "suicide_(attempt)"]
-    if pd.isnull(size_dict):
-        return np.nan
-    if isinstance(size_dict, str):
-        return np.nan
-    total = 0
-    for a in acceptable_keys:
-        if a in size_dict:
-            total += size_dict[a]
-    return total
-
-def sum_all_sizes(size_dict):
-    if pd.isnull(size_dict):
-        return np.nan
-    if isinstance(size_dict, str):
-        return np.nan
-    total = 0
-    for x, y in size_dict.items():
-        total += y
-    return total
-
-
 ###################
-### Load/Format Dataset
+### Sizes
 ###################
 
-## Load Dataset
-data_df = pd.read_excel(f"{DATA_DIR}data_sources_standardized.xlsx")
-
-## Format Sizes
+## Size columns hold entries like "depression (1.2k), control (3000)"
 size_cols = ["n_documents","n_individuals","n_conversations"]
-for sc in size_cols:
-    data_df[sc] = data_df[sc].map(process_size)
-    data_df[f"{sc}_relevant_total"] = data_df[sc].map(sum_relevant_sizes)
-    data_df[f"{sc}_total"] = data_df[sc].map(sum_all_sizes)
-
-## Format Tasks + Indicator Columns (vectorized)
-data_df["tasks"] = data_df["tasks"].map(process_tasks)
-unique_tasks = set_union(data_df["tasks"])
-task_indicators = {f"task={t}": data_df["tasks"].apply(lambda s: t in s if isinstance(s, set) else False) for t in unique_tasks}
-data_df = pd.concat([data_df, pd.DataFrame(task_indicators, index=data_df.index)], axis=1)
-
-## Process Availability
-data_df["availability"] = data_df["availability"].map(process_availability)
-
-## Process Platforms + Indicator Columns (vectorized)
-data_df["platforms"] = data_df["platforms"].map(process_platforms)
-unique_platforms = set_union(data_df["platforms"])
-platform_indicators = {f"platform={p}": data_df["platforms"].apply(lambda s: p in s if isinstance(s, set) else False) for p in unique_platforms}
-data_df = pd.concat([data_df, pd.DataFrame(platform_indicators, index=data_df.index)], axis=1)
-
-## Process Annotation Style + Indicator Columns (vectorized)
-data_df["annotation_style"] = data_df["annotation_style"].map(process_annotation_style)
-unique_annot_styles = set_union(data_df["annotation_style"])
-annot_indicators = {f"annotation={a}": data_df["annotation_style"].apply(lambda s: a in s if isinstance(s, set) else False) for a in unique_annot_styles}
-data_df = pd.concat([data_df, pd.DataFrame(annot_indicators, index=data_df.index)], axis=1)
-
-## Process Sources + Vectorized Original Source Check
-data_df["source_ids"] = data_df["source_ids"].map(process_sources)
-data_df["contains_original_source"] = data_df["paper_id"].isin(data_df["source_ids"].explode()).values
-
-## Process Primary Language
-data_df["primary_language"] = data_df["primary_language"].str.title()
-
-## Year Filter 
-data_df = data_df.loc[data_df["year"] < 2020].reset_index(drop=True).copy()
+
+## One entry: a label without spaces, then a count, optionally in parentheses and/or thousands
+SIZE_ENTRY = r"(?P<label>[^\s,]+)\s+\(?(?P<count>\d+(?:\.\d+)?)(?P<thousands>k)?\)?"
+SIZE_LIST = r"[^\s,]+\s+\(?\d+(?:\.\d+)?k?\)?(?:, [^\s,]+\s+\(?\d+(?:\.\d+)?k?\)?)*"
+
+## Labels counted towards the relevant size total
+relevant_size_labels = ["combined",
+                        "control",
+                        "depression",
+                        "depression_(low-mild)",
+                        "depression_(high)",
+                        "mental_health_(combined)",
+                        "increase_activity",
+                        "constant_activity",
+                        "decrease_activity",
+                        "suicide_(ideation)",
+                        "suicide_(attempt)"]
+
+def parse_size_column(values):
+    """
+    Parse one size column into a long-form (row, label, count) table
+
+    Returns (sizes, malformed): `malformed` holds the values, other than
+    missing and "na", that are not a list of size entries. They are left
+    out of `sizes` instead of stopping the run. When a label repeats within
+    a value, its last count is kept.
+    """
+    text = values.astype("string").str.strip()
+    present = text.notna() & (text != "na")
+    valid = present & text.str.fullmatch(SIZE_LIST).fillna(False).astype(bool)
+
+    matches = text[valid].str.extractall(SIZE_ENTRY)
+    scale = np.where(matches["thousands"].notna(), 1000.0, 1.0)
+    sizes = pd.DataFrame({
+        "row": matches.index.get_level_values(0),
+        "label": matches["label"].to_numpy(dtype=object),
+        "count": matches["count"].astype(float).to_numpy() * scale,
+    })
+    sizes = sizes.drop_duplicates(["row", "label"], keep="last").reset_index(drop=True)
+    return sizes, values[present & ~valid]
+
+def size_totals(sizes, index):
+    """
+    Relevant and overall totals per row of a long-form size table; rows
+    without parsed sizes get NaN
+    """
+    totals = sizes.groupby("row")["count"].sum()
+    relevant = sizes.loc[sizes["label"].isin(relevant_size_labels)].groupby("row")["count"].sum()
+    relevant = relevant.reindex(totals.index, fill_value=0.0)
+    return relevant.reindex(index), totals.reindex(index)
 
 ###################
-### Initial Filtering
+### Stage Cache
 ###################
 
-filter_counts = dict()
-
-## Isolate Unique Datasets (139 -> 111)
-filter_counts["initial_search"] = len(data_df)
-data_df = data_df.loc[data_df["contains_original_source"]]
-filter_counts["unique_datasets_only"] = len(data_df)
+def stage(*dependencies):
+    """
+    Mark a function as a cacheable pipeline stage
+
+    `dependencies` are the helper functions and constants the stage uses;
+    their source (or value) is part of the stage's cache key.
+    """
+    def decorate(func):
+        func.dependencies = dependencies
+        return func
+    return decorate
+
+def _source(obj):
+    if callable(obj):
+        return inspect.getsource(obj)
+    if isinstance(obj, (set, frozenset)):
+        return repr(sorted(obj))
+    if isinstance(obj, (list, tuple)):
+        return "[" + ", ".join(map(_source, obj)) + "]"
+    return repr(obj)
+
+def file_fingerprint(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def stage_key(func, input_key):
+    """
+    Cache key for a stage's output: its input's key plus its own code
+    """
+    digest = hashlib.sha256()
+    for part in (input_key, func.__name__, _source(func), *map(_source, func.dependencies)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:20]
+
+def run_stage(func, input_key, *args, cache_dir=CACHE_DIR, use_cache=True):
+    """
+    Run a stage, or load its output from the cache; return (output, key)
+
+    The returned key is the input key for the stages that consume the output.
+    """
+    key = stage_key(func, input_key)
+    path = os.path.join(cache_dir, f"{func.__name__}-{key}.pkl")
+    if use_cache and os.path.exists(path):
+        return pd.read_pickle(path), key
+
+    output = func(*args)
+    if use_cache:
+        os.makedirs(cache_dir, exist_ok=True)
+        # Only the latest output of each stage is kept
+        for stale in glob.glob(os.path.join(cache_dir, f"{func.__name__}-*.pkl")):
+            os.remove(stale)
+        pd.to_pickle(output, path + ".tmp")
+        os.replace(path + ".tmp", path)
+    return output, key
 
-## Filter Out Tasks that lack annotation
-data_df = data_df.loc[~data_df.tasks.isnull()]
-data_df = data_df.loc[data_df.tasks != "N/A"]
+###################
+### Filter Criteria
+###################
 
 ## Platforms to Ignore
 filter_platforms = set(["ehr",
@@ -269,8 +284,6 @@ filter_platforms = set(["ehr",
                         "phone",
                         'ecological_momentary_assessments',
                         "essays"])
-data_df = data_df.loc[~data_df["platforms"].map(lambda i: isinstance(i, set) and any(p in filter_platforms for p in i))]
-data_df["platforms"] = data_df["platforms"].map(lambda i: set(j for j in i if j not in filter_platforms) if isinstance(i, set) else i)
 
 ## Tasks to Ignore
 filter_tasks = set(["counseling_outcome",
@@ -285,121 +298,342 @@ filter_tasks = set(["counseling_outcome",
                     "ehr_categories",
                     "life_satisfaction",
                     "relationships"])
-data_df = data_df.loc[~data_df["tasks"].map(lambda i: isinstance(i, set) and any(p in filter_tasks for p in i))]
-data_df["tasks"] = data_df["tasks"].map(lambda i: set(j for j in i if j not in filter_tasks) if isinstance(i, set) else i)
-filter_counts["apply_exclusion_criteria"] = len(data_df)
+
+clinical_annots = ["clinical_diagnoses","survey_(clinical)"]
+
+acceptable_availability = set([
+    "Available (Signed Agreement)",
+    "Available (Reproducible via API)",
+    "Available (Author Discretion)",
+    "Available (No Restrictions)"])
 
 ###################
-### Preliminary Analysis
+### Load/Format Dataset
 ###################
 
-unique_platforms_filtered = [p for p in set_union(data_df["platforms"]) if p not in filter_platforms]
-unique_tasks_filtered = [p for p in set_union(data_df["tasks"]) if p not in filter_tasks]
-unique_annot_styles_filtered = set_union(data_df["annotation_style"])
+@stage()
+def load_dataset(path):
+    """
+    Parse the standardized data sources workbook
+    """
+    return pd.read_excel(path)
+
+@stage(size_cols, SIZE_ENTRY, SIZE_LIST, parse_size_column)
+def parse_sizes(data_df):
+    """
+    Long-form size table for all size columns; return (sizes, malformed)
+
+    `sizes` has one (row, column, label, count) record per size entry and
+    `malformed` one (row, column, value) record per unparseable value.
+    """
+    sizes, malformed = [], []
+    for sc in size_cols:
+        column_sizes, bad = parse_size_column(data_df[sc])
+        column_sizes.insert(1, "column", sc)
+        sizes.append(column_sizes)
+        malformed.append(pd.DataFrame({"row": bad.index, "column": sc, "value": bad.to_numpy(dtype=object)}))
+    return pd.concat(sizes, ignore_index=True), pd.concat(malformed, ignore_index=True)
+
+## Multi-label columns and the prefix of their indicator columns
+multi_label_columns = [("tasks", "task"), ("platforms", "platform"), ("annotation_style", "annotation")]
+
+@stage(size_cols, size_totals, relevant_size_labels, process_availability,
+       process_sources, multi_label_columns, MultiHot)
+def expand_features(data_df, sizes):
+    """
+    Parse sizes, tasks, platforms, annotation styles and sources into
+    usable columns (with indicator columns) and keep pre-2020 datasets
+
+    Size columns, tasks, platforms and annotation styles stay
+    comma-separated strings ("N/A" where not applicable). Size totals come
+    from the parse_sizes table; labels are multi-hot encoded in the
+    `task=`, `platform=` and `annotation=` indicator columns, and their
+    packed bitmasks kept in `task#`, `platform#` and `annotation#` uint64
+    columns for the later stages (MultiHot.from_frame).
+    """
+    data_df = data_df.copy()
+
+    ## Format Sizes
+    for sc in size_cols:
+        data_df[sc] = data_df[sc].replace("na", "N/A")
+        relevant, total = size_totals(sizes.loc[sizes["column"] == sc], data_df.index)
+        data_df[f"{sc}_relevant_total"] = relevant
+        data_df[f"{sc}_total"] = total
+
+    ## Process Availability
+    data_df["availability"] = data_df["availability"].map(process_availability)
+
+    ## Tasks, Platforms, Annotation Style + Indicator Columns (multi-hot)
+    data_df[["tasks", "annotation_style"]] = data_df[["tasks", "annotation_style"]].replace("na", "N/A")
+    indicators = []
+    for column, prefix in multi_label_columns:
+        labels = MultiHot.from_strings(data_df[column].where(data_df[column] != "N/A"))
+        indicators.append(labels.indicator_frame(prefix))
+        indicators.append(labels.bit_frame(prefix))
+    data_df = pd.concat([data_df, *indicators], axis=1)
+
+    ## Process Sources + Vectorized Original Source Check
+    data_df["source_ids"] = data_df["source_ids"].map(process_sources)
+    data_df["contains_original_source"] = data_df["paper_id"].isin(data_df["source_ids"].explode()).values
+
+    ## Process Primary Language
+    data_df["primary_language"] = data_df["primary_language"].str.title()
+
+    ## Year Filter 
+    data_df = data_df.loc[data_df["year"] < 2020].reset_index(drop=True).copy()
+    return data_df
 
-## Platform Distribution
-platform_distribution = data_df[[f"platform={p}" for p in unique_platforms_filtered]].sum().sort_values()
+###################
+### Filtering Funnel
+###################
 
-## Task Distribution
-task_distribution = data_df[[f"task={t}" for t in unique_tasks_filtered]].sum().sort_values()
+## Predicates: each keeps the rows that pass it
 
-## Annotation Distribution
-annot_dist = data_df[[f"annotation={a}" for a in unique_annot_styles_filtered]].sum().sort_values()
+def is_original_source(data_df):
+    """
+    Isolate unique datasets
+    """
+    return data_df["contains_original_source"]
 
-## Language Distribution
-language_dist = data_df.primary_language.value_counts()
+def has_task_annotation(data_df):
+    return data_df.tasks.notnull() & (data_df.tasks != "N/A")
 
-## Availability Distribution
-availability_dist = data_df.availability.value_counts()
-clinical_annots = ["clinical_diagnoses","survey_(clinical)"]
-clinical_availability = data_df.loc[data_df.annotation_style.map(lambda i: isinstance(i, set) and any(c in i for c in clinical_annots))][["title","tasks","primary_language","availability"]]
+def excludes_filtered_platforms(data_df):
+    return ~MultiHot.from_frame(data_df, "platform").any_of(filter_platforms)
 
-## Size Distribution
-document_annot_docs = data_df.loc[(data_df.annotation_level=="document")]["n_documents_total"].sort_values().dropna()
-document_annot_inds = data_df.loc[(data_df.annotation_level=="document")]["n_individuals_total"].sort_values().dropna()
-individual_annot_docs = data_df.loc[(data_df.annotation_level=="individual")]["n_documents_total"].sort_values().dropna()
-individual_annot_inds = data_df.loc[(data_df.annotation_level=="individual")]["n_individuals_total"].sort_values().dropna()
+def excludes_filtered_tasks(data_df):
+    return ~MultiHot.from_frame(data_df, "task").any_of(filter_tasks)
 
-###################
-### Stricter Filtering
-###################
+def has_known_availability(data_df):
+    return data_df["availability"] != "Unknown"
 
-acceptable_availability = set([
-    "Available (Signed Agreement)",
-    "Available (Reproducible via API)",
-    "Available (Author Discretion)",
-    "Available (No Restrictions)"])
+def is_available(data_df):
+    return data_df["availability"].isin(acceptable_availability)
+
+## Funnel stages, in order; the rows surviving each stage are plotted in search.pdf
+review_funnel = [
+    ("initial_search", []),
+    ("unique_datasets_only", [is_original_source]),
+    ("apply_exclusion_criteria", [has_task_annotation, excludes_filtered_platforms, excludes_filtered_tasks]),
+    ("known_availability", [has_known_availability]),
+    ("available", [is_available]),
+]
 
-filter_counts["known_availability"] = (data_df["availability"] != "Unknown").sum()
-data_df = data_df.loc[data_df["availability"].isin(acceptable_availability)]
-filter_counts["available"] = len(data_df)
+## Stage whose surviving datasets the preliminary analysis describes
+REVIEW_STAGE = "apply_exclusion_criteria"
 
-filter_counts = pd.Series(filter_counts)
+@stage(review_funnel, REVIEW_STAGE, filter_platforms, filter_tasks, acceptable_availability, MultiHot, run_funnel)
+def apply_filters(data_df, timings=None):
+    """
+    Run the review funnel; return (masks, counts)
+
+    `masks` has one boolean column per funnel stage and `counts` the rows
+    surviving each stage. Only these plain pandas objects are cached, so
+    the cache does not depend on how filter_engine was imported. The
+    per-predicate seconds of this run are added to `timings`, if given.
+    """
+    funnel = run_funnel(data_df, review_funnel)
+    if timings is not None:
+        timings.update(funnel.timings)
+    return pd.DataFrame(funnel.masks, index=data_df.index), funnel.counts
+
+###################
+### Preliminary Analysis
+###################
+
+def label_distribution(labels, prefix, exclude=()):
+    """
+    Counts of the labels present in `labels` (a MultiHot), as
+    `<prefix>=<label>` entries sorted by count
+    """
+    counts = labels.counts()
+    counts = counts[(counts > 0) & ~counts.index.isin(list(exclude))]
+    counts.index = [f"{prefix}={label}" for label in counts.index]
+    return counts.sort_values()
+
+@stage(label_distribution, filter_platforms, filter_tasks, clinical_annots, MultiHot)
+def compute_distributions(data_df):
+    """
+    Platform, task, annotation, language, availability and size
+    distributions of the datasets that meet the exclusion criteria
+    """
+    platforms = MultiHot.from_frame(data_df, "platform")
+    tasks = MultiHot.from_frame(data_df, "task")
+    annotations = MultiHot.from_frame(data_df, "annotation")
+
+    distributions = dict()
+
+    ## Platform Distribution
+    distributions["platform_distribution"] = label_distribution(platforms, "platform", filter_platforms)
+
+    ## Task Distribution
+    distributions["task_distribution"] = label_distribution(tasks, "task", filter_tasks)
+
+    ## Annotation Distribution
+    distributions["annot_dist"] = label_distribution(annotations, "annotation")
+
+    ## Language Distribution
+    distributions["language_dist"] = data_df.primary_language.value_counts()
+
+    ## Availability Distribution
+    distributions["availability_dist"] = data_df.availability.value_counts()
+    distributions["clinical_availability"] = data_df.loc[annotations.any_of(clinical_annots)][["title","tasks","primary_language","availability"]]
+
+    ## Size Distribution
+    document_level = data_df.annotation_level == "document"
+    individual_level = data_df.annotation_level == "individual"
+    distributions["document_annot_docs"] = data_df.loc[document_level]["n_documents_total"].sort_values().dropna()
+    distributions["document_annot_inds"] = data_df.loc[document_level]["n_individuals_total"].sort_values().dropna()
+    distributions["individual_annot_docs"] = data_df.loc[individual_level]["n_documents_total"].sort_values().dropna()
+    distributions["individual_annot_inds"] = data_df.loc[individual_level]["n_individuals_total"].sort_values().dropna()
+    return distributions
 
 ###################
 ### Figures (Tables)
 ###################
 
-latex_df = data_df[["title",
-                    "authors",
-                    "year",
-                    "platforms",
-                    "tasks",
-                    "annotation_level",
-                    "n_individuals_total",
-                    "n_documents_total",
-                    "availability"]].copy()
-
-latex_df["tasks"] = latex_df["tasks"].map(lambda x: set(i for i in x if i not in filter_tasks) if isinstance(x, set) else set()).map(get_clean_task_name).map(get_clean_task_abbr)
-latex_df["platforms"] = latex_df["platforms"].map(get_clean_platform_name)
-latex_df["availability"] = latex_df["availability"].map(get_clean_availability)
-latex_df["reference"] = latex_df.apply(get_clean_reference, axis=1)
-latex_df["reference"] = latex_df["title"] + " " + latex_df["reference"]
-latex_df["annotation_level"] = latex_df["annotation_level"].str.title().map(lambda i: i[:3] + ".")
-latex_df["n_individuals_total"] = latex_df["n_individuals_total"].map(lambda i: "{:,d}".format(int(i)) if pd.notna(i) else "")
-latex_df["n_documents_total"] = latex_df["n_documents_total"].map(lambda i: "{:,d}".format(int(i)) if pd.notna(i) else "")
-
-latex_df.sort_values("year", ascending=True, inplace=True)
-latex_df = latex_df[["reference", "platforms", "tasks", "annotation_level",
-                     "n_individuals_total", "n_documents_total", "availability"]].copy()
-latex_df.reset_index(drop=True, inplace=True)
-latex_df.rename(columns={
-    "reference": "Reference",
-    "platforms": "Platform(s)",
-    "tasks": "Task(s)",
-    "annotation_level": "Label Resolution",
-    "n_individuals_total": "# Individuals",
-    "n_documents_total": "# Documents",
-    "availability": "Availability"
-}, inplace=True)
-
-# Optional: Save table
-# latex_df.to_csv("final_table.csv", index=False)
-# print(latex_df.to_latex(index=False))
+@stage(get_clean_task_name, get_clean_task_abbr, get_clean_platform_name, get_clean_availability,
+       get_clean_reference, filter_tasks, MultiHot)
+def build_latex_table(data_df):
+    """
+    Review table of the available datasets, oldest first
+
+    Task and platform names are listed in alphabetical order.
+    """
+    latex_df = data_df[["title",
+                        "authors",
+                        "year",
+                        "platforms",
+                        "tasks",
+                        "annotation_level",
+                        "n_individuals_total",
+                        "n_documents_total",
+                        "availability"]].copy()
+
+    tasks = MultiHot.from_frame(data_df, "task").without(filter_tasks)
+    platforms = MultiHot.from_frame(data_df, "platform")
+    latex_df["tasks"] = pd.Series(tasks.to_lists(), index=latex_df.index).map(get_clean_task_name).map(get_clean_task_abbr)
+    latex_df["platforms"] = pd.Series(platforms.to_lists(), index=latex_df.index).map(get_clean_platform_name)
+    latex_df["availability"] = latex_df["availability"].map(get_clean_availability)
+    latex_df["reference"] = latex_df.apply(get_clean_reference, axis=1)
+    latex_df["reference"] = latex_df["title"] + " " + latex_df["reference"]
+    latex_df["annotation_level"] = latex_df["annotation_level"].str.title().map(lambda i: i[:3] + ".")
+    latex_df["n_individuals_total"] = latex_df["n_individuals_total"].map(lambda i: "{:,d}".format(int(i)) if pd.notna(i) else "")
+    latex_df["n_documents_total"] = latex_df["n_documents_total"].map(lambda i: "{:,d}".format(int(i)) if pd.notna(i) else "")
+
+    latex_df.sort_values("year", ascending=True, inplace=True)
+    latex_df = latex_df[["reference", "platforms", "tasks", "annotation_level",
+                         "n_individuals_total", "n_documents_total", "availability"]].copy()
+    latex_df.reset_index(drop=True, inplace=True)
+    latex_df.rename(columns={
+        "reference": "Reference",
+        "platforms": "Platform(s)",
+        "tasks": "Task(s)",
+        "annotation_level": "Label Resolution",
+        "n_individuals_total": "# Individuals",
+        "n_documents_total": "# Documents",
+        "availability": "Availability"
+    }, inplace=True)
+
+    # Optional: Save table
+    # latex_df.to_csv("final_table.csv", index=False)
+    # print(latex_df.to_latex(index=False))
+    return latex_df
 
 ###################
 ### Figures (Plots)
 ###################
 
-fig, ax = plt.subplots(figsize=(8,6))
-ax.bar(range(len(filter_counts)),
-       filter_counts.values,
-       color="navy",
-       alpha=0.7,
-       edgecolor="navy")
-for i, c in enumerate(filter_counts.values):
-    ax.text(i, c + 1, int(c), fontsize=18, ha="center", va="bottom")
-ax.set_xticks(range(len(filter_counts)))
-ax.set_xticklabels([i.replace("_", "\n").title() for i in filter_counts.index],
-                   rotation=45, ha="center")
-ax.set_ylabel("# Articles", fontweight="bold", fontsize=28)
-ax.set_xlabel("Filtering Stage", fontweight="bold", fontsize=28)
-ax.spines["top"].set_visible(False)
-ax.spines["right"].set_visible(False)
-ax.tick_params(labelsize=18)
-ax.set_ylim(0, filter_counts.max() + 8)
-fig.tight_layout()
-fig.savefig("./supplemental_data/search.pdf", dpi=300)
-plt.close(fig)
-
-print("Analysis complete. Plot saved to './supplemental_data/search.pdf'")
\ No newline at end of file
+def plot_filter_counts(filter_counts, output_file):
+    """
+    Bar chart of the datasets surviving each filtering stage
+    """
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(8,6))
+    ax.bar(range(len(filter_counts)),
+           filter_counts.values,
+           color="navy",
+           alpha=0.7,
+           edgecolor="navy")
+    for i, c in enumerate(filter_counts.values):
+        ax.text(i, c + 1, int(c), fontsize=18, ha="center", va="bottom")
+    ax.set_xticks(range(len(filter_counts)))
+    ax.set_xticklabels([i.replace("_", "\n").title() for i in filter_counts.index],
+                       rotation=45, ha="center")
+    ax.set_ylabel("# Articles", fontweight="bold", fontsize=28)
+    ax.set_xlabel("Filtering Stage", fontweight="bold", fontsize=28)
+    ax.spines["top"].set_visible(False)
+    ax.spines["right"].set_visible(False)
+    ax.tick_params(labelsize=18)
+    ax.set_ylim(0, filter_counts.max() + 8)
+    fig.tight_layout()
+    fig.savefig(output_file, dpi=300)
+    plt.close(fig)
+
+###################
+### Pipeline
+###################
+
+def run_analysis(data_dir=DATA_DIR, cache_dir=CACHE_DIR, use_cache=True):
+    """
+    Run every stage, reusing cached outputs where the inputs and code are
+    unchanged; return the stage outputs by name
+
+    `reviewed_df` holds the datasets that meet the exclusion criteria and
+    `data_df` the subset that survives the whole funnel; `filter_counts`
+    and `filter_timings` are the funnel's per-stage counts and
+    per-predicate seconds (empty when the funnel was loaded from the
+    cache). `sizes` is the long-form
+    size table and `malformed_sizes` the size values that could not be parsed.
+    """
+    def run(func, input_key, *args):
+        return run_stage(func, input_key, *args, cache_dir=cache_dir, use_cache=use_cache)
+
+    source = os.path.join(data_dir, "data_sources_standardized.xlsx")
+    raw_df, key = run(load_dataset, file_fingerprint(source), source)
+    (sizes, malformed_sizes), key = run(parse_sizes, key, raw_df)
+    for entry in malformed_sizes.itertuples():
+        print(f"Skipping malformed {entry.column} in row {entry.row}: {entry.value!r}")
+    features_df, key = run(expand_features, key, raw_df, sizes)
+    timings = {}
+    (masks, filter_counts), key = run(apply_filters, key, features_df, timings)
+    funnel = FunnelResult(features_df.index, {name: masks[name].to_numpy() for name in masks},
+                          filter_counts, pd.Series(timings, dtype=float))
+    reviewed_df = funnel.apply(features_df, REVIEW_STAGE)
+    data_df = funnel.apply(features_df)
+    distributions, _ = run(compute_distributions, key, reviewed_df)
+    latex_df, _ = run(build_latex_table, key, data_df)
+
+    return {
+        "sizes": sizes,
+        "malformed_sizes": malformed_sizes,
+        "features_df": features_df,
+        "reviewed_df": reviewed_df,
+        "data_df": data_df,
+        "filter_counts": funnel.counts,
+        "filter_timings": funnel.timings,
+        "latex_df": latex_df,
+        **distributions,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Dataset review statistics and search funnel plot")
+    parser.add_argument("--data-dir", default=DATA_DIR, help="Directory holding data_sources_standardized.xlsx")
+    parser.add_argument("--no-cache", action="store_true", help="Recompute every stage and skip the on-disk cache")
+    args = parser.parse_args()
+
+    results = run_analysis(args.data_dir, use_cache=not args.no_cache)
+    print("Filtering funnel:")
+    for stage_name, count in results["filter_counts"].items():
+        print(f"  {stage_name:28} {count:5d}")
+    if results["filter_timings"].empty:
+        print("  (funnel loaded from the cache; run with --no-cache for predicate timings)")
+    for predicate, seconds in results["filter_timings"].items():
+        print(f"  {predicate:28} {seconds * 1000:7.2f} ms")
+    output_file = os.path.join(args.data_dir, "search.pdf")
+    plot_filter_counts(results["filter_counts"], output_file)
+    print(f"Analysis complete. Plot saved to '{output_file}'")
+
+if __name__ == "__main__":
+    main()
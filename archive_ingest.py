@@ -0,0 +1,327 @@
+"""
+Archive Dump Ingestion
+Reads historical submissions from locally stored Reddit archive dumps
+(Pushshift / Arctic Shift style: one JSON object per line, usually
+zstd-compressed) instead of the live API, whose listings only reach back
+about 1000 posts per sort.
+
+Each dump is decompressed as a stream and cut into chunks of whole lines.
+Worker processes keep only submissions from the DISORDERS subreddits,
+apply the date cutoff and diagnosis detection, and return store-ready
+PageResults; the main process commits them in order together with the
+number of decompressed bytes read, so an interrupted run can be resumed.
+Memory stays bounded by the chunks in flight plus the zstd window,
+regardless of dump size.
+
+Usage:
+    python archive_ingest.py dumps/depression_submissions.zst dumps/ADHD_submissions.zst
+    python archive_ingest.py dumps/ --processes 8
+
+Directories are searched for *.zst, *.ndjson and *.jsonl files.
+Comment dumps are skipped line by line (records without a title).
+Reading .zst files requires the `zstandard` package.
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from diagnosis_matcher import DiagnosisMatcher
+from post_store import PostStore, PageResult, ListingCursor, DEFAULT_STORE_PATH, ARCHIVE_SORT, pack_raw_post
+from reddit_client import RedditPost
+from reddit_mental_health_collector import (
+    DISORDERS, DIAGNOSIS_KEYWORDS, CUTOFF_DATE, build_post_row, export_store, print_summary,
+)
+
+DUMP_EXTENSIONS = ('.zst', '.ndjson', '.jsonl')
+
+# Decompressed bytes sent to a worker process at once
+DEFAULT_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Archive dumps are compressed with --long=31, so allow a 2 GiB window
+ZSTD_MAX_WINDOW_SIZE = 2 ** 31
+
+# Any "subreddit" field in a dump line, including those of nested objects
+# such as crosspost_parent_list (dumps sort keys, so those can come first).
+# Only a cheap prefilter: quotes inside JSON strings are escaped, so it
+# cannot match text in a title or selftext
+SUBREDDIT_FIELD = re.compile(rb'"subreddit"\s*:\s*"([^"\\]*)"')
+
+# Per-process state, set by _init_worker
+_matcher = None
+_subreddits = None
+_keep_raw = False
+
+
+def subreddit_disorders(disorders):
+    """
+    Map lowercased subreddit names to (configured name, disorders)
+    """
+    subreddits = {}
+    for disorder_name, subreddit_list in disorders.items():
+        for subreddit_name in subreddit_list:
+            name, labels = subreddits.setdefault(subreddit_name.lower(), (subreddit_name, []))
+            if disorder_name not in labels:
+                labels.append(disorder_name)
+    return subreddits
+
+
+def find_dumps(paths):
+    """
+    Expand directories into the dump files they contain, sorted by name
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.endswith(DUMP_EXTENSIONS)))
+        else:
+            files.append(path)
+    return files
+
+
+def open_dump(path):
+    """
+    Open a dump for streaming binary reads, decompressing .zst files
+    """
+    f = open(path, 'rb')
+    if not path.endswith('.zst'):
+        return f
+    import zstandard
+    return zstandard.ZstdDecompressor(max_window_size=ZSTD_MAX_WINDOW_SIZE).stream_reader(f, closefd=True)
+
+
+def iter_chunks(stream, chunk_size=DEFAULT_CHUNK_SIZE, skip=0):
+    """
+    Yield (chunk, end offset) pieces of whole lines from a binary stream
+
+    Offsets count decompressed bytes. Everything before `skip`, which must
+    be an offset this function yielded earlier, is passed over without
+    being returned.
+    """
+    offset = 0
+    tail = b''
+    while True:
+        data = stream.read(chunk_size)
+        if not data:
+            break
+        if tail:
+            data = tail + data
+        cut = data.rfind(b'\n') + 1
+        if not cut:
+            tail = data
+            continue
+        chunk, tail = data[:cut], data[cut:]
+        start, offset = offset, offset + cut
+        if offset <= skip:
+            continue
+        yield (chunk[skip - start:] if start < skip else chunk), offset
+    if tail and offset + len(tail) > skip:
+        yield tail, offset + len(tail)
+
+
+def _init_worker(keywords, subreddits, keep_raw):
+    global _matcher, _subreddits, _keep_raw
+    _matcher = DiagnosisMatcher(keywords)
+    _subreddits = subreddits
+    _keep_raw = keep_raw
+
+
+def scan_chunk(chunk):
+    """
+    Filter and classify one chunk of dump lines (runs in worker processes)
+
+    Returns (lines, matched, results): lines read, submissions from a
+    configured subreddit, and a PageResult per disorder.
+    """
+    lines = 0
+    posts = []
+    for line in chunk.split(b'\n'):
+        if not line.strip():
+            continue
+        lines += 1
+        if not any(match.group(1).decode('utf-8', 'replace').lower() in _subreddits
+                   for match in SUBREDDIT_FIELD.finditer(line)):
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError:
+            continue
+        # Route by the top-level field, not a crossposted parent's
+        entry = _subreddits.get(str(data.get('subreddit') or '').lower())
+        if entry is None:
+            continue
+        if not data.get('id') or 'title' not in data:
+            continue
+        post = RedditPost.from_json(data)
+        if not post.permalink:
+            post.permalink = f"/r/{entry[0]}/comments/{post.id}/"
+        posts.append((post, entry))
+
+    recent = [(post, entry) for post, entry in posts if post.created_utc >= CUTOFF_DATE]
+    verdicts = _matcher.classify_batch([f"{post.title} {post.selftext}" for post, _ in recent])
+    diagnosed = {post.id for (post, _), verdict in zip(recent, verdicts) if verdict}
+
+    results = {}
+    for post, (subreddit_name, disorders) in posts:
+        is_diagnosed = post.id in diagnosed
+        row = build_post_row(post, subreddit_name) if is_diagnosed else None
+        raw = pack_raw_post(post, subreddit_name) if _keep_raw else None
+        for disorder_name in disorders:
+            result = results.get(disorder_name)
+            if result is None:
+                result = results[disorder_name] = PageResult()
+            result.seen.append((post.id, None, post.id, is_diagnosed))
+            if row is not None:
+                result.posts.append((post.id, row))
+                result.labels.append(post.id)
+            if raw is not None:
+                result.raw.append(raw)
+    return lines, len(posts), results
+
+
+def _scan_chunks(executor, chunks, max_pending):
+    """
+    Yield (end offset, scan result) in order, with at most `max_pending` chunks in flight
+    """
+    pending = deque()
+    for chunk, offset in chunks:
+        pending.append((offset, executor.submit(scan_chunk, chunk)))
+        if len(pending) >= max_pending:
+            offset, future = pending.popleft()
+            yield offset, future.result()
+    while pending:
+        offset, future = pending.popleft()
+        yield offset, future.result()
+
+
+class DumpStats:
+    """
+    Counts for one ingested dump
+    """
+
+    __slots__ = ('lines', 'matched', 'diagnosed', 'bytes', 'elapsed')
+
+    def __init__(self):
+        self.lines = 0
+        self.matched = 0
+        self.diagnosed = 0
+        self.bytes = 0
+        self.elapsed = 0.0
+
+
+def ingest_dump(executor, store, run_id, path, chunk_size=DEFAULT_CHUNK_SIZE, max_pending=4):
+    """
+    Stream one dump into the store, continuing from its saved cursor
+
+    Returns a DumpStats, or None if the dump was already ingested in this run.
+    """
+    source = os.path.basename(path)
+    cursor = store.load_cursor(run_id, '', source, ARCHIVE_SORT)
+    if cursor.done:
+        return None
+
+    stats = DumpStats()
+    start = time.perf_counter()
+    skipped = cursor.fetched
+    with open_dump(path) as stream:
+        chunks = iter_chunks(stream, chunk_size, skip=cursor.fetched)
+        for offset, (lines, matched, results) in _scan_chunks(executor, chunks, max_pending):
+            stats.lines += lines
+            stats.matched += matched
+            stats.diagnosed += len({post_id for result in results.values() for post_id in result.labels})
+            cursor = ListingCursor(fetched=offset)
+            store.checkpoint_archive(run_id, source, cursor, results)
+    store.checkpoint_archive(run_id, source, ListingCursor(fetched=cursor.fetched, done=True), {})
+    stats.bytes = cursor.fetched - skipped
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+def ingest_dumps(store, run_id, paths, keywords=DIAGNOSIS_KEYWORDS, disorders=DISORDERS,
+                 processes=None, chunk_size=DEFAULT_CHUNK_SIZE, keep_raw=False):
+    """
+    Ingest every dump in `paths` into the store; returns {path: DumpStats or None}
+    """
+    processes = processes or os.cpu_count() or 1
+    subreddits = subreddit_disorders(disorders)
+    stats = {}
+    with ProcessPoolExecutor(processes, initializer=_init_worker,
+                             initargs=(keywords, subreddits, keep_raw)) as executor:
+        for path in paths:
+            stats[path] = dump_stats = ingest_dump(executor, store, run_id, path, chunk_size, 2 * processes)
+            if dump_stats is None:
+                print(f"  ✓ Skipped {path}: already ingested")
+            else:
+                rate = dump_stats.bytes / max(dump_stats.elapsed, 1e-9) / 2 ** 20
+                print(f"  ✓ {path}: {dump_stats.lines} lines, {dump_stats.matched} matching submissions, "
+                      f"{dump_stats.diagnosed} diagnosed ({dump_stats.elapsed:.1f}s, {rate:.0f} MB/s)")
+    return stats
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Ingest historical posts from local Reddit archive dumps")
+    parser.add_argument('dumps', nargs='+',
+                        help="Dump files (.zst, .ndjson, .jsonl) or directories containing them")
+    parser.add_argument('--store', default=DEFAULT_STORE_PATH,
+                        help="SQLite file that ingested posts are written to")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue the most recent unfinished run")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="Worker processes (default: one per CPU)")
+    parser.add_argument('--chunk-mb', type=float, default=DEFAULT_CHUNK_SIZE / 2 ** 20,
+                        help="Decompressed megabytes sent to a worker at once")
+    parser.add_argument('--keep-raw', action='store_true',
+                        help="Also store every matching submission for offline reclassification")
+    parser.add_argument('--output-format', choices=['xlsx', 'parquet', 'both', 'none'], default='xlsx',
+                        help="Export written from the store after ingestion")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    paths = find_dumps(args.dumps)
+
+    print("="*60)
+    print("REDDIT ARCHIVE DUMP INGESTION")
+    print(f"{len(paths)} dump file(s), posts from 2015 onwards")
+    print("="*60)
+
+    if not paths:
+        print("✗ No dump files found.")
+        return
+    if any(path.endswith('.zst') for path in paths):
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            print("✗ Reading .zst dumps requires the zstandard package: pip install zstandard")
+            return
+
+    store = PostStore(args.store)
+    run_id = store.start_run(resume=args.resume)
+    print(f"✓ Writing to {args.store} (run {run_id})")
+
+    start = time.perf_counter()
+    ingest_dumps(store, run_id, paths, processes=args.processes,
+                 chunk_size=int(args.chunk_mb * 2 ** 20), keep_raw=args.keep_raw)
+    store.finish_run(run_id)
+    print(f"✓ Ingestion finished in {time.perf_counter() - start:.1f}s")
+
+    if args.output_format == 'none':
+        store.close()
+        return
+    if any(store.count_posts(name) for name in DISORDERS):
+        output_name = f'mental_health_reddit_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}'
+        print_summary(export_store(store, DISORDERS, output_name, args.output_format))
+    else:
+        print("\n✗ No diagnosed posts found in the dumps.")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Hashed Author Ids
+Usernames are never stored. Each author is identified by a keyed BLAKE2b
+hash of the lowercased username, so posts by the same person can be
+grouped (see user_timelines.py), while the ids cannot be reversed by
+hashing a list of known usernames without the key.
+
+The key is read from the REDDIT_AUTHOR_KEY environment variable or, if
+that is unset, from `.author_key` in the working directory, which is
+created with a random key on first use. Keep the key file private and
+reuse it: ids made with different keys do not match.
+"""
+
+import hashlib
+import os
+import secrets
+import threading
+
+AUTHOR_KEY_ENV = 'REDDIT_AUTHOR_KEY'
+DEFAULT_KEY_PATH = '.author_key'
+
+# 96-bit ids: collisions are negligible for any number of Reddit users
+AUTHOR_ID_BYTES = 12
+
+# Placeholders Reddit (and archive dumps) use when the account is gone
+ANONYMOUS_AUTHORS = {'', '[deleted]', '[removed]'}
+
+_key = None
+_key_lock = threading.Lock()
+
+
+def _load_key(path=DEFAULT_KEY_PATH):
+    """
+    Return the hashing key, creating the key file if there is none
+    """
+    env_key = os.environ.get(AUTHOR_KEY_ENV)
+    if env_key:
+        return env_key.encode('utf-8')
+    try:
+        with open(path, encoding='ascii') as f:
+            return f.read().strip().encode('ascii')
+    except FileNotFoundError:
+        pass
+    # Write a temporary file and link it into place, so concurrent
+    # processes agree on whichever key was created first
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, 'w', encoding='ascii') as f:
+        f.write(secrets.token_hex(32))
+    try:
+        os.link(tmp_path, path)
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(tmp_path)
+    with open(path, encoding='ascii') as f:
+        return f.read().strip().encode('ascii')
+
+
+def author_key():
+    global _key
+    if _key is None:
+        with _key_lock:
+            if _key is None:
+                # BLAKE2b keys are at most 64 bytes
+                _key = hashlib.sha256(_load_key()).digest()
+    return _key
+
+
+def hash_author(username):
+    """
+    Hashed id for a username, or None for deleted or missing authors
+    """
+    if username is None:
+        return None
+    username = str(username).strip()
+    if username.lower() in ANONYMOUS_AUTHORS:
+        return None
+    return hashlib.blake2b(username.lower().encode('utf-8'), key=author_key(),
+                           digest_size=AUTHOR_ID_BYTES).hexdigest()
@@ -0,0 +1,76 @@
+"""
+Benchmark for archive dump ingestion
+Writes synthetic NDJSON dumps of growing size, in which a fifth of the
+submissions come from DISORDERS subreddits, ingests each into a fresh
+store and reports throughput and the peak memory of the main and worker
+processes, which should stay flat as the dump grows
+"""
+
+import json
+import os
+import random
+import resource
+import tempfile
+import time
+
+from archive_ingest import ingest_dumps
+from post_store import PostStore
+from reddit_mental_health_collector import DISORDERS
+
+SIZES = [50000, 100000, 200000]
+
+OTHER_SUBREDDITS = ['AskReddit', 'news', 'gaming', 'pics', 'funny', 'movies', 'science', 'worldnews']
+
+FILLER = ("some days are harder than others and i have been struggling to keep up with work lately "
+          "my sleep schedule has been all over the place looking for advice on how to manage this").split()
+
+
+def write_dump(path, n_posts, seed=0):
+    """
+    NDJSON submissions shaped like archive dump records
+    """
+    rng = random.Random(seed)
+    targets = [name for names in DISORDERS.values() for name in names]
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(n_posts):
+            subreddit = rng.choice(targets) if rng.random() < 0.2 else rng.choice(OTHER_SUBREDDITS)
+            words = rng.choices(FILLER, k=rng.randint(20, 120))
+            if rng.random() < 0.3:
+                words.insert(rng.randrange(len(words)), 'diagnosed')
+            f.write(json.dumps({
+                'id': f'a{i:07x}', 'subreddit': subreddit, 'title': f'Post {i}',
+                'selftext': ' '.join(words), 'created_utc': 1420070400 + i * 600,
+                'permalink': f'/r/{subreddit}/comments/a{i:07x}/post_{i}/',
+                'score': rng.randrange(500), 'num_comments': rng.randrange(100),
+                'author': f'user{rng.randrange(n_posts // 5)}',
+            }) + '\n')
+
+
+def peak_rss_mb(who):
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def main():
+    print("="*60)
+    print("ARCHIVE DUMP INGESTION BENCHMARK")
+    print("="*60)
+    print(f"{'posts':>8} {'MB':>7} {'seconds':>9} {'posts/s':>9} {'MB/s':>7} {'main MB':>8} {'worker MB':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_posts in SIZES:
+            dump = os.path.join(tmp, f'dump_{n_posts}.ndjson')
+            write_dump(dump, n_posts)
+            size_mb = os.path.getsize(dump) / 2 ** 20
+            with PostStore(os.path.join(tmp, f'store_{n_posts}.sqlite')) as store:
+                run_id = store.start_run()
+                start = time.perf_counter()
+                ingest_dumps(store, run_id, [dump], chunk_size=2 ** 20)
+                elapsed = time.perf_counter() - start
+            print(f"{n_posts:>8} {size_mb:>7.1f} {elapsed:>9.2f} {n_posts / elapsed:>9.0f} "
+                  f"{size_mb / elapsed:>7.1f} {peak_rss_mb(resource.RUSAGE_SELF):>8.0f} "
+                  f"{peak_rss_mb(resource.RUSAGE_CHILDREN):>10.0f}")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    main()
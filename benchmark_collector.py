@@ -0,0 +1,139 @@
+"""
+Benchmark for end-to-end collection, offline
+Replays recorded API responses (see http_fixtures.py) through a local
+server and runs a full DISORDERS sweep against them at several response
+latencies, reporting throughput, API requests per accepted post and the
+collector's peak memory. Each sweep runs in a fresh process with a fresh
+store, so the numbers are comparable between runs and code changes.
+
+Without --fixtures, a sweep of synthetic FakeRedditData listings is
+recorded first. To benchmark on real data, record a run once:
+
+    python reddit_mental_health_collector.py --record-fixtures fixtures/
+    python benchmark_collector.py --fixtures fixtures/
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from author_ids import AUTHOR_KEY_ENV
+from fake_reddit_server import FakeRedditData, FakeRedditServer
+from http_fixtures import FixtureData, FixtureRecorder
+from post_store import PostStore
+from rate_limiter import TokenBucketRateLimiter
+from reddit_client import RedditClient
+from reddit_mental_health_collector import DISORDERS, DEFAULT_WORKERS, collect_all_disorders
+
+LATENCIES = [0.0, 0.05, 0.2]
+
+# Requests per minute when not throttled: effectively unlimited
+UNTHROTTLED = 10 ** 9
+
+
+def make_client(base_url, token_url, requests_per_minute, recorder=None):
+    return RedditClient('benchmark', 'benchmark', 'benchmark', api_url=base_url,
+                        token_url=token_url, recorder=recorder,
+                        rate_limiter=TokenBucketRateLimiter(requests_per_minute, capacity=100))
+
+
+def record_synthetic(path, posts_per_subreddit):
+    """
+    Record a full sweep over FakeRedditData listings into `path`
+    """
+    with FakeRedditServer(FakeRedditData(posts_per_subreddit), quota=UNTHROTTLED) as server, \
+            FixtureRecorder(path) as recorder, tempfile.TemporaryDirectory() as tmp, \
+            PostStore(os.path.join(tmp, 'record.sqlite')) as store, \
+            open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        reddit = make_client(server.base_url, server.token_url, UNTHROTTLED, recorder)
+        collect_all_disorders(reddit, DISORDERS, UNTHROTTLED, DEFAULT_WORKERS, store, store.start_run(),
+                              adaptive=False)
+        return recorder.recorded
+
+
+def run_sweep(base_url, token_url, target_posts, workers, adaptive, requests_per_minute, results):
+    """
+    One DISORDERS sweep in a fresh process; puts its measurements on `results`
+    """
+    reddit = make_client(base_url, token_url, requests_per_minute)
+    with tempfile.TemporaryDirectory() as tmp, PostStore(os.path.join(tmp, 'bench.sqlite')) as store, \
+            open(os.devnull, 'w') as devnull:
+        run_id = store.start_run()
+        start = time.perf_counter()
+        with redirect_stdout(devnull):
+            collect_all_disorders(reddit, DISORDERS, target_posts, workers, store, run_id, adaptive=adaptive)
+        elapsed = time.perf_counter() - start
+        accepted = len(store.labels_by_post())
+    results.put({
+        'seconds': elapsed,
+        'fetched': reddit.metrics.counter('posts_fetched_total'),
+        'accepted': accepted,
+        'requests': reddit.rate_limiter.requests_granted,
+        # ru_maxrss is in kilobytes on Linux
+        'peak_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    })
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline end-to-end collector benchmark")
+    parser.add_argument('--fixtures', default=None,
+                        help="Directory recorded with --record-fixtures (default: record synthetic listings)")
+    parser.add_argument('--posts', type=int, default=1000,
+                        help="Posts per subreddit when recording synthetic listings")
+    parser.add_argument('--latency', type=float, nargs='+', default=LATENCIES,
+                        help="Seconds added to every response, one sweep per value")
+    parser.add_argument('--target-posts', type=int, default=2000, help="Target posts per disorder")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS, help="Fetch workers")
+    parser.add_argument('--requests-per-minute', type=int, default=None,
+                        help="Rate limit the replay server enforces (default: none)")
+    parser.add_argument('--fixed-limits', action='store_true',
+                        help="Page every listing to its full limit instead of adapting to its yield")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    requests_per_minute = args.requests_per_minute or UNTHROTTLED
+    # Hash authors with a throwaway key instead of creating .author_key
+    os.environ.setdefault(AUTHOR_KEY_ENV, 'benchmark')
+
+    print("="*60)
+    print("COLLECTOR BENCHMARK (replayed responses)")
+    print("="*60)
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures = args.fixtures
+        if fixtures is None:
+            fixtures = os.path.join(tmp, 'fixtures')
+            start = time.perf_counter()
+            recorded = record_synthetic(fixtures, args.posts)
+            print(f"✓ Recorded {recorded} synthetic responses ({args.posts} posts per subreddit) "
+                  f"in {time.perf_counter() - start:.1f}s")
+        data = FixtureData(fixtures)
+        print(f"✓ Replaying {len(data)} responses; {sum(map(len, DISORDERS.values()))} subreddits, "
+              f"target {args.target_posts} posts per disorder, {args.workers} fetch worker(s)")
+
+        print(f"{'latency':>8} {'seconds':>8} {'fetched/s':>10} {'accepted/s':>11} {'requests':>9} "
+              f"{'req/post':>9} {'peak MB':>8}")
+        context = multiprocessing.get_context('spawn')
+        for latency in args.latency:
+            with FakeRedditServer(data, quota=requests_per_minute, window=60, latency=latency,
+                                  unavailable=data.unavailable) as server:
+                results = context.Queue()
+                process = context.Process(target=run_sweep, args=(
+                    server.base_url, server.token_url, args.target_posts, args.workers,
+                    not args.fixed_limits, requests_per_minute, results))
+                process.start()
+                result = results.get()
+                process.join()
+            print(f"{latency:>8.2f} {result['seconds']:>8.1f} {result['fetched'] / result['seconds']:>10.0f} "
+                  f"{result['accepted'] / result['seconds']:>11.0f} {result['requests']:>9} "
+                  f"{result['requests'] / max(result['accepted'], 1):>9.3f} {result['peak_mb']:>8.0f}")
+    print("="*60)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark for the corpus loader
+Times loading the shipped per-disorder CSVs with a plain pandas read per
+file, with the parallel pyarrow loader (first load, which also writes the
+cache), and with a warm sidecar cache
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from corpus_loader import CORPUS_FILES, load_corpus
+
+REPEATS = 5
+
+def pandas_load():
+    """
+    What consumers did before: one pandas read_csv per file, then concat
+    """
+    frames = []
+    for disorder, filename in CORPUS_FILES.items():
+        df = pd.read_csv(filename, sep=';', encoding='utf-8-sig')
+        df['Disorder'] = disorder
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+def best_of(func, repeats=REPEATS):
+    return min(timed(func)[0] for _ in range(repeats))
+
+def main():
+    total_mb = sum(os.path.getsize(f) for f in CORPUS_FILES.values()) / 2**20
+    
+    print("="*60)
+    print("CORPUS LOADER BENCHMARK")
+    print(f"{len(CORPUS_FILES)} files, {total_mb:.1f} MiB, best of {REPEATS}")
+    print("="*60)
+    
+    pandas_time = best_of(pandas_load)
+    no_cache_time = best_of(lambda: load_corpus(use_cache=False))
+    
+    cache_dir = tempfile.mkdtemp()
+    try:
+        first_time, df = timed(lambda: load_corpus(cache_dir=cache_dir))
+        warm_time = best_of(lambda: load_corpus(cache_dir=cache_dir))
+    finally:
+        shutil.rmtree(cache_dir)
+    
+    print(f"{'pandas read_csv':28}: {pandas_time * 1000:8.1f} ms")
+    print(f"{'pyarrow, no cache':28}: {no_cache_time * 1000:8.1f} ms")
+    print(f"{'pyarrow, first load + cache':28}: {first_time * 1000:8.1f} ms")
+    print(f"{'warm cache':28}: {warm_time * 1000:8.1f} ms  ({pandas_time / warm_time:.0f}x vs pandas)")
+    print(f"{'-'*60}")
+    print(f"{len(df)} posts, {df.memory_usage(deep=True).sum() / 2**20:.1f} MiB in memory")
+    print("="*60)
+
+if __name__ == "__main__":
+    main()
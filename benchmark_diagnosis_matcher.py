@@ -0,0 +1,93 @@
+"""
+Benchmark for the diagnosis keyword matcher
+Compares the original per-keyword loop with the compiled single-pass
+matcher over the post descriptions shipped in ADHD.csv and Bipolar.csv
+"""
+
+import re
+import time
+
+import pandas as pd
+
+from diagnosis_matcher import DiagnosisMatcher
+from reddit_mental_health_collector import DIAGNOSIS_KEYWORDS
+
+CSV_FILES = ['ADHD.csv', 'Bipolar.csv']
+REPEATS = 5
+
+def legacy_check_if_diagnosed(text):
+    """
+    Original implementation: lowercase, then one re.search per keyword
+    """
+    if not text:
+        return False
+    
+    text_lower = text.lower()
+    
+    for keyword in DIAGNOSIS_KEYWORDS:
+        if re.search(keyword, text_lower):
+            return True
+    
+    return False
+
+def load_texts():
+    """
+    Load Title + Description for every post in the benchmark CSVs
+    """
+    texts = []
+    for csv_file in CSV_FILES:
+        df = pd.read_csv(csv_file, sep=';', encoding='utf-8-sig')
+        texts.extend((df['Title'].fillna('') + ' ' + df['Description'].fillna('')).tolist())
+    return texts
+
+def best_time(func, repeats=REPEATS):
+    """
+    Return the best wall time (seconds) and last result of func over repeats
+    """
+    best = float('inf')
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def run_case(label, texts, matcher):
+    """
+    Time legacy vs compiled matching over one corpus and check they agree
+    """
+    legacy_time, legacy_result = best_time(lambda: [legacy_check_if_diagnosed(t) for t in texts])
+    single_time, single_result = best_time(lambda: [matcher.is_diagnosed(t) for t in texts])
+    batch_time, batch_result = best_time(lambda: matcher.classify_batch(texts))
+    
+    if not (legacy_result == single_result == batch_result):
+        raise AssertionError(f"Matcher results differ from the legacy implementation ({label})")
+    
+    print(f"\n{label}: {sum(batch_result)} / {len(texts)} diagnosed")
+    print(f"  {'legacy loop':20}: {legacy_time * 1000:8.1f} ms")
+    print(f"  {'compiled (per post)':20}: {single_time * 1000:8.1f} ms  ({legacy_time / single_time:.1f}x)")
+    print(f"  {'compiled (batch)':20}: {batch_time * 1000:8.1f} ms  ({legacy_time / batch_time:.1f}x)")
+
+def main():
+    texts = load_texts()
+    total_chars = sum(len(t) for t in texts)
+    matcher = DiagnosisMatcher(DIAGNOSIS_KEYWORDS)
+    
+    # The shipped CSVs only hold accepted posts; most live posts contain no
+    # keyword at all, so also time a copy with the keyword stem scrubbed out
+    scrubbed = [re.sub('(?i)diagnos', 'assess', t) for t in texts]
+    
+    print("="*60)
+    print("DIAGNOSIS MATCHER BENCHMARK")
+    print(f"{len(texts)} posts, {total_chars / 1e6:.2f}M characters, best of {REPEATS}")
+    print("="*60)
+    
+    run_case("Shipped posts (diagnosed)", texts, matcher)
+    run_case("Scrubbed posts (undiagnosed)", scrubbed, matcher)
+    
+    locate_time, hits = best_time(lambda: matcher.find_all_batch(texts))
+    print(f"\nKeyword locations: {sum(len(h) for h in hits)} hits in {locate_time * 1000:.1f} ms")
+    print("="*60)
+
+if __name__ == "__main__":
+    main()
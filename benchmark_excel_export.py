@@ -0,0 +1,116 @@
+"""
+Benchmark for the Excel export
+Compares the original pandas export + load/format/save round trip with the
+streaming write-only export, using the posts in the shipped
+mental_health_reddit_data_*.xlsx files as input
+"""
+
+import contextlib
+import glob
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+from openpyxl import load_workbook
+from openpyxl.styles import Font, PatternFill, Alignment
+
+from excel_export import COLUMN_NAMES
+from reddit_mental_health_collector import export_to_excel
+
+INPUT_FILES = sorted(glob.glob('mental_health_reddit_data_*.xlsx'))
+
+def legacy_export_to_excel(all_data, output_file):
+    """
+    Original export: DataFrame per disorder, then reload the file to format it
+    """
+    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+        for disorder_name, posts_data in all_data.items():
+            if posts_data:
+                df = pd.DataFrame(posts_data)
+                df = df[['Date', 'Title', 'Description', 'Subreddit', 'Score', 'Num_Comments', 'URL']]
+                df['Date'] = pd.to_datetime(df['Date'])
+                df = df.sort_values('Date', ascending=False)
+                df['Date'] = df['Date'].dt.strftime('%Y-%m-%d %H:%M:%S')
+                df.to_excel(writer, sheet_name=disorder_name[:31], index=False)
+    
+    wb = load_workbook(output_file)
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF")
+    for sheet_name in wb.sheetnames:
+        ws = wb[sheet_name]
+        for cell in ws[1]:
+            cell.fill = header_fill
+            cell.font = header_font
+            cell.alignment = Alignment(horizontal='center', vertical='center')
+        for column, width in zip('ABCDEFG', [20, 50, 80, 20, 12, 15, 60]):
+            ws.column_dimensions[column].width = width
+        for row in ws.iter_rows(min_row=2, max_col=7):
+            row[2].alignment = Alignment(wrap_text=True, vertical='top')
+    wb.save(output_file)
+
+def load_all_data(input_file):
+    """
+    Read a collector output file back into {disorder: [row dict, ...]}
+    
+    Columns missing from older exports (Score, Num_Comments, URL) are None.
+    """
+    wb = load_workbook(input_file, read_only=True)
+    all_data = {}
+    for ws in wb:
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows)
+        all_data[ws.title] = [
+            {name: record.get(name) for name in COLUMN_NAMES}
+            for record in (dict(zip(header, row)) for row in rows if row[0] is not None)
+        ]
+    wb.close()
+    return all_data
+
+def measure(func):
+    """
+    Return (seconds, peak traced MiB) for one call
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+def quiet(func, *args):
+    """
+    Run a function with its progress prints suppressed
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        func(*args)
+
+def main():
+    print("="*60)
+    print("EXCEL EXPORT BENCHMARK")
+    print("="*60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        for input_file in INPUT_FILES:
+            all_data = load_all_data(input_file)
+            n_posts = sum(len(rows) for rows in all_data.values())
+            legacy_file = os.path.join(tmp, 'legacy.xlsx')
+            stream_file = os.path.join(tmp, 'stream.xlsx')
+            
+            legacy_time, legacy_peak = measure(lambda: legacy_export_to_excel(all_data, legacy_file))
+            stream_time, stream_peak = measure(lambda: quiet(export_to_excel, all_data, stream_file))
+            
+            if load_all_data(legacy_file) != load_all_data(stream_file):
+                print("  ! Sheet contents differ (rows with identical dates may be ordered differently)")
+            
+            print(f"\n{input_file} ({os.path.getsize(input_file) / 2**20:.1f} MiB, {n_posts} posts)")
+            print(f"  {'legacy':10}: {legacy_time:6.2f} s, peak {legacy_peak:7.1f} MiB")
+            print(f"  {'streaming':10}: {stream_time:6.2f} s, peak {stream_peak:7.1f} MiB  "
+                  f"({legacy_time / stream_time:.1f}x faster)")
+    print("="*60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark for the multi-label encoding in analysis/
+Times building task indicator columns, excluding filtered tasks and
+counting labels on a synthetic catalogue, with the old per-row Python sets
+and with the MultiHot bitmask encoding
+"""
+
+import random
+import time
+
+import pandas as pd
+
+from analysis.multilabel import MultiHot
+
+N_ROWS = 50000
+N_LABELS = 120
+FILTERED = {f"task_{i}" for i in range(0, N_LABELS, 10)}
+REPEATS = 3
+
+def synthetic_column(n_rows, seed=0):
+    rng = random.Random(seed)
+    labels = [f"task_{i}" for i in range(N_LABELS)]
+    values = [", ".join(rng.sample(labels, rng.randint(1, 4))) for _ in range(n_rows)]
+    for i in range(0, n_rows, 20):
+        values[i] = None
+    return pd.Series(values)
+
+def set_based(column):
+    """
+    What statistics.py did before: sets in an object column, one apply per label
+    """
+    tasks = column.map(lambda t: set(t.split(", ")) if isinstance(t, str) else t)
+    unique = sorted(set.union(*[s for s in tasks if isinstance(s, set)]))
+    indicators = pd.DataFrame({f"task={t}": tasks.apply(lambda s: t in s if isinstance(s, set) else False)
+                               for t in unique}, index=tasks.index)
+    keep = ~tasks.map(lambda i: isinstance(i, set) and any(p in FILTERED for p in i))
+    return indicators.loc[keep].sum()
+
+def bitmask_based(column):
+    labels = MultiHot.from_strings(column)
+    keep = ~labels.any_of(FILTERED)
+    indicators = labels.indicator_frame("task")
+    counts = labels.take(keep).counts()
+    return indicators.loc[keep], counts
+
+def best_of(func, repeats=REPEATS):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    column = synthetic_column(N_ROWS)
+
+    print("="*60)
+    print("MULTI-LABEL ENCODING BENCHMARK")
+    print(f"{N_ROWS} rows, {N_LABELS} labels, best of {REPEATS}")
+    print("="*60)
+
+    expected = set_based(column)
+    indicators, counts = bitmask_based(column)
+    counts.index = [f"task={t}" for t in counts.index]
+    assert expected.equals(counts[expected.index]), "encodings disagree"
+
+    set_time = best_of(lambda: set_based(column))
+    bitmask_time = best_of(lambda: bitmask_based(column))
+
+    print(f"{'python sets + apply':28}: {set_time * 1000:8.1f} ms")
+    print(f"{'multi-hot bitmask':28}: {bitmask_time * 1000:8.1f} ms  ({set_time / bitmask_time:.0f}x faster)")
+    print("="*60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark for near-duplicate detection
+Times near_duplicates.find_near_duplicates on synthetic corpora of
+growing size, in which every tenth post is a lightly edited copy of an
+earlier one, and reports how many of those copies were found
+"""
+
+import random
+import time
+
+import pandas as pd
+
+from near_duplicates import find_near_duplicates
+
+SIZES = [10000, 20000, 40000, 80000]
+
+WORDS = ("i have been struggling with work sleep friends family therapy medication anxiety "
+         "focus today week month doctor appointment feel better worse again help advice "
+         "diagnosed adhd depression school partner job money tired energy routine").split()
+
+def synthetic_corpus(n_posts, seed=0):
+    """
+    Posts of 40-150 random words; every tenth post copies an earlier one
+    with one word changed. Returns (frame, number of copies).
+    """
+    rng = random.Random(seed)
+    texts = []
+    copies = 0
+    for i in range(n_posts):
+        if i % 10 == 9:
+            words = texts[rng.randrange(i)].split()
+            words[rng.randrange(len(words))] = rng.choice(WORDS)
+            copies += 1
+        else:
+            words = rng.choices(WORDS, k=rng.randint(40, 150))
+        texts.append(' '.join(words))
+    df = pd.DataFrame({
+        'Date': pd.date_range('2020-01-01', periods=n_posts, freq='min'),
+        'Title': [f'Post {i}' for i in range(n_posts)],
+        'Description': texts,
+        'URL': [f'https://reddit.com/r/test/comments/p{i}/' for i in range(n_posts)],
+    })
+    return df, copies
+
+def main():
+    print("="*60)
+    print("NEAR-DUPLICATE DETECTION BENCHMARK")
+    print("="*60)
+    print(f"{'posts':>8} {'seconds':>9} {'posts/s':>9} {'copies':>8} {'found':>8}")
+    for n_posts in SIZES:
+        df, copies = synthetic_corpus(n_posts)
+        start = time.perf_counter()
+        result = find_near_duplicates(df)
+        elapsed = time.perf_counter() - start
+        found = int((~result['Canonical']).sum())
+        print(f"{n_posts:>8} {elapsed:>9.2f} {n_posts / elapsed:>9.0f} {copies:>8} {found:>8}")
+    print("="*60)
+
+if __name__ == "__main__":
+    main()
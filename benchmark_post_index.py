@@ -0,0 +1,80 @@
+"""
+Benchmark for the full-text post index
+Times a phrase query with a disorder filter on a synthetic corpus, as a
+pandas substring scan over the Description column and as an FTS5 query
+against post_index.PostIndex
+"""
+
+import os
+import random
+import tempfile
+import time
+
+import pandas as pd
+
+from post_index import PostIndex
+
+N_POSTS = 200000
+DISORDERS = ['ADHD', 'Anxiety', 'Autism', 'Bipolar', 'Depression', 'PTSD']
+PHRASE = 'was diagnosed'
+REPEATS = 5
+
+WORDS = ("i have been struggling with work sleep friends family therapy medication anxiety "
+         "focus today week month doctor appointment feel better worse again help advice").split()
+
+def synthetic_posts(n_posts, seed=0):
+    rng = random.Random(seed)
+    start = 1420070400
+    for i in range(n_posts):
+        words = rng.choices(WORDS, k=rng.randint(20, 120))
+        if rng.random() < 0.1:
+            words.insert(rng.randrange(len(words)), PHRASE)
+        disorder = rng.choice(DISORDERS)
+        yield (f'p{i}', start + i * 300, f'r/{disorder}', rng.randrange(5000), rng.randrange(300),
+               f'https://reddit.com/r/{disorder}/comments/p{i}/', f'Post {i}', ' '.join(words), (disorder,))
+
+def best_of(func, repeats=REPEATS):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    posts = list(synthetic_posts(N_POSTS))
+    df = pd.DataFrame({'Description': [p[7] for p in posts], 'Disorder': [p[8][0] for p in posts]})
+
+    print("="*60)
+    print("POST INDEX BENCHMARK")
+    print(f"{N_POSTS} posts, phrase \"{PHRASE}\" in ADHD, best of {REPEATS}")
+    print("="*60)
+
+    def pandas_scan():
+        hits = df[(df['Disorder'] == 'ADHD') & df['Description'].str.contains(PHRASE, regex=False)]
+        return len(hits)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'index.sqlite')
+        with PostIndex(path) as index:
+            start = time.perf_counter()
+            for i in range(0, N_POSTS, 5000):
+                index.add_posts(posts[i:i + 5000])
+            index.optimize()
+            build_time = time.perf_counter() - start
+
+            query = f'"{PHRASE}"'
+            assert index.count(query, disorders=['ADHD']) == pandas_scan(), "counts disagree"
+            scan_time = best_of(pandas_scan)
+            count_time = best_of(lambda: index.count(query, disorders=['ADHD']))
+            top_time = best_of(lambda: index.search(query, disorders=['ADHD'], order='newest', limit=20))
+        size_mb = os.path.getsize(path) / 2**20
+
+    print(f"{'build + optimize':28}: {build_time:8.1f} s   ({size_mb:.0f} MiB)")
+    print(f"{'pandas str.contains':28}: {scan_time * 1000:8.1f} ms")
+    print(f"{'FTS5 count':28}: {count_time * 1000:8.1f} ms  ({scan_time / count_time:.0f}x faster)")
+    print(f"{'FTS5 newest 20':28}: {top_time * 1000:8.1f} ms  ({scan_time / top_time:.0f}x faster)")
+    print("="*60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark for the README table in excel_to_markdown.py
+Times rendering a synthetic catalogue the old way (element-wise map,
+row-wise apply, tabulate), with a cold row cache, and with a warm cache
+after one row was edited
+"""
+
+import random
+import time
+
+import pandas as pd
+from tabulate import tabulate
+
+from excel_to_markdown import SOURCE_COLUMNS, TABLE_COLUMNS, layout_table, render_cells
+
+N_ROWS = 5000
+REPEATS = 3
+
+def synthetic_catalogue(n_rows, seed=0):
+    rng = random.Random(seed)
+    words = ["Depression", "Reddit", "Suicide", "Detection", "Social", "Media", "Language",
+             "Twitter", "Anxiety", "Users", "Risk", "Mental", "Health", "Prediction"]
+    rows = []
+    for i in range(n_rows):
+        rows.append({
+            "Paper": " ".join(rng.sample(words, 6)) + f" {i}",
+            "Reference Link": f"https://example.org/paper/{i}",
+            "Authors": ", ".join(f"Author{rng.randrange(1000)}" for _ in range(rng.randint(1, 8))),
+            "Platform": ", ".join(rng.sample(["Reddit", "Twitter", "Facebook", "Weibo"], rng.randint(1, 2))),
+            "Year": rng.randint(2010, 2021),
+            "Target Outcomes": ", ".join(rng.sample(words[:6], rng.randint(1, 3))) + "\n",
+        })
+    df = pd.DataFrame(rows)[SOURCE_COLUMNS]
+    return df.sort_values("Year", ascending=False, kind="mergesort").reset_index(drop=True)
+
+def legacy_render(df):
+    """
+    What excel_to_markdown.py did before, minus reading the spreadsheet
+    """
+    df = df.copy()
+    newline_replace = lambda x: x.replace("\n","<br/>") if not isinstance(x, float) else x
+    strip_space = lambda x: x.strip() if not isinstance(x, float) else x
+    for col in ["Paper", "Authors", "Platform", "Target Outcomes", "Reference Link"]:
+        df[col] = df[col].map(newline_replace)
+        df[col] = df[col].map(strip_space)
+    df["Paper"] = df.apply(lambda row: "[{}]({})".format(row["Paper"], row["Reference Link"]), axis = 1)
+    return tabulate(df[TABLE_COLUMNS], tablefmt="pipe", headers="keys", showindex="never")
+
+def incremental_render(df, cache):
+    cells, _ = render_cells(df, cache)
+    return layout_table(cells)
+
+def best_of(func, repeats=REPEATS):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def empty_cache():
+    return {"rows": {}, "order": []}
+
+def main():
+    df = synthetic_catalogue(N_ROWS)
+    edited = df.copy()
+    edited.loc[N_ROWS // 2, "Authors"] = "Edited, Author"
+
+    print("="*60)
+    print("README TABLE BENCHMARK")
+    print(f"{N_ROWS} rows, best of {REPEATS}")
+    print("="*60)
+
+    assert incremental_render(df, empty_cache()) == legacy_render(df), "renderings disagree"
+
+    legacy_time = best_of(lambda: legacy_render(df))
+    cold_time = best_of(lambda: incremental_render(df, empty_cache()))
+
+    warm_times = []
+    for _ in range(REPEATS):
+        cache = empty_cache()
+        incremental_render(df, cache)
+        start = time.perf_counter()
+        incremental_render(edited, cache)
+        warm_times.append(time.perf_counter() - start)
+    warm_time = min(warm_times)
+
+    print(f"{'map + apply + tabulate':28}: {legacy_time * 1000:8.1f} ms")
+    print(f"{'vectorized, cold cache':28}: {cold_time * 1000:8.1f} ms  ({legacy_time / cold_time:.0f}x faster)")
+    print(f"{'vectorized, 1 row edited':28}: {warm_time * 1000:8.1f} ms  ({legacy_time / warm_time:.0f}x faster)")
+    print("="*60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Staged Collection Pipeline
+Runs collection as three stages connected by bounded queues:
+
+    fetch (N threads) -> classify (M threads) -> write (1 thread)
+
+Fetchers only do network I/O, classifier workers do the CPU work on each
+page (normalization, diagnosis detection, row building), and a single
+writer applies the results in listing order. Because the queues are
+bounded, a fast stage blocks instead of buffering ahead, so memory stays
+flat however many listings are swept.
+
+Every stage counts the pages and posts it handled and how long it spent
+working versus waiting on its neighbours, which shows where the
+bottleneck is.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Pages buffered between two stages, per classifier worker
+DEFAULT_QUEUE_PAGES = 4
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class PipelineAborted(Exception):
+    """
+    Raised in a stage when another stage has failed
+    """
+
+
+class StageStats:
+    """
+    Throughput counters for one pipeline stage
+    """
+
+    __slots__ = ('name', 'workers', 'items', 'posts', 'busy', 'waiting', '_lock')
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.posts = 0
+        self.busy = 0.0
+        self.waiting = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, items=0, posts=0, busy=0.0, waiting=0.0):
+        with self._lock:
+            self.items += items
+            self.posts += posts
+            self.busy += busy
+            self.waiting += waiting
+
+    def utilization(self, elapsed):
+        """
+        Share of the stage's worker time spent working rather than waiting
+        """
+        if elapsed <= 0:
+            return 0.0
+        return min(1.0, self.busy / (self.workers * elapsed))
+
+    def format(self, elapsed):
+        rate = self.posts / elapsed if elapsed > 0 else 0.0
+        return (f"{self.name:9} {self.workers:3} worker(s) {self.items:7} pages {self.posts:8} posts "
+                f"{rate:9.1f} posts/s  busy {self.utilization(elapsed):4.0%}")
+
+
+class CollectionPipeline:
+    """
+    Fetch -> classify -> write pipeline over bounded queues
+
+    `fetch(job, emit)` runs once per job on a fetch thread and calls
+    `emit(key, seq, payload, posts)` for every page it produces; `seq`
+    numbers the pages of one `key` (a listing) from 0. `classify(payload)`
+    runs on a classifier thread and returns what the writer needs.
+    `write(key, result)` runs on the calling thread and sees each key's
+    results in `seq` order, even though classifiers finish out of order,
+    so a listing's cursor is never saved ahead of its posts.
+    """
+
+    def __init__(self, fetch, classify, write, fetch_workers, classify_workers=2, queue_size=None):
+        self.fetch = fetch
+        self.classify = classify
+        self.write = write
+        self.fetch_workers = fetch_workers
+        self.classify_workers = classify_workers
+        self.queue_size = queue_size or DEFAULT_QUEUE_PAGES * classify_workers
+
+        self.stats = {
+            'fetch': StageStats('fetch', fetch_workers),
+            'classify': StageStats('classify', classify_workers),
+            'write': StageStats('write', 1),
+        }
+        self.elapsed = 0.0
+        self._abort = threading.Event()
+        self._errors = []
+
+    def _fail(self, error):
+        self._errors.append(error)
+        self._abort.set()
+
+    def _put(self, q, item):
+        """
+        Blocking put that gives up once the pipeline is aborted; return seconds blocked
+        """
+        start = time.perf_counter()
+        while True:
+            if self._abort.is_set():
+                raise PipelineAborted()
+            try:
+                q.put(item, timeout=0.2)
+                return time.perf_counter() - start
+            except queue.Full:
+                continue
+
+    def _run_fetch(self, job, classify_queue):
+        if self._abort.is_set():
+            return
+        start = time.perf_counter()
+        blocked = 0.0
+
+        def emit(key, seq, payload, posts=0):
+            nonlocal blocked
+            waited = self._put(classify_queue, (key, seq, payload, posts))
+            blocked += waited
+            self.stats['fetch'].record(items=1, posts=posts)
+
+        try:
+            self.fetch(job, emit)
+        except PipelineAborted:
+            pass
+        finally:
+            self.stats['fetch'].record(busy=time.perf_counter() - start - blocked, waiting=blocked)
+
+    def _run_fetchers(self, jobs, classify_queue):
+        try:
+            with ThreadPoolExecutor(max_workers=self.fetch_workers) as executor:
+                futures = [executor.submit(self._run_fetch, job, classify_queue) for job in jobs]
+                for future in futures:
+                    error = future.exception()
+                    if error is not None:
+                        self._fail(error)
+        finally:
+            for _ in range(self.classify_workers):
+                classify_queue.put(_DONE)
+
+    def _run_classifier(self, classify_queue, write_queue):
+        stats = self.stats['classify']
+        try:
+            while True:
+                start = time.perf_counter()
+                item = classify_queue.get()
+                waited = time.perf_counter() - start
+                if item is _DONE:
+                    stats.record(waiting=waited)
+                    break
+                key, seq, payload, posts = item
+                if self._abort.is_set():
+                    # Drain the queue so fetchers are never left blocked
+                    continue
+                start = time.perf_counter()
+                try:
+                    result = self.classify(payload)
+                except Exception as e:
+                    self._fail(e)
+                    continue
+                busy = time.perf_counter() - start
+                try:
+                    waited += self._put(write_queue, (key, seq, result, posts))
+                except PipelineAborted:
+                    continue
+                stats.record(items=1, posts=posts, busy=busy, waiting=waited)
+        finally:
+            write_queue.put(_DONE)
+
+    def _run_writer(self, write_queue):
+        stats = self.stats['write']
+        next_seq = {}
+        pending = {}
+        finished = 0
+        while finished < self.classify_workers:
+            start = time.perf_counter()
+            item = write_queue.get()
+            waited = time.perf_counter() - start
+            if item is _DONE:
+                finished += 1
+                stats.record(waiting=waited)
+                continue
+            if self._abort.is_set():
+                continue
+
+            key, seq, result, posts = item
+            pending[(key, seq)] = (result, posts)
+            start = time.perf_counter()
+            written = 0
+            written_posts = 0
+            # Release this key's results that are now in sequence
+            seq = next_seq.get(key, 0)
+            while (key, seq) in pending:
+                result, posts = pending.pop((key, seq))
+                try:
+                    self.write(key, result)
+                except Exception as e:
+                    self._fail(e)
+                    break
+                written += 1
+                written_posts += posts
+                seq += 1
+            next_seq[key] = seq
+            stats.record(items=written, posts=written_posts,
+                         busy=time.perf_counter() - start, waiting=waited)
+
+    def run(self, jobs):
+        """
+        Run every job through the pipeline; return the per-stage StageStats
+
+        Re-raises the first error raised by a stage once all stages stopped.
+        """
+        classify_queue = queue.Queue(maxsize=self.queue_size)
+        write_queue = queue.Queue(maxsize=self.queue_size)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=self._run_fetchers, args=(jobs, classify_queue),
+                                    name='pipeline-fetch', daemon=True)]
+        threads += [threading.Thread(target=self._run_classifier, args=(classify_queue, write_queue),
+                                     name=f'pipeline-classify-{i}', daemon=True)
+                    for i in range(self.classify_workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            self._run_writer(write_queue)
+        except BaseException as e:
+            # e.g. KeyboardInterrupt: stop the other stages before leaving
+            self._fail(e)
+            raise
+        finally:
+            for thread in threads:
+                while thread.is_alive():
+                    # Unblock classifiers if the writer stopped early
+                    try:
+                        write_queue.get(timeout=0.1)
+                    except queue.Empty:
+                        pass
+            self.elapsed = time.perf_counter() - start
+
+        if self._errors:
+            raise self._errors[0]
+        return self.stats
+
+    def format_stats(self):
+        """
+        One line per stage; the busiest stage is the bottleneck
+        """
+        return [stats.format(self.elapsed) for stats in self.stats.values()]
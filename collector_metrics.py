@@ -0,0 +1,334 @@
+"""
+Collector Metrics
+Structured instrumentation for collection runs. Counters, gauges and
+latency histograms are kept in memory and can be:
+
+- streamed as JSON lines (one object per request, page, listing and
+  error) with `log_path`
+- served in Prometheus text format on a local port (MetricsServer)
+- summarised in an end-of-run report (Metrics.report)
+
+Metric names, all prefixed with `reddit_collector_` when exported:
+
+    api_requests_total{endpoint,status}        requests answered
+    api_request_seconds{endpoint}              request latency histogram
+    api_retries_total{endpoint,reason}         requests repeated after a 429 or a failed page
+    rate_limit_wait_seconds_total              time spent sleeping for the rate limit
+    rate_limit_remaining                       budget left in Reddit's window
+    posts_fetched_total{subreddit,sort}        posts returned by listings
+    posts_diagnosed_total{subreddit,sort}      of those, classified as diagnosed
+    posts_labelled_total{disorder}             posts newly labelled with a disorder
+    listings_stopped_total{reason}             listings stopped before their end
+    listings_skipped_total{reason}             listings not fetched because their circuit is open
+    circuits_opened_total{reason}              subreddits whose circuit breaker opened
+    comments_fetched_total                     comments read from harvested threads
+    comments_diagnosed_total                   of those, kept for a diagnosis mention
+    errors_total{stage,type}                   failures by stage and exception type
+    stage_busy_seconds{stage}                  pipeline time spent working
+    stage_waiting_seconds{stage}               pipeline time spent waiting
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRIC_PREFIX = 'reddit_collector_'
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram with Prometheus semantics
+    """
+
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = 0
+        while i < len(self.bounds) and value > self.bounds[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """
+        Estimate a quantile by linear interpolation within its bucket
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.bounds + (float('inf'),), self.counts):
+            if count and seen + count >= rank:
+                if bound == float('inf'):
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return lower
+
+
+def _label_key(labels):
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def _join_counts(counts):
+    return ", ".join(f"{name}: {count}" for name, count in sorted(counts.items()))
+
+
+class Metrics:
+    """
+    Thread-safe registry of counters, gauges and histograms
+
+    With `log_path`, every `event` is appended to that file as a JSON line
+    with a `ts` timestamp and an `event` kind.
+    """
+
+    def __init__(self, log_path=None):
+        self.log_path = log_path
+        self.started = time.monotonic()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._log = open(log_path, 'a', encoding='utf-8') if log_path else None
+
+    def close(self):
+        with self._lock:
+            if self._log is not None:
+                self._log.close()
+                self._log = None
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def event(self, kind, **fields):
+        if self._log is None:
+            return
+        line = json.dumps({'ts': round(time.time(), 3), 'event': kind, **fields}, default=str)
+        with self._lock:
+            if self._log is not None:
+                self._log.write(line + '\n')
+                self._log.flush()
+
+    def request(self, endpoint, status, seconds, waited):
+        """
+        Record one answered API request and the rate-limit wait before it
+        """
+        self.inc('api_requests_total', endpoint=endpoint, status=status)
+        self.observe('api_request_seconds', seconds, endpoint=endpoint)
+        if waited:
+            self.inc('rate_limit_wait_seconds_total', waited)
+        self.event('request', endpoint=endpoint, status=status,
+                   seconds=round(seconds, 4), waited=round(waited, 4))
+
+    def error(self, stage, error, **fields):
+        """
+        Record a failure that collection recovers from
+        """
+        self.inc('errors_total', stage=stage, type=type(error).__name__)
+        self.event('error', stage=stage, type=type(error).__name__, message=str(error), **fields)
+
+    def counter(self, name, **labels):
+        """
+        Sum of a counter over every label set matching `labels`
+        """
+        wanted = set(_label_key(labels))
+        with self._lock:
+            return sum(value for (metric, key), value in self._counters.items()
+                       if metric == name and wanted <= set(key))
+
+    def counters(self, name, label):
+        """
+        Map each value of `label` to the counter summed over the other labels
+        """
+        totals = {}
+        with self._lock:
+            for (metric, key), value in self._counters.items():
+                if metric == name:
+                    labels = dict(key)
+                    if label in labels:
+                        totals[labels[label]] = totals.get(labels[label], 0) + value
+        return totals
+
+    def format_prometheus(self):
+        """
+        Every metric in the Prometheus text exposition format
+        """
+        lines = []
+        with self._lock:
+            for kind, series in (('counter', self._counters), ('gauge', self._gauges)):
+                for name in sorted({metric for metric, _ in series}):
+                    lines.append(f'# TYPE {METRIC_PREFIX}{name} {kind}')
+                    for (metric, key), value in sorted(series.items()):
+                        if metric == name:
+                            lines.append(f'{METRIC_PREFIX}{name}{_format_labels(key)} {value}')
+            for name in sorted({metric for metric, _ in self._histograms}):
+                lines.append(f'# TYPE {METRIC_PREFIX}{name} histogram')
+                for (metric, key), histogram in sorted(self._histograms.items(), key=lambda item: item[0]):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.bounds + ('+Inf',), histogram.counts):
+                        cumulative += count
+                        lines.append(f'{METRIC_PREFIX}{name}_bucket{_format_labels(key, [("le", str(bound))])} '
+                                     f'{cumulative}')
+                    lines.append(f'{METRIC_PREFIX}{name}_sum{_format_labels(key)} {histogram.sum}')
+                    lines.append(f'{METRIC_PREFIX}{name}_count{_format_labels(key)} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    def report(self):
+        """
+        Lines of the end-of-run report
+        """
+        elapsed = time.monotonic() - self.started
+        lines = [f"Run time: {elapsed:.1f}s"]
+
+        with self._lock:
+            latency = {dict(key).get('endpoint', ''): histogram
+                       for (metric, key), histogram in self._histograms.items()
+                       if metric == 'api_request_seconds'}
+        requests_by_endpoint = self.counters('api_requests_total', 'endpoint')
+        for endpoint, histogram in sorted(latency.items()):
+            p50, p95, p99 = (histogram.quantile(q) * 1000 for q in (0.5, 0.95, 0.99))
+            lines.append(f"{endpoint:14} {requests_by_endpoint.get(endpoint, 0):7} requests  "
+                         f"p50 {p50:6.0f} ms  p95 {p95:6.0f} ms  p99 {p99:6.0f} ms")
+        failed = {status: count for status, count in self.counters('api_requests_total', 'status').items()
+                  if status != '200'}
+        if failed:
+            lines.append("Non-200 responses: " + _join_counts(failed))
+        retries = self.counters('api_retries_total', 'reason')
+        if retries:
+            lines.append("Retries: " + _join_counts(retries))
+
+        request_time = sum(histogram.sum for histogram in latency.values())
+        waited = self.counter('rate_limit_wait_seconds_total')
+        lines.append(f"Time in requests {request_time:.1f}s, sleeping for the rate limit {waited:.1f}s "
+                     f"(summed over workers)")
+        with self._lock:
+            stages = {}
+            for (metric, key), value in self._gauges.items():
+                if metric in ('stage_busy_seconds', 'stage_waiting_seconds'):
+                    stages.setdefault(dict(key)['stage'], {})[metric] = value
+        for stage, times in stages.items():
+            lines.append(f"{stage:9} busy {times.get('stage_busy_seconds', 0):8.1f}s  "
+                         f"waiting {times.get('stage_waiting_seconds', 0):8.1f}s")
+
+        fetched_by_sort = self.counters('posts_fetched_total', 'sort')
+        diagnosed_by_sort = self.counters('posts_diagnosed_total', 'sort')
+        for sort, fetched in sorted(fetched_by_sort.items()):
+            rate = diagnosed_by_sort.get(sort, 0) / max(fetched, 1)
+            lines.append(f"{sort:6} {fetched:8} posts fetched, {rate:6.1%} diagnosed")
+
+        fetched_by_subreddit = self.counters('posts_fetched_total', 'subreddit')
+        diagnosed_by_subreddit = self.counters('posts_diagnosed_total', 'subreddit')
+        rates = sorted(((diagnosed_by_subreddit.get(name, 0) / max(fetched, 1), name, fetched)
+                        for name, fetched in fetched_by_subreddit.items()), reverse=True)
+        if rates:
+            lines.append("Diagnosis hit rate by subreddit:")
+            lines.extend(f"  r/{name:24} {rate:6.1%} of {fetched} posts" for rate, name, fetched in rates)
+
+        opened = self.counters('circuits_opened_total', 'reason')
+        if opened:
+            lines.append("Circuits opened: " + _join_counts(opened))
+        skipped = self.counter('listings_skipped_total')
+        if skipped:
+            lines.append(f"Listings skipped, circuit open: {skipped}")
+        stopped = self.counters('listings_stopped_total', 'reason')
+        if stopped:
+            lines.append("Listings stopped early: " + _join_counts(stopped))
+        with self._lock:
+            errors = {}
+            for (metric, key), value in self._counters.items():
+                if metric == 'errors_total':
+                    labels = dict(key)
+                    errors[f"{labels['stage']}/{labels['type']}"] = value
+        if errors:
+            lines.append("Errors: " + _join_counts(errors))
+        return lines
+
+
+class MetricsServer:
+    """
+    Serves Metrics in Prometheus text format at /metrics on a background thread
+    """
+
+    def __init__(self, metrics, port=9108, host='127.0.0.1'):
+        self.metrics = metrics
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}/metrics'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _make_handler(self):
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = metrics.format_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
@@ -0,0 +1,139 @@
+"""
+Comment Harvesting
+Many diagnosis self-disclosures ("I was diagnosed last year...") are made
+in comments rather than in the post itself. After the listings are
+collected, the comment threads of every labelled post are fetched and the
+comments that mention a diagnosis are stored, linked to their post.
+
+Threads go through the same CollectionPipeline as listings: fetch threads
+download each thread with one /comments request plus a capped number of
+batched /api/morechildren requests (see RedditClient.fetch_comment_tree),
+classifier workers run diagnosis detection on the comment bodies, and the
+writer stores each thread in one transaction. Harvested threads are
+recorded in the store, so an interrupted or repeated harvest only fetches
+threads it has not seen.
+"""
+
+import csv
+from datetime import datetime
+
+from collection_pipeline import CollectionPipeline, PipelineAborted
+from post_store import COMMENT_COLUMNS
+from reddit_client import COMMENT_LIMIT, DEFAULT_MORE_REQUESTS
+
+
+class ThreadResult:
+    """
+    A harvested thread on its way to the store: kept comment rows and counts
+    """
+
+    __slots__ = ('post_id', 'rows', 'fetched', 'requests', 'unexpanded')
+
+    def __init__(self, post_id, rows, fetched, requests, unexpanded):
+        self.post_id = post_id
+        self.rows = rows
+        self.fetched = fetched
+        self.requests = requests
+        self.unexpanded = unexpanded
+
+
+def build_comment_row(comment):
+    """
+    Convert a fetched comment into an output row
+    """
+    return {
+        'Date': datetime.fromtimestamp(comment.created_utc).strftime('%Y-%m-%d %H:%M:%S'),
+        'Comment': comment.body,
+        'Score': comment.score,
+        'Depth': comment.depth,
+        'By_Author': comment.is_submitter,
+        'URL': f"https://reddit.com{comment.permalink}" if comment.permalink else '',
+    }
+
+
+def classify_thread(tree, classify_batch):
+    """
+    Classifier stage: keep the diagnosed comments of a CommentTree
+    """
+    comments = [comment for comment in tree.comments if comment.body not in ('[deleted]', '[removed]')]
+    verdicts = classify_batch([comment.body for comment in comments])
+    rows = [(comment.id, comment.parent_id, build_comment_row(comment))
+            for comment, diagnosed in zip(comments, verdicts) if diagnosed]
+    return ThreadResult(tree.post_id, rows, len(tree.comments), tree.requests, tree.unexpanded)
+
+
+def harvest_comments(reddit, store, run_id, classify_batch, max_workers, classifier_workers=2,
+                     limit=COMMENT_LIMIT, max_more_requests=DEFAULT_MORE_REQUESTS):
+    """
+    Fetch the comment threads of every labelled post not harvested yet
+
+    `classify_batch` maps a list of texts to diagnosis verdicts. Threads
+    that fail to download are reported and left for the next harvest.
+    Returns (threads, comments kept).
+    """
+    post_ids = store.posts_without_comments()
+    totals = {'threads': 0, 'fetched': 0, 'kept': 0, 'requests': 0, 'unexpanded': 0}
+
+    print(f"\n{'='*60}")
+    print(f"Harvesting comments of {len(post_ids)} post(s)")
+    print(f"Up to {limit} comments per thread plus {max_more_requests} morechildren request(s)")
+    print(f"{'='*60}")
+
+    if not post_ids:
+        return 0, 0
+
+    def fetch(post_id, emit):
+        try:
+            tree = reddit.fetch_comment_tree(post_id, limit, max_more_requests)
+        except PipelineAborted:
+            raise
+        except Exception as e:
+            print(f"    ✗ Error fetching comments of {post_id}: {e}")
+            reddit.metrics.error('comments', e, post_id=post_id)
+            return
+        emit(post_id, 0, tree, len(tree.comments))
+
+    def classify(tree):
+        return classify_thread(tree, classify_batch)
+
+    def write(post_id, result):
+        store.save_comment_thread(run_id, post_id, result.rows, result.fetched,
+                                  result.requests, result.unexpanded)
+        before = totals['threads']
+        totals['threads'] += 1
+        totals['fetched'] += result.fetched
+        totals['kept'] += len(result.rows)
+        totals['requests'] += result.requests
+        totals['unexpanded'] += result.unexpanded
+        reddit.metrics.inc('comments_fetched_total', result.fetched)
+        reddit.metrics.inc('comments_diagnosed_total', len(result.rows))
+        reddit.metrics.event('thread', post_id=post_id, comments=result.fetched, diagnosed=len(result.rows),
+                             requests=result.requests, unexpanded=result.unexpanded)
+        if totals['threads'] // 100 > before // 100:
+            print(f"    ✓ {totals['threads']} threads, {totals['kept']} diagnosed comments so far...")
+
+    pipeline = CollectionPipeline(fetch, classify, write, max_workers, classifier_workers)
+    pipeline.run(post_ids)
+
+    print(f"✓ Harvested {totals['threads']} threads: {totals['fetched']} comments read, "
+          f"{totals['kept']} with a diagnosis mention")
+    print(f"✓ {totals['requests']} API requests; {totals['unexpanded']} comment(s) left unexpanded")
+    for line in pipeline.format_stats():
+        print(f"    {line}")
+    return totals['threads'], totals['kept']
+
+
+def export_comments(store, disorders, output_file):
+    """
+    Write the stored comments of every disorder's posts to one CSV file;
+    returns the number of rows written
+    """
+    count = 0
+    with open(output_file, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Disorder'] + COMMENT_COLUMNS)
+        for disorder_name in disorders:
+            for row in store.load_comments(disorder_name):
+                writer.writerow([disorder_name] + [row[name] for name in COMMENT_COLUMNS])
+                count += 1
+    return count
@@ -0,0 +1,132 @@
+"""
+Corpus Loader
+Loads the shipped per-disorder CSVs (ADHD.csv, Autism.csv, ...) into one
+typed DataFrame. The files are ';'-separated, start with a UTF-8 BOM and
+have multi-line quoted Description fields; those quirks are handled here
+once, with the multi-threaded pyarrow CSV reader.
+
+Each parsed file is cached as an Arrow IPC sidecar in CACHE_DIR, tagged
+with the source file's mtime and size, so repeat loads are a memory-mapped
+read instead of a CSV parse.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+# Disorder name -> shipped CSV file
+CORPUS_FILES = {
+    'ADHD': 'ADHD.csv',
+    'Anxiety': 'Anxiety.csv',
+    'Autism': 'Autism.csv',
+    'Bipolar': 'Bipolar.csv',
+    'Depression': 'depression.csv',
+    'PTSD': 'PTSD.csv',
+}
+
+# Some files have columns that are entirely empty, so types are never inferred
+COLUMN_TYPES = {
+    'Date': pa.timestamp('s'),
+    'Title': pa.string(),
+    'Description': pa.string(),
+    'Subreddit': pa.string(),
+    'Score': pa.int64(),
+    'Num_Comments': pa.int64(),
+    'URL': pa.string(),
+}
+
+CACHE_DIR = '.corpus_cache'
+
+PARSE_OPTIONS = pacsv.ParseOptions(delimiter=';', newlines_in_values=True)
+CONVERT_OPTIONS = pacsv.ConvertOptions(column_types=COLUMN_TYPES,
+                                       timestamp_parsers=['%Y-%m-%d %H:%M:%S'])
+
+
+def read_corpus_csv(path):
+    """
+    Parse one corpus CSV into an Arrow table (the BOM is skipped by pyarrow)
+    """
+    return pacsv.read_csv(path, parse_options=PARSE_OPTIONS, convert_options=CONVERT_OPTIONS)
+
+
+def _source_key(path):
+    stat = os.stat(path)
+    return {b'source_mtime_ns': str(stat.st_mtime_ns).encode(),
+            b'source_size': str(stat.st_size).encode()}
+
+
+def _cache_path(path, cache_dir):
+    return os.path.join(cache_dir, os.path.basename(path) + '.arrow')
+
+
+def _read_cache(cache_file, key):
+    """
+    Return the cached table if it was built from the current source file
+    """
+    if not os.path.exists(cache_file):
+        return None
+    table = pa.ipc.open_file(pa.memory_map(cache_file)).read_all()
+    metadata = table.schema.metadata or {}
+    if any(metadata.get(k) != v for k, v in key.items()):
+        return None
+    return table
+
+
+def _write_cache(cache_file, table):
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    tmp_file = cache_file + '.tmp'
+    with pa.OSFile(tmp_file, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_file, cache_file)
+
+
+def load_disorder_table(path, cache_dir=CACHE_DIR, use_cache=True):
+    """
+    Load one corpus CSV as an Arrow table, via the sidecar cache when fresh
+    """
+    if not use_cache:
+        return read_corpus_csv(path)
+
+    key = _source_key(path)
+    cache_file = _cache_path(path, cache_dir)
+    table = _read_cache(cache_file, key)
+    if table is None:
+        table = read_corpus_csv(path).replace_schema_metadata(key)
+        _write_cache(cache_file, table)
+    return table
+
+
+def load_corpus(data_dir='.', files=None, cache_dir=None, use_cache=True, max_workers=None):
+    """
+    Load the per-disorder CSVs into one DataFrame with a `Disorder` column
+
+    Files are read in parallel. `Disorder` and `Subreddit` are categorical,
+    `Date` is datetime64 and `Score`/`Num_Comments` are nullable Int64
+    (some files leave them empty).
+    """
+    files = files or CORPUS_FILES
+    if cache_dir is None:
+        cache_dir = os.path.join(data_dir, CACHE_DIR)
+    paths = {disorder: os.path.join(data_dir, filename) for disorder, filename in files.items()}
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(paths)) as executor:
+        futures = {disorder: executor.submit(load_disorder_table, path, cache_dir, use_cache)
+                   for disorder, path in paths.items()}
+        tables = {disorder: future.result() for disorder, future in futures.items()}
+
+    disorders = list(tables)
+    parts = []
+    for code, disorder in enumerate(disorders):
+        table = tables[disorder].replace_schema_metadata(None)
+        indices = pa.array([code] * table.num_rows, pa.int32())
+        parts.append(table.append_column(
+            'Disorder', pa.DictionaryArray.from_arrays(indices, pa.array(disorders))))
+    table = pa.concat_tables(parts)
+    table = table.set_column(table.schema.get_field_index('Subreddit'), 'Subreddit',
+                             table.column('Subreddit').dictionary_encode())
+
+    return table.to_pandas(types_mapper={pa.int64(): pd.Int64Dtype()}.get)
@@ -0,0 +1,122 @@
+"""
+Cross-Disorder Deduplication Index
+Run-wide index of every post the collector has seen, keyed on post id and
+optionally on a hash of the post text. A post reached again through
+another disorder's listings (a shared subreddit such as r/mentalhealth, or
+a repost under a new id) is not classified or stored again; it only gains
+an extra disorder label.
+"""
+
+import hashlib
+import re
+import threading
+
+# Shorter texts (e.g. a bare "Help" title) are too generic to hash safely
+MIN_HASHED_CHARS = 80
+
+WHITESPACE = re.compile(r'\s+')
+
+# How DedupIndex.claim saw a post
+NEW = 'new'              # first sighting; the caller classifies it
+DUPLICATE = 'duplicate'  # post id already indexed
+REPOST = 'repost'        # new id, but the same text as an indexed post
+
+
+def content_hash(title, selftext):
+    """
+    Hash of the normalized post text, or None if the text is too short
+    """
+    text = WHITESPACE.sub(' ', f"{title} {selftext}".lower()).strip()
+    if len(text) < MIN_HASHED_CHARS:
+        return None
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=12).hexdigest()
+
+
+class IndexEntry:
+    """
+    What is known about one canonical post
+
+    `diagnosed` is None until the post has been classified.
+    """
+
+    __slots__ = ('canonical_id', 'diagnosed', 'row', 'labels')
+
+    def __init__(self, canonical_id, diagnosed=None, row=None, labels=None):
+        self.canonical_id = canonical_id
+        self.diagnosed = diagnosed
+        self.row = row
+        self.labels = labels if labels is not None else set()
+
+
+class DedupIndex:
+    """
+    Thread-safe map from post ids (and content hashes) to canonical posts
+    """
+
+    def __init__(self, hash_content=False):
+        self.hash_content = hash_content
+        self._by_id = {}
+        self._by_hash = {}
+        self._lock = threading.Lock()
+
+        # Counters for the end-of-run summary
+        self.duplicate_ids = 0
+        self.reposts = 0
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def load(self, entries):
+        """
+        Seed the index from stored (post_id, content_hash, canonical_id, diagnosed, labels) tuples
+        """
+        with self._lock:
+            canonical = {}
+            for post_id, digest, canonical_id, diagnosed, labels in entries:
+                entry = canonical.get(canonical_id)
+                if entry is None:
+                    entry = canonical[canonical_id] = IndexEntry(canonical_id)
+                if post_id == canonical_id:
+                    entry.diagnosed = None if diagnosed is None else bool(diagnosed)
+                    entry.labels.update(labels)
+                self._by_id[post_id] = entry
+                if digest:
+                    self._by_hash.setdefault(digest, entry)
+
+    def claim(self, post_id, title, selftext):
+        """
+        Look a post up, registering it if unseen
+
+        Returns (entry, status, digest) where status is NEW, DUPLICATE or
+        REPOST. Only NEW posts need classifying; the others share the
+        verdict of their canonical entry.
+        """
+        digest = content_hash(title, selftext) if self.hash_content else None
+        with self._lock:
+            entry = self._by_id.get(post_id)
+            if entry is not None:
+                self.duplicate_ids += 1
+                return entry, DUPLICATE, digest
+
+            if digest is not None:
+                entry = self._by_hash.get(digest)
+                if entry is not None:
+                    self.reposts += 1
+                    self._by_id[post_id] = entry
+                    return entry, REPOST, digest
+
+            entry = IndexEntry(post_id)
+            self._by_id[post_id] = entry
+            if digest is not None:
+                self._by_hash[digest] = entry
+            return entry, NEW, digest
+
+    def add_label(self, entry, disorder):
+        """
+        Attach a disorder label; return True if the entry did not have it yet
+        """
+        with self._lock:
+            if disorder in entry.labels:
+                return False
+            entry.labels.add(disorder)
+            return True
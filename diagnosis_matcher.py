@@ -0,0 +1,155 @@
+"""
+Diagnosis Keyword Matcher
+Compiles a list of diagnosis keyword patterns once so that a post is
+scanned a single time, no matter how many keywords are configured
+"""
+
+import re
+from collections import namedtuple
+
+# A single keyword hit inside a text (offsets index the lowercased text)
+DiagnosisMatch = namedtuple('DiagnosisMatch', ['keyword', 'start', 'end', 'text'])
+
+# Keywords of the form r'\bsome phrase\b' with no other regex syntax
+LITERAL_KEYWORD = re.compile(r'^\\b([a-z0-9 \']+)\\b$')
+
+
+class DiagnosisMatcher:
+    """
+    Single-pass matcher over a list of diagnosis keyword patterns
+
+    Keywords follow the DIAGNOSIS_KEYWORDS convention: lowercase regular
+    expressions applied to the lowercased post text.
+
+    Two regexes are compiled:
+    - a locator, one alternation with a named group per keyword, used to
+      report which keywords matched and where
+    - a detector, used for the yes/no question. When every keyword is a
+      plain word-bounded phrase, phrases that contain another keyword (e.g.
+      'formally diagnosed' contains 'diagnosed') can never change the answer
+      and are dropped, and the remaining phrases double as a substring
+      prefilter so posts without any of them are rejected without running
+      the regex at all.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        if not self.keywords:
+            raise ValueError("DiagnosisMatcher needs at least one keyword")
+
+        phrases = [LITERAL_KEYWORD.match(k) for k in self.keywords]
+        if all(phrases):
+            phrases = [p.group(1) for p in phrases]
+            self._locator = self._compile_literal_locator(phrases)
+            self._prefilter = self._minimal_phrases(phrases)
+            self._detector = re.compile(
+                r'\b(?:' + '|'.join(sorted(self._prefilter, key=len, reverse=True)) + r')\b'
+            )
+        else:
+            self._locator = self._compile_locator()
+            self._prefilter = None
+            self._detector = self._locator
+
+        self._group_to_keyword = {f'k{i}': keyword for i, keyword in enumerate(self.keywords)}
+        # Each keyword on its own, for the hits the locator's alternation hides
+        self._keyword_patterns = [(keyword, re.compile(keyword)) for keyword in dict.fromkeys(self.keywords)]
+
+    def _compile_locator(self):
+        # Longest pattern first so specific phrases win ties at one position
+        order = sorted(range(len(self.keywords)), key=lambda i: -len(self.keywords[i]))
+        return re.compile('|'.join(f'(?P<k{i}>{self.keywords[i]})' for i in order))
+
+    def _compile_literal_locator(self, phrases):
+        # Hoisting the shared \b out of the alternation lets the regex engine
+        # skip ahead on the first character instead of trying every branch
+        order = sorted(range(len(phrases)), key=lambda i: -len(phrases[i]))
+        return re.compile(r'\b(?:' + '|'.join(f'(?P<k{i}>{phrases[i]})' for i in order) + r')\b')
+
+    @staticmethod
+    def _minimal_phrases(phrases):
+        """
+        Drop phrases that contain another phrase as a whole-word substring
+        """
+        minimal = []
+        for phrase in set(phrases):
+            subsumed = any(
+                other != phrase and re.search(r'\b' + re.escape(other) + r'\b', phrase)
+                for other in phrases
+            )
+            if not subsumed:
+                minimal.append(phrase)
+        return tuple(sorted(minimal))
+
+    def _passes_prefilter(self, text_lower):
+        prefilter = self._prefilter
+        if prefilter is None:
+            return True
+        for phrase in prefilter:
+            if phrase in text_lower:
+                return True
+        return False
+
+    def _detect(self, text_lower):
+        if not self._passes_prefilter(text_lower):
+            return False
+        return self._detector.search(text_lower) is not None
+
+    def is_diagnosed(self, text):
+        """
+        Return True if any keyword occurs in the text
+        """
+        if not text:
+            return False
+        return self._detect(text.lower())
+
+    def find_all(self, text):
+        """
+        Return every non-overlapping keyword hit in the text, left to right
+
+        First-match semantics: at each position the longest keyword wins, and
+        keywords nested inside or overlapping an earlier hit are not reported
+        (use matched_keywords for the full set).
+        """
+        if not text:
+            return []
+        text_lower = text.lower()
+        if not self._passes_prefilter(text_lower):
+            return []
+        group_to_keyword = self._group_to_keyword
+        return [
+            DiagnosisMatch(group_to_keyword[m.lastgroup], m.start(), m.end(), m.group())
+            for m in self._locator.finditer(text_lower)
+        ]
+
+    def matched_keywords(self, text):
+        """
+        Return the set of distinct keywords found in the text
+
+        Includes keywords that only occur nested inside or overlapping
+        another hit, as if each keyword were searched for on its own.
+        """
+        hits = self.find_all(text)
+        if not hits:
+            return set()
+        found = {match.keyword for match in hits}
+        text_lower = text.lower()
+        for keyword, pattern in self._keyword_patterns:
+            if keyword not in found and pattern.search(text_lower):
+                found.add(keyword)
+        return found
+
+    def classify_batch(self, texts):
+        """
+        Classify many texts at once, returning one boolean per text
+
+        Attribute lookups are bound once for the whole batch so a page set of
+        a few thousand posts is classified in a single comprehension.
+        """
+        detect = self._detect
+        return [bool(text) and detect(text.lower()) for text in texts]
+
+    def find_all_batch(self, texts):
+        """
+        Return the keyword hits for each text in the batch
+        """
+        return [self.find_all(text) for text in texts]
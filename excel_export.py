@@ -0,0 +1,111 @@
+"""
+Streaming Excel Export
+Writes the per-disorder sheets in a single pass with an openpyxl
+write-only workbook. Header styles, column widths and the Description wrap
+format are applied while rows are written, so the file never has to be
+loaded back in to be formatted.
+"""
+
+from copy import copy
+from operator import itemgetter
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill
+from openpyxl.utils import get_column_letter
+
+# Output columns and their widths, in sheet order
+COLUMNS = [
+    ('Date', 20),
+    ('Title', 50),
+    ('Description', 80),
+    ('Subreddit', 20),
+    ('Score', 12),
+    ('Num_Comments', 15),
+    ('URL', 60),
+]
+COLUMN_NAMES = [name for name, _ in COLUMNS]
+
+# Header styling
+HEADER_FILL = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+HEADER_FONT = Font(bold=True, color="FFFFFF")
+HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='center')
+
+# Wrap text in Description column
+WRAP_ALIGNMENT = Alignment(wrap_text=True, vertical='top')
+
+# Excel sheet name limit
+MAX_SHEET_NAME = 31
+
+
+def sort_newest_first(posts_data):
+    """
+    Sort rows by date, newest first
+
+    Dates are 'YYYY-MM-DD HH:MM:SS' strings, which sort chronologically as
+    plain text, so no datetime round trip is needed.
+    """
+    return sorted(posts_data, key=itemgetter('Date'), reverse=True)
+
+
+def _styled_cell(ws, value, template):
+    cell = WriteOnlyCell(ws, value)
+    # Reuse the template's registered style instead of re-registering
+    # Alignment objects on every row
+    cell._style = copy(template._style)
+    return cell
+
+
+def write_sheet(wb, sheet_name, rows):
+    """
+    Append one formatted sheet to a write-only workbook; return the row count
+
+    `rows` may be any iterable of row dicts, or of value tuples in
+    COLUMN_NAMES order, already in output order.
+    """
+    ws = wb.create_sheet(sheet_name[:MAX_SHEET_NAME])
+
+    # Column widths must be set before the first row is written
+    for i, (_, width) in enumerate(COLUMNS, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = width
+
+    header = []
+    for name in COLUMN_NAMES:
+        cell = WriteOnlyCell(ws, name)
+        cell.fill = HEADER_FILL
+        cell.font = HEADER_FONT
+        cell.alignment = HEADER_ALIGNMENT
+        header.append(cell)
+    ws.append(header)
+
+    wrap_template = WriteOnlyCell(ws)
+    wrap_template.alignment = WRAP_ALIGNMENT
+
+    count = 0
+    for row in rows:
+        if isinstance(row, dict):
+            row = [row[name] for name in COLUMN_NAMES]
+        date, title, description, subreddit, score, num_comments, url = row
+        ws.append([
+            date,
+            title,
+            _styled_cell(ws, description, wrap_template),
+            subreddit,
+            score,
+            num_comments,
+            url,
+        ])
+        count += 1
+    return count
+
+
+def write_workbook(sheets, output_file):
+    """
+    Stream (sheet_name, rows) pairs into a formatted workbook
+    """
+    wb = Workbook(write_only=True)
+    counts = {}
+    for sheet_name, rows in sheets:
+        counts[sheet_name] = write_sheet(wb, sheet_name, rows)
+    wb.save(output_file)
+    return counts
@@ -1,50 +1,62 @@
+"""
+Regenerate the dataset directory in README.md from data_sources.xlsx
+
+Every source row is fingerprinted and its rendered Markdown cells are
+cached in CACHE_FILE, so only rows that were added or changed since the
+last run are re-rendered. README.md is rewritten only when the table
+actually changes; otherwise the file (and its Last Update timestamp) is
+left alone.
+
+    python excel_to_markdown.py          # incremental
+    python excel_to_markdown.py --full   # ignore the row cache
+"""
 
 ## Imports
-import pandas as pd
-from tabulate import tabulate
+import argparse
+import json
+import os
+import re
 from datetime import datetime
 
-## Read Data
-df = pd.read_excel("data_sources.xlsx")
-
-## Format Cells
-newline_replace = lambda x: x.replace("\n","<br/>") if not isinstance(x, float) else x
-strip_space = lambda x: x.strip() if not isinstance(x, float) else x
-columns_to_format = ["Paper",
-                     "Authors",
-                     "Platform",
-                     "Target Outcomes",
-                     "Labeling Methodology",
-                     "Size",
-                     "Availability",
-                     "Additional Comments",
-                     "Dataset Link (if any)",
-                     "Reference Link"]
-for col in columns_to_format:
-    df[col] = df[col].map(newline_replace)
-    df[col] = df[col].map(strip_space)
-
-## Link in Title
-title_formatter = lambda row: "[{}]({})".format(row["Paper"], row["Reference Link"])
-df["Paper"] = df.apply(title_formatter, axis = 1)
-
-## Subset Columns
-col_subset = ["Paper",
-              "Authors",
-              "Platform",
-              "Year",
-              "Target Outcomes"]
-df = df[col_subset].copy()
-
-## Sort by Date
-df = df.sort_values("Year", ascending=False)
-df = df.reset_index(drop=True)
-
-## Generate Markdown Table
-md_table = tabulate(df, tablefmt="pipe", headers="keys", showindex="never")
+import numpy as np
+import pandas as pd
+
+try:
+    # tabulate measures cells with wcwidth when it is installed; so do we
+    from wcwidth import wcswidth
+except ImportError:
+    wcswidth = len
 
-## Output
-md_output = """
+## Globals
+SOURCE_FILE = "data_sources.xlsx"
+OUTPUT_FILE = "README.md"
+CACHE_FILE = os.path.join(".readme_cache", "rows.json")
+
+# Bumped whenever cell rendering changes, so stale cached cells are dropped
+CACHE_VERSION = 1
+
+# Table columns, and how they are aligned in the pipe table
+TABLE_COLUMNS = ["Paper",
+                 "Authors",
+                 "Platform",
+                 "Year",
+                 "Target Outcomes"]
+RIGHT_ALIGNED = {"Year"}
+
+# Source columns a rendered row depends on
+SOURCE_COLUMNS = ["Paper",
+                  "Reference Link",
+                  "Authors",
+                  "Platform",
+                  "Year",
+                  "Target Outcomes"]
+
+# Headers are padded to at least their width plus this, as tabulate does
+MIN_PADDING = 2
+
+LAST_UPDATE = re.compile(r"^\*\*Last Update\*\*: (.*)$", re.MULTILINE)
+
+HEADER = """
 # Mental Health Datasets
 
 The information below is an evolving list of data sets (primarily from electronic/social media) that have been used to model mental-health phenomena. The raw data (with additional columns) can be found in `data_sources.xlsx`. If you are an author of any of these papers and feel that anything is misrepresented, please do not hesitate to reach out to me at kharrigian@jhu.edu.
@@ -67,12 +79,179 @@ We hope this repository becomes the central knowledge base for researchers worki
 You can view our backlog of literature that needs annotation [here](https://docs.google.com/spreadsheets/d/1KI-LlcTw5YCS0iuPEkCUD29z0XdZnqw91iWxyY8Y-jw/edit?usp=sharing). To annotate one of these papers, or to annotate a paper we haven't yet identified, please begin by updating the backlog to note that you are taking responsibility for a paper's annotation. After, you can use our [standardized annotation form](https://docs.google.com/forms/d/e/1FAIpQLSfgN5pPivsNvWBsO3YZBx8H91nrBHTd0bWI2Ao1X9KPhlUWsQ/viewform?usp=sf_link) to make a submission that will be reviewed and published within the main directory.
 
 ## Dataset Directory
-"""+"""
+"""
+
+## Cache
+def source_key(path):
+    """
+    Identify the current version of the source file
+    """
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+def load_cache(path=CACHE_FILE):
+    """
+    Return the row cache, or an empty one if missing or stale
+    """
+    empty = {"version": CACHE_VERSION, "source": None, "order": [], "rows": {}}
+    if not os.path.exists(path):
+        return empty
+    try:
+        with open(path, encoding="utf-8") as the_file:
+            cache = json.load(the_file)
+    except (OSError, ValueError):
+        return empty
+    if cache.get("version") != CACHE_VERSION:
+        return empty
+    return cache
+
+def save_cache(cache, path=CACHE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as the_file:
+        json.dump(cache, the_file)
+    os.replace(tmp_path, path)
+
+## Rendering
+def read_sources(path=SOURCE_FILE):
+    """
+    Read the source rows that make up the table, sorted by year (newest first)
+
+    Cells are read as text (an entry of "None" stays "None") and papers of
+    the same year keep their spreadsheet order.
+    """
+    df = pd.read_excel(path, keep_default_na=False)
+    df = df[SOURCE_COLUMNS].copy()
+    df = df.sort_values("Year", ascending=False, kind="mergesort")
+    return df.reset_index(drop=True)
+
+def fingerprint_rows(df):
+    """
+    One hex fingerprint per row, from the columns the row is rendered from
+    """
+    hashes = pd.util.hash_pandas_object(df[SOURCE_COLUMNS].astype(str), index=False)
+    return [format(h, "016x") for h in hashes.to_numpy()]
+
+def format_cells(df):
+    """
+    Render the table cells for a frame of source rows (column-wise)
+    """
+    text = {col: df[col].astype(str).str.replace("\n", "<br/>", regex=False).str.strip()
+            for col in SOURCE_COLUMNS if col != "Year"}
+    cells = pd.DataFrame({
+        "Paper": "[" + text["Paper"] + "](" + text["Reference Link"] + ")",
+        "Authors": text["Authors"],
+        "Platform": text["Platform"],
+        "Year": df["Year"].astype(str).str.strip(),
+        "Target Outcomes": text["Target Outcomes"],
+    })
+    return cells[TABLE_COLUMNS]
+
+def render_cells(df, cache, full=False):
+    """
+    Return the cells of every row, rendering only rows missing from the cache
+
+    The cache is updated in place: new rows are added and rows no longer in
+    the source are dropped. Returns (cells, rendered_count).
+    """
+    fingerprints = fingerprint_rows(df)
+    rows = {} if full else cache["rows"]
+    missing = [i for i, fp in enumerate(fingerprints) if fp not in rows]
+    if missing:
+        rendered = format_cells(df.iloc[missing]).to_numpy().tolist()
+        for i, row in zip(missing, rendered):
+            rows[fingerprints[i]] = row
+    cache["rows"] = {fp: rows[fp] for fp in fingerprints}
+    cache["order"] = fingerprints
+    cells = pd.DataFrame([rows[fp] for fp in fingerprints], columns=TABLE_COLUMNS, dtype=object)
+    return cells, len(missing)
+
+def display_width(values):
+    """
+    Terminal width of each cell; only non-ASCII cells need wcwidth
+    """
+    widths = values.str.len()
+    wide = values.str.contains(r"[^\x00-\x7f]")
+    if wide.any():
+        widths[wide] = values[wide].map(wcswidth)
+    return widths.to_numpy()
+
+def layout_table(cells):
+    """
+    Lay out rendered cells as a padded Markdown pipe table
+    """
+    columns = []
+    separators = []
+    headers = []
+    for col in TABLE_COLUMNS:
+        values = cells[col].astype(str)
+        widths = display_width(values)
+        width = max(len(col) + MIN_PADDING, int(widths.max()) if len(widths) else 0)
+        padding = np.array([" " * n for n in range(width + 1)], dtype=object)[width - widths]
+        if col in RIGHT_ALIGNED:
+            columns.append(padding + values.to_numpy(dtype=object))
+            headers.append(col.rjust(width))
+            separators.append("-" * (width + 1) + ":")
+        else:
+            columns.append(values.to_numpy(dtype=object) + padding)
+            headers.append(col.ljust(width))
+            separators.append(":" + "-" * (width + 1))
+    lines = ["| " + " | ".join(headers) + " |",
+             "|" + "|".join(separators) + "|"]
+    if len(cells):
+        body = "| " + columns[0]
+        for column in columns[1:]:
+            body = body + " | " + column
+        lines.extend((body + " |").tolist())
+    return "\n".join(lines)
+
+def render_readme(md_table, timestamp):
+    return HEADER + """
 **Last Update**: {}
 
 {}
-""".format(datetime.now().isoformat(), md_table)
+""".format(timestamp, md_table)
+
+## Output
+def update_readme(source=SOURCE_FILE, output=OUTPUT_FILE, cache_file=CACHE_FILE, full=False):
+    """
+    Regenerate the README table; return (rendered_rows, total_rows, written)
+
+    If the source file is unchanged since the last run, the table is laid
+    out from the cached cells without reading the spreadsheet at all.
+    """
+    cache = load_cache(cache_file)
+    key = source_key(source)
+    if not full and cache["source"] == key and all(fp in cache["rows"] for fp in cache["order"]):
+        cells = pd.DataFrame([cache["rows"][fp] for fp in cache["order"]], columns=TABLE_COLUMNS, dtype=object)
+        rendered = 0
+    else:
+        cells, rendered = render_cells(read_sources(source), cache, full)
+        cache["source"] = key
+        save_cache(cache, cache_file)
+    md_table = layout_table(cells)
+
+    existing = None
+    if os.path.exists(output):
+        with open(output, encoding="utf-8") as the_file:
+            existing = the_file.read()
+    if existing is not None:
+        previous = LAST_UPDATE.search(existing)
+        if previous and render_readme(md_table, previous.group(1)) == existing:
+            return rendered, len(cells), False
+
+    with open(output, "w", encoding="utf-8") as the_file:
+        the_file.write(render_readme(md_table, datetime.now().isoformat()))
+    return rendered, len(cells), True
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate the README dataset table from data_sources.xlsx")
+    parser.add_argument("--full", action="store_true", help="Re-render every row, ignoring the row cache")
+    args = parser.parse_args()
+
+    rendered, total, written = update_readme(full=args.full)
+    status = "updated" if written else "unchanged"
+    print(f"Rendered {rendered} of {total} rows; {OUTPUT_FILE} {status}")
 
-## Write Out
-with open("README.md", "w") as the_file:
-    the_file.write(md_output)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,483 @@
+"""
+Fake Reddit Listing Server
+Local stand-in for Reddit's listing API used to exercise the collector
+without credentials or network access. Serves deterministic synthetic
+posts for any subreddit, their comment threads (/comments/<id> and
+/api/morechildren) and reports rate-limit headers like Reddit does.
+Faults can be injected to exercise retries and the circuit breaker: a
+share of requests answered with 5xx errors or dropped connections, and
+subreddits answering as private, quarantined or banned.
+
+Run standalone:
+    python fake_reddit_server.py --port 8765
+Then point the collector at it:
+    python reddit_mental_health_collector.py --api-url http://127.0.0.1:8765
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Reddit stops serving a listing after roughly 1000 items
+MAX_LISTING_ITEMS = 1000
+
+# Comment ids /api/morechildren accepts per request
+MAX_MORECHILDREN = 100
+
+# Reply depth served with a thread before 'continue this thread' stubs
+DEFAULT_COMMENT_DEPTH = 10
+
+# Statuses Reddit answers for subreddits that cannot be read
+UNAVAILABLE_STATUSES = {'private': 403, 'quarantined': 403, 'banned': 404}
+
+# Server errors injected with `error_rate`
+INJECTED_ERRORS = (500, 502, 503, 504)
+
+FILLER_SENTENCES = [
+    "Some days are harder than others.",
+    "I have been struggling to keep up with work lately.",
+    "Does anyone else feel this way after a long week?",
+    "My sleep schedule has been all over the place.",
+    "I finally talked to a friend about it and it helped a little.",
+    "Looking for advice on how to manage this.",
+]
+
+DIAGNOSED_SENTENCES = [
+    "I was diagnosed last year by my psychiatrist.",
+    "Just got my diagnosis and I am still processing it.",
+    "I was formally diagnosed as an adult.",
+    "My therapist diagnosed me after a few sessions.",
+]
+
+
+class FakeRedditData:
+    """
+    Deterministic synthetic posts per subreddit
+
+    `subreddit_ratios` overrides `diagnosed_ratio` for individual
+    subreddits (keys are case-insensitive).
+    """
+
+    def __init__(self, posts_per_subreddit=1500, diagnosed_ratio=0.3, seed=0, subreddit_ratios=None):
+        self.posts_per_subreddit = posts_per_subreddit
+        self.diagnosed_ratio = diagnosed_ratio
+        self.subreddit_ratios = {name.lower(): ratio for name, ratio in (subreddit_ratios or {}).items()}
+        self.seed = seed
+        self._pools = {}
+        self._posts_by_id = {}
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, subreddit):
+        with self._lock:
+            if subreddit not in self._pools:
+                self._pools[subreddit] = self._generate(subreddit)
+                self._posts_by_id.update((p['id'], p) for p in self._pools[subreddit]['new'])
+            return self._pools[subreddit]
+
+    def _generate(self, subreddit):
+        rng = random.Random(f'{self.seed}:{subreddit.lower()}')
+        now = int(time.time())
+        prefix = format(zlib.crc32(subreddit.lower().encode('utf-8')), 'x')
+        diagnosed_ratio = self.subreddit_ratios.get(subreddit.lower(), self.diagnosed_ratio)
+        posts = []
+        for i in range(self.posts_per_subreddit):
+            post_id = f'{prefix}{i:05d}'
+            sentences = rng.sample(FILLER_SENTENCES, 3)
+            if rng.random() < diagnosed_ratio:
+                sentences.insert(rng.randrange(4), rng.choice(DIAGNOSED_SENTENCES))
+            posts.append({
+                'id': post_id,
+                'name': f't3_{post_id}',
+                'title': f'Post {i} in r/{subreddit}',
+                'selftext': ' '.join(sentences),
+                'created_utc': float(now - i * 3600 - rng.randrange(3600)),
+                'permalink': f'/r/{subreddit}/comments/{post_id}/post_{i}/',
+                'score': rng.randrange(0, 5000),
+                'num_comments': rng.randrange(0, 300),
+                'subreddit': subreddit,
+                'author': f'user{rng.randrange(self.posts_per_subreddit // 3 + 1)}',
+            })
+        return {
+            'new': posts,
+            'top': sorted(posts, key=lambda p: -p['score']),
+            'hot': sorted(posts, key=lambda p: -(p['score'] + p['num_comments'] * 10) / (1 + (now - p['created_utc']) / 86400)),
+        }
+
+    def _thread(self, post_id):
+        """
+        Return (post, comments by id, child comments by parent fullname,
+        subtree sizes by comment fullname)
+
+        A post gets `num_comments` comments; a reply's parent is picked at
+        random among the comments before it.
+        """
+        with self._lock:
+            post = self._posts_by_id.get(post_id)
+            if post is None:
+                return None
+            if post_id in self._threads:
+                return self._threads[post_id]
+        rng = random.Random(f'{self.seed}:comments:{post_id}')
+        by_id = {}
+        children = {post['name']: []}
+        ordered = []
+        for i in range(post['num_comments']):
+            comment_id = f'{post_id}c{i:x}'
+            parent = rng.choice(ordered) if ordered and rng.random() < 0.6 else None
+            sentences = rng.sample(FILLER_SENTENCES, 2)
+            if rng.random() < self.diagnosed_ratio / 2:
+                sentences.insert(rng.randrange(3), rng.choice(DIAGNOSED_SENTENCES))
+            comment = {
+                'id': comment_id,
+                'name': f't1_{comment_id}',
+                'parent_id': parent['name'] if parent else post['name'],
+                'link_id': post['name'],
+                'body': ' '.join(sentences),
+                'created_utc': post['created_utc'] + rng.randrange(60, 3 * 86400),
+                'score': rng.randrange(-5, 500),
+                'depth': parent['depth'] + 1 if parent else 0,
+                'is_submitter': rng.random() < 0.1,
+                'author': f'user{rng.randrange(self.posts_per_subreddit // 3 + 1)}',
+                'permalink': f"{post['permalink']}{comment_id}/",
+            }
+            by_id[comment_id] = comment
+            children[comment['name']] = []
+            children[comment['parent_id']].append(comment)
+            ordered.append(comment)
+        sizes = {}
+        for comment in reversed(ordered):
+            sizes[comment['name']] = 1 + sum(sizes[kid['name']] for kid in children[comment['name']])
+        with self._lock:
+            return self._threads.setdefault(post_id, (post, by_id, children, sizes))
+
+    def comments(self, post_id, limit=200, depth=DEFAULT_COMMENT_DEPTH):
+        """
+        Return (post, comment things) the way /comments/<id> nests them
+
+        The first `limit` comments in thread order are included; the rest
+        of each reply list is left behind a 'more' stub listing its ids,
+        and replies deeper than `depth` behind a 'continue this thread'
+        stub without ids.
+        """
+        thread = self._thread(post_id)
+        if thread is None:
+            return None
+        post, _, children, sizes = thread
+        budget = limit
+
+        def render(parent_name, level):
+            nonlocal budget
+            kids = children[parent_name]
+            things = []
+            for i, comment in enumerate(kids):
+                if level >= depth or budget <= 0:
+                    rest = kids[i:]
+                    ids = [kid['id'] for kid in rest] if level < depth else []
+                    things.append(_more_stub(parent_name, level, ids, sum(sizes[kid['name']] for kid in rest)))
+                    break
+                budget -= 1
+                replies = render(comment['name'], level + 1)
+                data = dict(comment, replies=_listing(replies) if replies else '')
+                things.append({'kind': 't1', 'data': data})
+            return things
+
+        return post, render(post['name'], 0)
+
+    def more_children(self, post_id, comment_ids):
+        """
+        Return the flat things /api/morechildren sends for `comment_ids`
+
+        Each requested comment comes with a 'more' stub for its replies.
+        """
+        thread = self._thread(post_id)
+        if thread is None:
+            return None
+        _, by_id, children, sizes = thread
+        things = []
+        for comment_id in comment_ids:
+            comment = by_id.get(comment_id)
+            if comment is None:
+                continue
+            things.append({'kind': 't1', 'data': dict(comment, replies='')})
+            kids = children[comment['name']]
+            if kids:
+                things.append(_more_stub(comment['name'], comment['depth'] + 1, [kid['id'] for kid in kids],
+                                         sizes[comment['name']] - 1))
+        return things
+
+    def listing(self, subreddit, sort, after=None, limit=100):
+        """
+        Return (children, after) for one page of a listing
+        """
+        posts = self._pool(subreddit).get(sort)
+        if posts is None:
+            return None
+        posts = posts[:MAX_LISTING_ITEMS]
+        start = 0
+        if after:
+            names = [p['name'] for p in posts]
+            start = names.index(after) + 1 if after in names else len(posts)
+        page = posts[start:start + limit]
+        next_after = page[-1]['name'] if page and start + limit < len(posts) else None
+        return [{'kind': 't3', 'data': p} for p in page], next_after
+
+
+def _listing(children):
+    return {'kind': 'Listing', 'data': {'after': None, 'before': None, 'children': children}}
+
+
+def _more_stub(parent_name, depth, ids, count):
+    return {'kind': 'more', 'data': {'id': ids[0] if ids else '_', 'name': f"t1_{ids[0] if ids else '_'}",
+                                     'parent_id': parent_name, 'depth': depth,
+                                     'count': count, 'children': ids}}
+
+
+class RateLimitWindow:
+    """
+    Fixed-window request quota reported through X-Ratelimit-* headers
+    """
+
+    def __init__(self, quota=600, window=600, clock=time.monotonic):
+        self.quota = quota
+        self.window = window
+        self._clock = clock
+        self._window_start = clock()
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def consume(self):
+        """
+        Count one request; return (allowed, headers)
+        """
+        with self._lock:
+            now = self._clock()
+            if now - self._window_start >= self.window:
+                self._window_start = now
+                self.used = 0
+            allowed = self.used < self.quota
+            if allowed:
+                self.used += 1
+            reset = max(int(self.window - (now - self._window_start)), 1)
+            headers = {
+                'X-Ratelimit-Used': str(self.used),
+                'X-Ratelimit-Remaining': str(max(self.quota - self.used, 0)),
+                'X-Ratelimit-Reset': str(reset),
+            }
+            return allowed, headers
+
+
+class FakeRedditServer:
+    """
+    Threaded HTTP server serving FakeRedditData listings
+
+    Usage:
+        with FakeRedditServer() as server:
+            client = RedditClient('id', 'secret', 'ua', api_url=server.base_url,
+                                  token_url=server.token_url)
+    """
+
+    def __init__(self, data=None, quota=600, window=600, latency=0.0, host='127.0.0.1', port=0,
+                 error_rate=0.0, drop_rate=0.0, unavailable=None, seed=0):
+        self.data = data or FakeRedditData()
+        self.rate_limit = RateLimitWindow(quota, window)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.drop_rate = drop_rate
+        # Lowercased subreddit name -> 'private', 'quarantined' or 'banned'
+        self.unavailable = {name.lower(): reason for name, reason in (unavailable or {}).items()}
+        self.request_count = 0
+        self.faults_injected = 0
+        self._rng = random.Random(seed)
+        self._count_lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def token_url(self):
+        return f'{self.base_url}/api/v1/access_token'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _count_request(self):
+        with self._count_lock:
+            self.request_count += 1
+
+    def _draw_fault(self):
+        """
+        'drop', an injected 5xx status, or None for a normal response
+        """
+        with self._count_lock:
+            draw = self._rng.random()
+            if draw < self.drop_rate:
+                fault = 'drop'
+            elif draw < self.drop_rate + self.error_rate:
+                fault = self._rng.choice(INJECTED_ERRORS)
+            else:
+                return None
+            self.faults_injected += 1
+            return fault
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                self.rfile.read(length)
+                if urlparse(self.path).path == '/api/v1/access_token':
+                    self._send_json(200, {'access_token': 'fake-token', 'token_type': 'bearer',
+                                          'expires_in': 86400, 'scope': '*'})
+                else:
+                    self._send_json(404, {'error': 404})
+
+            def do_GET(self):
+                server._count_request()
+                if server.latency:
+                    time.sleep(server.latency)
+
+                url = urlparse(self.path)
+                parts = [p for p in url.path.split('/') if p]
+                if parts == ['api', 'morechildren']:
+                    route = self._more_children
+                elif len(parts) == 2 and parts[0] == 'comments':
+                    route = self._comments
+                elif len(parts) == 3 and parts[0] == 'r':
+                    route = self._listing
+                else:
+                    self._send_json(404, {'error': 404})
+                    return
+
+                allowed, headers = server.rate_limit.consume()
+                if not allowed:
+                    self._send_json(429, {'error': 429, 'message': 'Too Many Requests'}, headers)
+                    return
+                if route == self._listing and parts[1].lower() in server.unavailable:
+                    reason = server.unavailable[parts[1].lower()]
+                    status = UNAVAILABLE_STATUSES[reason]
+                    self._send_json(status, {'reason': reason, 'message': 'Forbidden', 'error': status}, headers)
+                    return
+                fault = server._draw_fault()
+                if fault == 'drop':
+                    # Close the connection without answering
+                    self.close_connection = True
+                    return
+                if fault is not None:
+                    self._send_json(fault, {'error': fault, 'message': 'Injected fault'}, headers)
+                    return
+                route(parts, parse_qs(url.query), headers)
+
+            def _comments(self, parts, query, headers):
+                limit = int(query.get('limit', ['200'])[0])
+                depth = int(query.get('depth', [str(DEFAULT_COMMENT_DEPTH)])[0])
+                result = server.data.comments(parts[1], limit, depth)
+                if result is None:
+                    self._send_json(404, {'error': 404}, headers)
+                    return
+                post, things = result
+                self._send_json(200, [_listing([{'kind': 't3', 'data': post}]), _listing(things)], headers)
+
+            def _more_children(self, parts, query, headers):
+                link_id = query.get('link_id', [''])[0]
+                ids = [i for i in query.get('children', [''])[0].split(',') if i]
+                if len(ids) > MAX_MORECHILDREN:
+                    self._send_json(200, {'json': {'errors': [['TOO_MANY', 'too many children', 'children']]}},
+                                    headers)
+                    return
+                things = server.data.more_children(link_id.partition('_')[2], ids)
+                if things is None:
+                    self._send_json(404, {'error': 404}, headers)
+                    return
+                self._send_json(200, {'json': {'errors': [], 'data': {'things': things}}}, headers)
+
+            def _listing(self, parts, query, headers):
+                limit = int(query.get('limit', ['25'])[0])
+                after = query.get('after', [None])[0]
+                result = server.data.listing(parts[1], parts[2], after=after, limit=limit)
+                if result is None:
+                    self._send_json(404, {'error': 404}, headers)
+                    return
+
+                children, next_after = result
+                self._send_json(200, {'kind': 'Listing',
+                                      'data': {'after': next_after, 'dist': len(children),
+                                               'children': children, 'before': None}}, headers)
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Reddit listing server")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--posts', type=int, default=1500, help="Posts per subreddit")
+    parser.add_argument('--diagnosed-ratio', type=float, default=0.3)
+    parser.add_argument('--subreddit-ratio', action='append', default=[], metavar='NAME=RATIO',
+                        help="Diagnosed ratio for one subreddit (repeatable)")
+    parser.add_argument('--quota', type=int, default=600, help="Requests per rate-limit window")
+    parser.add_argument('--window', type=int, default=600, help="Rate-limit window in seconds")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help="Share of requests answered with a 5xx error")
+    parser.add_argument('--drop-rate', type=float, default=0.0,
+                        help="Share of requests whose connection is closed without an answer")
+    for reason in UNAVAILABLE_STATUSES:
+        parser.add_argument(f'--{reason}', action='append', default=[], metavar='NAME',
+                            help=f"Answer listings of this subreddit as {reason} (repeatable)")
+    args = parser.parse_args()
+
+    subreddit_ratios = {}
+    for item in args.subreddit_ratio:
+        name, _, ratio = item.partition('=')
+        subreddit_ratios[name] = float(ratio)
+    data = FakeRedditData(args.posts, args.diagnosed_ratio, subreddit_ratios=subreddit_ratios)
+    unavailable = {name: reason for reason in UNAVAILABLE_STATUSES for name in getattr(args, reason)}
+    server = FakeRedditServer(data, quota=args.quota, window=args.window, latency=args.latency,
+                              port=args.port, error_rate=args.error_rate, drop_rate=args.drop_rate,
+                              unavailable=unavailable)
+    print(f"✓ Fake Reddit server listening on {server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+Listing Fetch Retries and Circuit Breaker
+Keeps one failing request from costing a whole listing, and a dead
+subreddit from costing requests on every run.
+
+- `iter_pages_with_retry` pages through a listing like
+  RedditClient.iter_listing_pages, but when a page request fails with a
+  transient error (5xx, 429 after the client's own retries, a dropped
+  connection or timeout) it sleeps with jittered exponential backoff and
+  continues from the last `after` cursor instead of giving up.
+- `CircuitBreaker` tracks failures per subreddit. A subreddit that answers
+  as private, quarantined or banned, or whose listings keep failing after
+  their retries, is "open": its listings are skipped without a request
+  until a cooldown passes, when a single listing probes it again. The
+  state is kept in the store (`subreddit_circuits`), so later runs skip
+  dead subreddits too.
+"""
+
+import random
+import threading
+import time
+
+import requests
+
+# Retries of one page request before the listing fails
+DEFAULT_MAX_RETRIES = 5
+
+# Backoff before retry n is uniform in [0, min(MAX, BASE * 2**n)] seconds
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 30.0
+
+# Failed listings in a row that open a subreddit's circuit
+DEFAULT_FAILURE_THRESHOLD = 3
+
+# Seconds an open circuit waits before probing again; doubled after every
+# failed probe up to MAX_COOLDOWN
+DEFAULT_COOLDOWN = 3600
+UNAVAILABLE_COOLDOWN = 7 * 86400
+MAX_COOLDOWN = 30 * 86400
+
+# Statuses Reddit answers for subreddits that cannot be read:
+# 403 private or quarantined, 404 banned or missing, 451 blocked
+UNAVAILABLE_STATUSES = {403, 404, 451}
+
+# Circuit states
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class RetryPolicy:
+    """
+    Jittered ("full jitter") exponential backoff for page requests
+    """
+
+    def __init__(self, max_retries=DEFAULT_MAX_RETRIES, base_delay=DEFAULT_BASE_DELAY,
+                 max_delay=DEFAULT_MAX_DELAY, rng=None, sleep=time.sleep):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self._rng = rng or random.Random()
+
+    def delay(self, attempt):
+        """
+        Seconds to wait before retry `attempt` (0-based)
+        """
+        return self._rng.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+def error_status(error):
+    response = getattr(error, 'response', None)
+    return response.status_code if response is not None else None
+
+
+def is_transient(error):
+    """
+    True for failures worth retrying: 5xx and 429 responses, dropped
+    connections, timeouts and truncated bodies
+    """
+    status = error_status(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, requests.RequestException)
+
+
+def unavailable_reason(error):
+    """
+    Why a subreddit cannot be read ('private', 'banned', ...), or None
+    if the error does not say it is unavailable
+    """
+    status = error_status(error)
+    if status not in UNAVAILABLE_STATUSES:
+        return None
+    try:
+        reason = error.response.json().get('reason')
+    except ValueError:
+        reason = None
+    return reason or f'HTTP {status}'
+
+
+def failure_reason(error):
+    status = error_status(error)
+    return f'HTTP {status}' if status is not None else type(error).__name__
+
+
+def iter_pages_with_retry(reddit, subreddit, sort, limit, time_filter=None, after=None,
+                          policy=None, on_retry=None):
+    """
+    RedditClient.iter_listing_pages that retries transient failures
+
+    After a failed page request it backs off and resumes from the cursor
+    of the last page it yielded, so no page is fetched twice or skipped.
+    `on_retry(attempt, error, seconds)` is called before every retry. The
+    error is raised once `policy.max_retries` retries of one page failed,
+    or at once if it is not transient.
+    """
+    policy = policy or RetryPolicy()
+    fetched = 0
+    attempt = 0
+    while True:
+        try:
+            for page in reddit.iter_listing_pages(subreddit, sort, limit - fetched,
+                                                  time_filter=time_filter, after=after):
+                attempt = 0
+                fetched += len(page.posts)
+                after = page.after
+                yield page
+            return
+        except Exception as e:
+            if not is_transient(e) or attempt >= policy.max_retries:
+                raise
+            seconds = policy.delay(attempt)
+            if on_retry is not None:
+                on_retry(attempt, e, seconds)
+            policy.sleep(seconds)
+            attempt += 1
+
+
+class CircuitState:
+    """
+    Failure record of one subreddit
+
+    `opened_at` and `cooldown` are set while the circuit is open; `reason`
+    describes the failure that opened it.
+    """
+
+    __slots__ = ('state', 'failures', 'opened_at', 'cooldown', 'reason')
+
+    def __init__(self, state=CLOSED, failures=0, opened_at=None, cooldown=None, reason=None):
+        self.state = state
+        self.failures = failures
+        self.opened_at = opened_at
+        self.cooldown = cooldown
+        self.reason = reason
+
+    @property
+    def retry_at(self):
+        return self.opened_at + self.cooldown if self.opened_at is not None else None
+
+
+class CircuitBreaker:
+    """
+    Per-subreddit circuit breaker shared by all fetch workers
+
+    Subreddit names are case-insensitive. `states` maps lowercased names
+    to CircuitStates loaded from the store; `on_change(name, state)` is
+    called whenever a state changes, to save it.
+
+    A closed circuit allows every listing. Failures open it immediately
+    when the subreddit is unavailable, or after `failure_threshold` failed
+    listings in a row. Once its cooldown has passed it is half-open: one
+    listing probes the subreddit while the others wait for the outcome.
+    A successful page closes the circuit, a failure reopens it with twice
+    the cooldown. A probe that ends without either (an aborted run) must
+    be `release`d.
+    """
+
+    def __init__(self, states=None, on_change=None, failure_threshold=DEFAULT_FAILURE_THRESHOLD,
+                 cooldown=DEFAULT_COOLDOWN, unavailable_cooldown=UNAVAILABLE_COOLDOWN,
+                 max_cooldown=MAX_COOLDOWN, clock=time.time):
+        self.states = dict(states or {})
+        self.on_change = on_change
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.unavailable_cooldown = unavailable_cooldown
+        self.max_cooldown = max_cooldown
+        self._clock = clock
+        # Lowercased name -> thread running its half-open probe
+        self._probing = {}
+        self._condition = threading.Condition()
+
+    def state(self, subreddit):
+        with self._condition:
+            return self.states.get(subreddit.lower(), CircuitState())
+
+    def allow(self, subreddit):
+        """
+        Whether a listing of `subreddit` may be fetched now
+
+        While another listing probes a half-open circuit, waits for it.
+        """
+        name = subreddit.lower()
+        with self._condition:
+            while True:
+                state = self.states.get(name)
+                if state is None or state.state == CLOSED:
+                    return True
+                if name in self._probing:
+                    self._condition.wait()
+                    continue
+                if state.state == OPEN and self._clock() < state.retry_at:
+                    return False
+                state.state = HALF_OPEN
+                self._probing[name] = threading.get_ident()
+                self._changed(name, state)
+                return True
+
+    def record_success(self, subreddit):
+        name = subreddit.lower()
+        with self._condition:
+            state = self.states.get(name)
+            if state is None or (state.state == CLOSED and not state.failures):
+                return
+            self.states[name] = CircuitState()
+            self._changed(name, self.states[name])
+
+    def record_failure(self, subreddit, reason, unavailable=False):
+        """
+        Count a failed listing; returns True if this opened the circuit
+        """
+        name = subreddit.lower()
+        with self._condition:
+            state = self.states.setdefault(name, CircuitState())
+            state.failures += 1
+            state.reason = reason
+            opened = False
+            if state.state == HALF_OPEN:
+                state.cooldown = min(state.cooldown * 2, self.max_cooldown)
+                opened = True
+            elif state.state == CLOSED and (unavailable or state.failures >= self.failure_threshold):
+                state.cooldown = self.unavailable_cooldown if unavailable else self.cooldown
+                opened = True
+            if opened:
+                state.state = OPEN
+                state.opened_at = self._clock()
+            self._changed(name, state)
+            return opened
+
+    def release(self, subreddit):
+        """
+        End a half-open probe the calling thread left without an outcome
+
+        The circuit goes back to open with its cooldown passed, so the next
+        listing probes again; listings waiting in `allow` are woken. Does
+        nothing unless this thread holds the subreddit's probe, so it is
+        safe to call on every exit path of a listing.
+        """
+        name = subreddit.lower()
+        with self._condition:
+            if self._probing.get(name) != threading.get_ident():
+                return
+            state = self.states[name]
+            state.state = OPEN
+            self._changed(name, state)
+
+    def open_circuits(self):
+        """
+        (subreddit, CircuitState) of every open or half-open circuit
+        """
+        with self._condition:
+            return sorted(((name, state) for name, state in self.states.items() if state.state != CLOSED),
+                          key=lambda item: item[0])
+
+    def _changed(self, name, state):
+        if state.state != HALF_OPEN:
+            self._probing.pop(name, None)
+            self._condition.notify_all()
+        if self.on_change is not None:
+            self.on_change(name, state)
@@ -0,0 +1,217 @@
+"""
+HTTP Fixtures
+Record Reddit API responses once and replay them offline, so collection
+runs can be benchmarked and debugged reproducibly without credentials or
+network access.
+
+Recording: pass a FixtureRecorder to RedditClient (or run the collector
+with `--record-fixtures DIR`). Every final response to a listing, comment
+thread or morechildren request is written to DIR: the raw body,
+gzip-compressed, under `responses/`, and one line describing it in
+`index.jsonl`. Rate-limited and 5xx responses are not recorded.
+
+Replaying: FixtureData serves the recorded responses through
+FakeRedditServer, which adds latency and Reddit's rate-limit headers:
+
+    python http_fixtures.py serve --fixtures DIR --port 8765 --latency 0.05
+    python reddit_mental_health_collector.py --api-url http://127.0.0.1:8765
+
+Listing pages are looked up by subreddit, sort and `after` cursor and cut
+to the requested limit, so a replayed run may page differently than the
+recorded one; a page that was never recorded ends the listing. Listings
+recorded as private, quarantined or banned are answered that way again.
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import threading
+from urllib.parse import urlencode
+
+from fake_reddit_server import FakeRedditServer, UNAVAILABLE_STATUSES
+
+INDEX_FILE = 'index.jsonl'
+RESPONSES_DIR = 'responses'
+
+# Reason recorded for an unreadable listing whose body does not give one
+DEFAULT_UNAVAILABLE = {403: 'private', 404: 'banned', 451: 'banned'}
+
+
+def fixture_key(endpoint, path, params):
+    """
+    Replay lookup key of one request
+
+    Listings are keyed by subreddit, sort and cursor only, since a replay
+    may ask for a different page size than the recording did.
+    """
+    if endpoint == 'listing':
+        _, _, subreddit, sort = path.split('/')
+        return f"listing:{subreddit.lower()}/{sort}?{params.get('after') or ''}"
+    if endpoint == 'morechildren':
+        return f"morechildren:{params['link_id']}?{params['children']}"
+    query = {key: value for key, value in params.items() if key != 'raw_json'}
+    return f"{endpoint}:{path}?{urlencode(sorted(query.items()))}"
+
+
+class FixtureRecorder:
+    """
+    Writes every response RedditClient receives to a fixture directory
+
+    Safe to share between fetch workers. Recording into a directory that
+    already holds fixtures adds to them; responses recorded again replace
+    the earlier ones on replay.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.recorded = 0
+        os.makedirs(os.path.join(path, RESPONSES_DIR), exist_ok=True)
+        self._lock = threading.Lock()
+        self._index = open(os.path.join(path, INDEX_FILE), 'a', encoding='utf-8')
+
+    def close(self):
+        with self._lock:
+            self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def record(self, endpoint, path, params, status, body):
+        """
+        Store one response; `body` is the raw response bytes
+        """
+        if status == 429 or status >= 500:
+            return
+        key = fixture_key(endpoint, path, params)
+        name = f'{hashlib.sha1(key.encode("utf-8")).hexdigest()}.json.gz'
+        # mtime=0 keeps the files byte-identical across recordings
+        with open(os.path.join(self.path, RESPONSES_DIR, name), 'wb') as f:
+            f.write(gzip.compress(body, compresslevel=6, mtime=0))
+        line = json.dumps({'key': key, 'endpoint': endpoint, 'status': status, 'file': name})
+        with self._lock:
+            self._index.write(line + '\n')
+            self._index.flush()
+            self.recorded += 1
+
+
+class FixtureData:
+    """
+    Recorded responses behind FakeRedditData's interface, for FakeRedditServer
+
+    Only the index is kept in memory; response bodies are read from disk
+    as they are requested.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.index = {}
+        self.unavailable = {}
+        # Post id -> entry of its recorded thread
+        self._threads = {}
+        with open(os.path.join(path, INDEX_FILE), encoding='utf-8') as f:
+            for line in f:
+                entry = json.loads(line)
+                self.index[entry['key']] = entry
+        for key, entry in self.index.items():
+            if entry['endpoint'] == 'comments' and entry['status'] == 200:
+                self._threads[key.partition('/comments/')[2].partition('?')[0]] = entry
+            elif entry['endpoint'] == 'listing' and entry['status'] in DEFAULT_UNAVAILABLE:
+                subreddit = key.partition(':')[2].partition('/')[0]
+                reason = self._load(entry).get('reason')
+                if reason not in UNAVAILABLE_STATUSES:
+                    reason = DEFAULT_UNAVAILABLE[entry['status']]
+                self.unavailable[subreddit] = reason
+
+    def __len__(self):
+        return len(self.index)
+
+    def _load(self, entry):
+        with open(os.path.join(self.path, RESPONSES_DIR, entry['file']), 'rb') as f:
+            return json.loads(gzip.decompress(f.read()))
+
+    def _lookup(self, key):
+        entry = self.index.get(key)
+        if entry is None or entry['status'] != 200:
+            return None
+        return self._load(entry)
+
+    def listing(self, subreddit, sort, after=None, limit=100):
+        """
+        Return (children, after) for one page of a recorded listing
+        """
+        payload = self._lookup(f"listing:{subreddit.lower()}/{sort}?{after or ''}")
+        if payload is None:
+            return [], None
+        data = payload.get('data', {})
+        children = data.get('children', [])
+        if len(children) > limit:
+            children = children[:limit]
+            return children, children[-1]['data']['name']
+        return children, data.get('after')
+
+    def comments(self, post_id, limit=200, depth=None):
+        """
+        Return (post, comment things) of a recorded thread
+        """
+        entry = self._threads.get(post_id)
+        if entry is None:
+            return None
+        payload = self._load(entry)
+        post = payload[0]['data']['children'][0]['data']
+        return post, payload[1]['data']['children']
+
+    def more_children(self, post_id, comment_ids):
+        payload = self._lookup(f"morechildren:t3_{post_id}?{','.join(comment_ids)}")
+        if payload is None:
+            return None
+        return payload.get('json', {}).get('data', {}).get('things', [])
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay recorded Reddit API responses")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    serve = subparsers.add_parser('serve', help="Serve recorded responses on a local port")
+    serve.add_argument('--fixtures', required=True, help="Directory written with --record-fixtures")
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response")
+    serve.add_argument('--quota', type=int, default=600, help="Requests per rate-limit window")
+    serve.add_argument('--window', type=int, default=600, help="Rate-limit window in seconds")
+
+    stats = subparsers.add_parser('stats', help="Count recorded responses")
+    stats.add_argument('--fixtures', required=True, help="Directory written with --record-fixtures")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    data = FixtureData(args.fixtures)
+
+    if args.command == 'stats':
+        counts = {}
+        for entry in data.index.values():
+            name = f"{entry['endpoint']} {entry['status']}"
+            counts[name] = counts.get(name, 0) + 1
+        print(f"✓ {len(data)} recorded responses in {args.fixtures}")
+        for name, count in sorted(counts.items()):
+            print(f"    {name}: {count}")
+        return
+
+    server = FakeRedditServer(data, quota=args.quota, window=args.window, latency=args.latency,
+                              port=args.port, unavailable=data.unavailable)
+    print(f"✓ Replaying {len(data)} recorded responses on {server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
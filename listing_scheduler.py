@@ -0,0 +1,133 @@
+"""
+Adaptive Listing Scheduler
+Tracks, per disorder, how many diagnosed posts each (subreddit, sort)
+listing yields per post fetched, and decides before every page request
+whether the listing is still worth paging:
+
+- nothing more is fetched once the disorder's target is reached
+- a listing whose hit rate, after a minimum sample, is far below the
+  disorder's overall rate is stopped, and the pages it leaves unused go
+  into a spare budget
+- a listing that reaches its default limit while yielding at least the
+  disorder's overall rate may keep paging out of that spare budget, up to
+  the ~1000 items Reddit serves per listing
+
+Counts come from the write stage, so they lag the fetchers by the pages
+still in flight; that only delays a decision by a page or two.
+"""
+
+import threading
+
+# Reddit stops serving a listing after roughly 1000 items
+MAX_LISTING_ITEMS = 1000
+
+# Posts a listing must have returned before its yield is judged
+DEFAULT_MIN_SAMPLE = 200
+
+# A listing below this share of the disorder's hit rate is stopped
+DEFAULT_MIN_RELATIVE_YIELD = 0.25
+
+# Why a listing stopped paging; only LIMIT_REACHED is not an early stop
+TARGET_REACHED = 'target reached'
+LOW_YIELD = 'low yield'
+LIMIT_REACHED = 'limit reached'
+
+
+class ListingYield:
+    """
+    Posts fetched and diagnosed posts gained from one listing in this run
+    """
+
+    __slots__ = ('fetched', 'diagnosed')
+
+    def __init__(self):
+        self.fetched = 0
+        self.diagnosed = 0
+
+    @property
+    def rate(self):
+        return self.diagnosed / self.fetched if self.fetched else 0.0
+
+
+class ListingScheduler:
+    """
+    Per-disorder page budget shared by all of the disorder's listings
+
+    `target_reached` is a callable returning True once the disorder has
+    enough posts.
+    """
+
+    def __init__(self, target_reached, min_sample=DEFAULT_MIN_SAMPLE,
+                 min_relative_yield=DEFAULT_MIN_RELATIVE_YIELD, max_listing_items=MAX_LISTING_ITEMS):
+        self.target_reached = target_reached
+        self.min_sample = min_sample
+        self.min_relative_yield = min_relative_yield
+        self.max_listing_items = max_listing_items
+        self.listings = {}
+        self.fetched = 0
+        self.diagnosed = 0
+        self.spare = 0
+        self._lock = threading.Lock()
+
+        # Totals for reporting
+        self.stopped_early = 0
+        self.extended_items = 0
+
+    def _listing(self, subreddit_name, sort_method):
+        key = (subreddit_name, sort_method)
+        listing = self.listings.get(key)
+        if listing is None:
+            listing = self.listings[key] = ListingYield()
+        return listing
+
+    @property
+    def rate(self):
+        """
+        Hit rate over every listing of the disorder so far
+        """
+        return self.diagnosed / self.fetched if self.fetched else 0.0
+
+    def record(self, subreddit_name, sort_method, fetched, diagnosed):
+        """
+        Count a written page: posts it held and diagnosed posts it added
+        """
+        with self._lock:
+            listing = self._listing(subreddit_name, sort_method)
+            listing.fetched += fetched
+            listing.diagnosed += diagnosed
+            self.fetched += fetched
+            self.diagnosed += diagnosed
+
+    def release(self, unused):
+        """
+        Return posts a listing was allowed but did not fetch to the spare budget
+        """
+        if unused > 0:
+            with self._lock:
+                self.spare += unused
+
+    def next_page(self, subreddit_name, sort_method, fetched, limit, page_size):
+        """
+        Decide whether a listing that has returned `fetched` of its `limit`
+        posts fetches another page
+
+        Returns None to continue, or the reason to stop. A stop for low yield
+        releases the rest of the listing's limit to the spare budget.
+        """
+        if self.target_reached():
+            return TARGET_REACHED
+        with self._lock:
+            listing = self._listing(subreddit_name, sort_method)
+            if listing.fetched >= self.min_sample and listing.rate < self.min_relative_yield * self.rate:
+                self.stopped_early += 1
+                self.spare += max(limit - fetched, 0)
+                return LOW_YIELD
+            if fetched < limit:
+                return None
+            # Past its own limit a listing can only page on spare budget
+            if (fetched + page_size <= self.max_listing_items and self.spare >= page_size
+                    and listing.fetched and listing.rate >= self.rate):
+                self.spare -= page_size
+                self.extended_items += page_size
+                return None
+            return LIMIT_REACHED
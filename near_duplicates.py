@@ -0,0 +1,309 @@
+"""
+Near-Duplicate Detection
+Finds copy-pasted and cross-posted posts that the collector's exact-id
+(and exact-text) deduplication misses, using MinHash signatures over word
+shingles of Title + Description and LSH banding:
+
+- every post is reduced to NUM_PERM min-hashes of its word 3-shingles
+- the signature is cut into BANDS bands; posts whose band hashes agree in
+  any band are candidate pairs
+- candidates whose signatures agree on at least `threshold` of the
+  min-hashes (estimated Jaccard similarity) are joined into one cluster
+
+Every step is vectorized with numpy and candidate pairs are found by
+sorting band hashes, so the pass is near-linear in the number of posts.
+
+Usage:
+    python near_duplicates.py --csv-dir . --output near_duplicates.csv
+    python near_duplicates.py --xlsx mental_health_reddit_data_20251108_234307.xlsx --keep-canonical deduplicated/
+
+Each post gets a `Cluster` id (the post id of the cluster's earliest
+post), `Cluster_Size` and `Canonical` (True for that earliest post).
+--keep-canonical writes per-disorder CSVs with one post per cluster.
+"""
+
+import argparse
+import os
+import re
+import time
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+
+from dedup_index import MIN_HASHED_CHARS
+from post_index import post_key_from_url
+
+NUM_PERM = 128        # signature length; a power of two
+BANDS = 16            # 8 rows per band: candidates from about 0.7 similarity
+SHINGLE_SIZE = 3      # words per shingle
+DEFAULT_THRESHOLD = 0.8
+
+# Placeholder the collector writes for posts without a body
+NO_DESCRIPTION = '[No description]'
+
+TOKEN = re.compile(r"[a-z0-9']+")
+
+_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+_MIX = np.uint64(0xBF58476D1CE4E5B9)
+_LOW32 = np.uint64(0xFFFFFFFF)
+
+
+def _mix(hashes):
+    """
+    SplitMix64 finalizer: spreads every input bit over the whole word
+    """
+    hashes = (hashes ^ (hashes >> np.uint64(30))) * _MIX
+    hashes = (hashes ^ (hashes >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return hashes ^ (hashes >> np.uint64(31))
+
+
+class MinHasher:
+    """
+    MinHash signatures over word shingles
+
+    Signatures are built with one-permutation hashing: each shingle is
+    hashed once, the top bits of the hash pick one of `num_perm` bins and
+    the bin keeps the smallest low 32 bits it sees. Bins a short post leaves
+    empty are filled from the next non-empty bin (rotation densification).
+    That costs one hash per shingle instead of `num_perm`, and estimates
+    Jaccard similarity like `num_perm` independent permutations. The same
+    `seed` always gives the same signatures.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, seed=0):
+        if num_perm & (num_perm - 1):
+            raise ValueError("num_perm must be a power of two")
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = _mix(np.array([seed], dtype=np.uint64))[0]
+
+    def shingle_hashes(self, texts):
+        """
+        Return (hashes, offsets): every text's 64-bit shingle hashes, concatenated
+
+        Text i owns hashes[offsets[i]:offsets[i + 1]]. Texts shorter than
+        MIN_HASHED_CHARS, or without any words, get no shingles.
+        """
+        k = self.shingle_size
+        words = [TOKEN.findall(text.lower()) if len(text) >= MIN_HASHED_CHARS else [] for text in texts]
+        lengths = np.array([len(w) for w in words], dtype=np.int64)
+        # pandas' stable SipHash, so signatures do not depend on PYTHONHASHSEED
+        tokens = pd.util.hash_array(np.array(list(chain.from_iterable(words)), dtype=object))
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(lengths) else lengths
+
+        # A text of n >= k tokens has n - k + 1 shingles; shorter texts are one shingle
+        counts = np.where(lengths >= k, lengths - k + 1, np.minimum(lengths, 1))
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        first = np.repeat(starts, counts) + (np.arange(offsets[-1]) - np.repeat(offsets[:-1], counts))
+        width = np.repeat(np.minimum(lengths, k), counts)
+
+        # Polynomial combination of the shingle's token hashes
+        hashes = np.full(len(first), self.seed, dtype=np.uint64)
+        for j in range(k):
+            present = j < width
+            hashes[present] = hashes[present] * _MULTIPLIER + tokens[first[present] + j]
+        return _mix(hashes), offsets
+
+    def signatures(self, texts):
+        """
+        Return (signatures, hashed): a (len(texts), num_perm) uint32 matrix
+        and a mask of the texts that had any shingles
+        """
+        hashes, offsets = self.shingle_hashes(texts)
+        counts = np.diff(offsets)
+        hashed = counts > 0
+        num_perm = self.num_perm
+
+        bins = (hashes >> np.uint64(64 - num_perm.bit_length() + 1)).astype(np.int64)
+        cells = np.repeat(np.arange(len(texts)) * num_perm, counts) + bins
+        signatures = np.full(len(texts) * num_perm, np.iinfo(np.uint32).max, dtype=np.uint32)
+        np.minimum.at(signatures, cells, (hashes & _LOW32).astype(np.uint32))
+        filled = np.zeros(len(texts) * num_perm, dtype=bool)
+        filled[cells] = True
+        signatures = signatures.reshape(len(texts), num_perm)
+        filled = filled.reshape(len(texts), num_perm)
+
+        sparse = np.flatnonzero(hashed & ~filled.all(axis=1))
+        if len(sparse):
+            # Each empty bin takes the next filled bin to its right (wrapping
+            # round), offset by the distance so copies differ between bins
+            doubled = np.concatenate([filled[sparse], filled[sparse]], axis=1)
+            position = np.where(doubled, np.arange(2 * num_perm), 2 * num_perm)
+            nearest = np.minimum.accumulate(position[:, ::-1], axis=1)[:, ::-1][:, :num_perm]
+            source = signatures[sparse[:, None], nearest % num_perm]
+            distance = (nearest - np.arange(num_perm)).astype(np.uint32)
+            with np.errstate(over='ignore'):
+                signatures[sparse] = source + distance * np.uint32(0x9E3779B9)
+        return signatures, hashed
+
+
+
+def band_hashes(signatures, bands=BANDS):
+    """
+    One 64-bit hash per (post, band) of the band's min-hashes
+    """
+    rows = signatures.shape[1] // bands
+    banded = signatures[:, :rows * bands].astype(np.uint64).reshape(len(signatures), bands, rows)
+    with np.errstate(over='ignore'):
+        weights = _MULTIPLIER ** np.arange(1, rows + 1, dtype=np.uint64)
+        return (banded * weights).sum(axis=2)
+
+
+def candidate_pairs(bucket_hashes, eligible):
+    """
+    Pairs (i, j) that share a band hash: each post is paired with the first
+    post of its bucket, which keeps the pair count linear in the bucket size
+    """
+    left, right = [], []
+    ids = np.flatnonzero(eligible)
+    for band in range(bucket_hashes.shape[1]):
+        values = bucket_hashes[ids, band]
+        order = np.argsort(values, kind='stable')
+        sorted_values = values[order]
+        new_bucket = np.concatenate(([True], sorted_values[1:] != sorted_values[:-1]))
+        bucket_first = order[np.maximum.accumulate(np.where(new_bucket, np.arange(len(order)), 0))]
+        paired = ~new_bucket
+        left.append(ids[bucket_first[paired]])
+        right.append(ids[order[paired]])
+    if not left:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+    pairs = np.unique(np.stack([np.concatenate(left), np.concatenate(right)], axis=1), axis=0)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def cluster_signatures(signatures, hashed, threshold=DEFAULT_THRESHOLD, bands=BANDS, batch=100000):
+    """
+    Cluster label per post: posts joined by a chain of similar pairs share
+    the label of the cluster's lowest index
+    """
+    left, right = candidate_pairs(band_hashes(signatures, bands), hashed)
+    parent = np.arange(len(signatures))
+    for start in range(0, len(left), batch):
+        i, j = left[start:start + batch], right[start:start + batch]
+        similarity = (signatures[i] == signatures[j]).mean(axis=1)
+        for a, b in zip(i[similarity >= threshold], j[similarity >= threshold]):
+            ra, rb = _find(parent, a), _find(parent, b)
+            if ra != rb:
+                parent[max(ra, rb)] = min(ra, rb)
+    return np.array([_find(parent, i) for i in range(len(parent))], dtype=np.int64)
+
+
+def post_texts(df):
+    """
+    Title + Description per row, without the no-description placeholder
+    """
+    description = df['Description'].fillna('').astype(str).replace(NO_DESCRIPTION, '')
+    return (df['Title'].fillna('').astype(str) + ' ' + description).tolist()
+
+
+def find_near_duplicates(df, threshold=DEFAULT_THRESHOLD, num_perm=NUM_PERM, bands=BANDS, seed=0):
+    """
+    Add `Cluster`, `Cluster_Size` and `Canonical` columns to a posts frame
+
+    The canonical post of a cluster is its earliest one (by `Date`, then
+    row order); the cluster id is that post's Reddit id.
+    """
+    signatures, hashed = MinHasher(num_perm, seed=seed).signatures(post_texts(df))
+    labels = cluster_signatures(signatures, hashed, threshold, bands)
+
+    df = df.reset_index(drop=True)
+    order = pd.DataFrame({'label': labels, 'date': pd.to_datetime(df['Date'])})
+    order = order.sort_values(['label', 'date'], kind='stable')
+    canonical_row = order.groupby('label', sort=False).head(1)
+    canonical_of = pd.Series(canonical_row.index, index=canonical_row['label'])
+
+    canonical = canonical_of.loc[labels].to_numpy()
+    keys = pd.Series([post_key_from_url(url, date, title)
+                      for url, date, title in zip(df['URL'], df['Date'], df['Title'])])
+    return df.assign(
+        Cluster=keys.to_numpy()[canonical],
+        Cluster_Size=pd.Series(labels).map(pd.Series(labels).value_counts()).to_numpy(),
+        Canonical=canonical == np.arange(len(df)),
+    )
+
+
+def load_workbook_posts(path):
+    """
+    Read an exported workbook into one frame with a `Disorder` column
+    """
+    sheets = pd.read_excel(path, sheet_name=None)
+    return pd.concat([df.assign(Disorder=name) for name, df in sheets.items()], ignore_index=True)
+
+
+def write_canonical(df, output_dir):
+    """
+    Write the canonical posts as per-disorder CSVs in the shipped format,
+    under the shipped file names so load_corpus can read the output
+    """
+    from corpus_loader import COLUMN_TYPES, CORPUS_FILES
+
+    os.makedirs(output_dir, exist_ok=True)
+    kept = df[df['Canonical']]
+    for disorder, posts in kept.groupby('Disorder', sort=True, observed=True):
+        posts = posts[list(COLUMN_TYPES)].copy()
+        posts['Date'] = pd.to_datetime(posts['Date']).dt.strftime('%Y-%m-%d %H:%M:%S')
+        posts.to_csv(os.path.join(output_dir, CORPUS_FILES.get(disorder, f'{disorder}.csv')), sep=';', index=False, encoding='utf-8-sig')
+    return len(kept)
+
+
+def print_summary(df):
+    print(f"{'Disorder':20} {'posts':>8} {'near-dups':>10}")
+    print(f"{'-'*40}")
+    for disorder, posts in df.groupby('Disorder', sort=True, observed=True):
+        print(f"{disorder:20} {len(posts):>8} {int((~posts['Canonical']).sum()):>10}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Cluster near-duplicate posts with MinHash/LSH")
+    parser.add_argument('--csv-dir', default=None,
+                        help="Directory holding the per-disorder CSVs (ADHD.csv, ...)")
+    parser.add_argument('--xlsx', action='append', default=[],
+                        help="Exported workbook to include (repeatable)")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help="Estimated Jaccard similarity at which two posts are duplicates")
+    parser.add_argument('--output', default='near_duplicates.csv',
+                        help="Where to write Disorder;URL;Cluster;Cluster_Size;Canonical for every post")
+    parser.add_argument('--keep-canonical', default=None, metavar='DIR',
+                        help="Also write per-disorder CSVs with one post per cluster to DIR")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    frames = []
+    if args.csv_dir is not None:
+        from corpus_loader import load_corpus
+        frames.append(load_corpus(args.csv_dir))
+    frames.extend(load_workbook_posts(path) for path in args.xlsx)
+    if not frames:
+        print("✗ Nothing to scan. Pass --csv-dir and/or --xlsx.")
+        return
+    df = pd.concat(frames, ignore_index=True)
+
+    start = time.perf_counter()
+    df = find_near_duplicates(df, args.threshold)
+    elapsed = time.perf_counter() - start
+
+    duplicates = int((~df['Canonical']).sum())
+    clusters = df.loc[df['Cluster_Size'] > 1, 'Cluster'].nunique()
+    print(f"✓ Scanned {len(df)} posts in {elapsed:.1f}s: {duplicates} near-duplicate(s) in {clusters} cluster(s)")
+    print_summary(df)
+
+    df[['Disorder', 'URL', 'Cluster', 'Cluster_Size', 'Canonical']].to_csv(args.output, sep=';', index=False)
+    print(f"✓ Cluster ids written to {args.output}")
+    if args.keep_canonical:
+        kept = write_canonical(df, args.keep_canonical)
+        print(f"✓ {kept} canonical posts written to {args.keep_canonical}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Parquet Dataset Export
+Writes collected posts as a typed Parquet dataset, hive-partitioned by
+disorder and year-month:
+
+    <output_dir>/disorder=ADHD/year_month=2025-11/part-0.parquet
+
+`Date` is stored as a real timestamp and `Score`/`Num_Comments` as
+integers. Readers can load only the columns and partitions they need,
+memory-mapped, without parsing every description.
+
+export_store_to_parquet streams posts from a PostStore batch by batch, so
+exporting a large collection takes no more memory than a small one.
+"""
+
+import os
+import shutil
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from pyarrow import fs
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+SCHEMA = pa.schema([
+    ('Date', pa.timestamp('s')),
+    ('Title', pa.string()),
+    ('Description', pa.string()),
+    ('Subreddit', pa.dictionary(pa.int32(), pa.string())),
+    ('Score', pa.int64()),
+    ('Num_Comments', pa.int64()),
+    ('URL', pa.string()),
+])
+
+PARTITIONING = ds.partitioning(
+    pa.schema([('disorder', pa.string()), ('year_month', pa.string())]),
+    flavor='hive'
+)
+
+# Rows read from the store per batch, and written per Parquet row group
+STREAM_BATCH_ROWS = 10000
+
+
+def rows_to_table(disorder_name, posts_data):
+    """
+    Convert row dicts for one disorder into a typed Arrow table
+    """
+    columns = {name: [row[name] for row in posts_data] for name in SCHEMA.names}
+    return columns_to_table(disorder_name, columns).sort_by([('Date', 'descending')])
+
+
+def columns_to_table(disorder_name, columns):
+    """
+    Typed Arrow table (with partition columns) from {column name: values}
+    """
+    dates = pc.strptime(pa.array(columns['Date'], pa.string()), format=DATE_FORMAT, unit='s')
+    table = pa.table({
+        'Date': dates,
+        'Title': pa.array(columns['Title'], pa.string()),
+        'Description': pa.array(columns['Description'], pa.string()),
+        'Subreddit': pa.array(columns['Subreddit'], pa.string()).dictionary_encode(),
+        'Score': pa.array(columns['Score'], pa.int64()),
+        'Num_Comments': pa.array(columns['Num_Comments'], pa.int64()),
+        'URL': pa.array(columns['URL'], pa.string()),
+    }, schema=SCHEMA)
+    table = table.append_column('disorder', pa.array([disorder_name] * len(table), pa.string()))
+    return table.append_column('year_month', pc.strftime(dates, format='%Y-%m'))
+
+
+def export_to_parquet(all_data, output_dir):
+    """
+    Write {disorder: [row dict, ...]} as a partitioned Parquet dataset
+
+    Partitions present in `output_dir` from an earlier export are replaced.
+    """
+    tables = [rows_to_table(name, posts_data) for name, posts_data in all_data.items() if posts_data]
+    if not tables:
+        return 0
+    table = pa.concat_tables(tables)
+    ds.write_dataset(
+        table,
+        output_dir,
+        format='parquet',
+        partitioning=PARTITIONING,
+        existing_data_behavior='delete_matching',
+        basename_template='part-{i}.parquet'
+    )
+    return len(table)
+
+
+def export_store_to_parquet(store, disorders, output_dir):
+    """
+    Write every disorder's stored posts as a partitioned Parquet dataset
+
+    Rows arrive from the store newest first in batches of
+    STREAM_BATCH_ROWS, so each partition's rows are contiguous: partitions
+    are written one after another, with a single file open at a time.
+    Partitions present in `output_dir` from an earlier export are
+    replaced. Returns the number of rows written.
+    """
+    count = 0
+    writer = None
+    current = None
+    try:
+        for disorder_name in disorders:
+            for rows in store.iter_post_rows(disorder_name, STREAM_BATCH_ROWS):
+                table = columns_to_table(disorder_name, dict(zip(SCHEMA.names, zip(*rows))))
+                months = table['year_month']
+                for month in pc.unique(months).to_pylist():
+                    if (disorder_name, month) != current:
+                        if writer is not None:
+                            writer.close()
+                        writer = _open_partition(output_dir, disorder_name, month)
+                        current = (disorder_name, month)
+                    part = table.filter(pc.equal(months, month)).select(SCHEMA.names)
+                    writer.write_table(part, row_group_size=STREAM_BATCH_ROWS)
+                    count += len(part)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def _open_partition(output_dir, disorder_name, month):
+    """
+    Replace one partition directory and open a writer for its only file
+    """
+    partition, _ = PARTITIONING.format((ds.field('disorder') == disorder_name) &
+                                       (ds.field('year_month') == month))
+    path = os.path.join(output_dir, partition)
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+    return pq.ParquetWriter(os.path.join(path, 'part-0.parquet'), SCHEMA)
+
+
+def open_dataset(output_dir):
+    """
+    Open an exported dataset with memory-mapped file access
+    """
+    return ds.dataset(output_dir, format='parquet', partitioning=PARTITIONING,
+                      filesystem=fs.LocalFileSystem(use_mmap=True))
+
+
+def read_posts(output_dir, columns=None, disorders=None, months=None):
+    """
+    Load selected columns, pruning partitions by disorder and 'YYYY-MM'
+
+    Example:
+        read_posts('data', columns=['Date', 'Score'], disorders=['ADHD'])
+    """
+    dataset = open_dataset(output_dir)
+    condition = None
+    if disorders is not None:
+        condition = ds.field('disorder').isin(list(disorders))
+    if months is not None:
+        month_condition = ds.field('year_month').isin(list(months))
+        condition = month_condition if condition is None else condition & month_condition
+    return dataset.to_table(columns=columns, filter=condition)
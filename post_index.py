@@ -0,0 +1,511 @@
+"""
+Full-Text Post Index
+SQLite FTS5 index over collected posts, so the corpus can be searched
+without loading it into pandas or Excel. Posts are added from a
+collection store, the shipped per-disorder CSVs or exported workbooks,
+each identified by its Reddit post id, so a post found in several
+sources (or under several disorders) is indexed once and carries every
+disorder label.
+
+Indexing is incremental: a store is read from where the last build
+stopped, and CSVs and workbooks are only re-read when they changed.
+
+Usage:
+    python post_index.py build --store mental_health_collection.sqlite --csv-dir .
+    python post_index.py build --xlsx mental_health_reddit_data_20251108_234307.xlsx
+    python post_index.py search '"was diagnosed" adhd' --disorder ADHD --since 2025-01-01
+    python post_index.py search 'therapist NEAR(diagnosed medication, 5)' --min-score 50
+
+Queries use the FTS5 syntax: words, "quoted phrases", prefix*, AND/OR/NOT
+and NEAR(...). Title and Description are both searched.
+"""
+
+import argparse
+import calendar
+import hashlib
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime
+
+DEFAULT_INDEX_PATH = 'post_index.sqlite'
+
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Posts inserted per transaction when reading CSVs and workbooks
+DEFAULT_BATCH_SIZE = 5000
+
+# Permalinks look like https://reddit.com/r/<sub>/comments/<id>/<slug>/
+PERMALINK_ID = re.compile(r'/comments/([A-Za-z0-9]+)')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    doc_id INTEGER PRIMARY KEY,
+    post_key TEXT NOT NULL UNIQUE,
+    created_utc INTEGER,
+    subreddit TEXT,
+    score INTEGER,
+    num_comments INTEGER,
+    url TEXT
+);
+
+CREATE INDEX IF NOT EXISTS documents_created ON documents (created_utc);
+
+CREATE TABLE IF NOT EXISTS document_text (
+    doc_id INTEGER PRIMARY KEY,
+    title TEXT,
+    description TEXT
+);
+
+CREATE TABLE IF NOT EXISTS document_labels (
+    doc_id INTEGER NOT NULL,
+    disorder TEXT NOT NULL,
+    PRIMARY KEY (doc_id, disorder)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS document_labels_disorder ON document_labels (disorder, doc_id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+    title, description,
+    content='document_text', content_rowid='doc_id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TABLE IF NOT EXISTS sources (
+    source TEXT PRIMARY KEY,
+    version TEXT NOT NULL
+);
+"""
+
+# Result ordering for PostIndex.search
+ORDERS = {
+    'rank': 'documents_fts.rank',
+    'newest': 'd.created_utc DESC',
+    'score': 'd.score DESC',
+}
+
+
+def post_key_from_url(url, *fallback):
+    """
+    Reddit post id from a permalink, or the URL itself if it has none
+
+    Rows without a URL (some exported sheets have none) are keyed on a
+    hash of the `fallback` values instead, e.g. their date and title.
+    """
+    if not isinstance(url, str) or not url:
+        text = '\0'.join(str(value) for value in fallback)
+        return 'h:' + hashlib.blake2b(text.encode('utf-8'), digest_size=12).hexdigest()
+    match = PERMALINK_ID.search(url)
+    return match.group(1) if match else url
+
+
+def parse_date(value):
+    """
+    Seconds since the epoch for a 'YYYY-MM-DD[ HH:MM:SS]' string (read as UTC)
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return calendar.timegm(value.timetuple())
+    value = str(value).strip()
+    fmt = DATE_FORMAT if ' ' in value else '%Y-%m-%d'
+    return calendar.timegm(time.strptime(value, fmt))
+
+
+def format_date(timestamp):
+    if timestamp is None:
+        return None
+    return time.strftime(DATE_FORMAT, time.gmtime(timestamp))
+
+
+def normalize_subreddit(name):
+    """
+    'ADHD', 'r/ADHD' and '/r/ADHD' all become 'r/ADHD', as in output rows
+    """
+    return 'r/' + name.strip().lstrip('/').removeprefix('r/')
+
+
+def _file_version(path):
+    stat = os.stat(path)
+    return f'{stat.st_mtime_ns}:{stat.st_size}'
+
+
+class PostIndex:
+    """
+    FTS5 index of posts with disorder labels and filterable metadata
+
+    Documents are stored once per post id. The filterable metadata is kept
+    apart from the post text, so filtering and sorting the matches of a
+    query never reads descriptions; the FTS table is an external content
+    index over `document_text`, so the text is not stored twice.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._conn.execute('SELECT COUNT(*) FROM documents').fetchone()[0]
+
+    def _source_version(self, source):
+        row = self._conn.execute('SELECT version FROM sources WHERE source = ?', (source,)).fetchone()
+        return row[0] if row else None
+
+    def _set_source_version(self, source, version):
+        self._conn.execute('INSERT OR REPLACE INTO sources VALUES (?, ?)', (source, version))
+
+    def _max_doc_id(self):
+        return self._conn.execute('SELECT COALESCE(MAX(doc_id), 0) FROM documents').fetchone()[0]
+
+    def _index_new_documents(self, after_doc_id):
+        """
+        Add documents inserted after `after_doc_id` to the FTS table
+        """
+        self._conn.execute(
+            'INSERT INTO documents_fts (rowid, title, description) '
+            'SELECT doc_id, title, description FROM document_text WHERE doc_id > ?',
+            (after_doc_id,)
+        )
+
+    def add_posts(self, records):
+        """
+        Index (post_key, created_utc, subreddit, score, num_comments, url,
+        title, description, disorders) records in one transaction
+
+        Posts already indexed only gain the disorder labels they lack.
+        Returns the number of new posts.
+        """
+        with self._conn:
+            first = self._max_doc_id()
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO documents (post_key, created_utc, subreddit, score, num_comments, url) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [record[:6] for record in records]
+            )
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO document_text '
+                'SELECT doc_id, ?, ? FROM documents WHERE post_key = ? AND doc_id > ?',
+                [(record[6], record[7], record[0], first) for record in records]
+            )
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO document_labels SELECT doc_id, ? FROM documents WHERE post_key = ?',
+                [(disorder, record[0]) for record in records for disorder in record[8]]
+            )
+            self._index_new_documents(first)
+            return self._max_doc_id() - first
+
+    def add_store(self, store_path):
+        """
+        Index posts and labels a collection store gained since the last build
+        """
+        source = f'store:{os.path.abspath(store_path)}'
+        posts_after, labels_after = map(int, (self._source_version(source) or '0:0').split(':'))
+
+        self._conn.execute('ATTACH DATABASE ? AS store', (store_path,))
+        try:
+            with self._conn:
+                first = self._max_doc_id()
+                posts_to, labels_to = self._conn.execute(
+                    'SELECT (SELECT COALESCE(MAX(rowid), 0) FROM store.posts), '
+                    '(SELECT COALESCE(MAX(rowid), 0) FROM store.post_labels)'
+                ).fetchone()
+                self._conn.execute(
+                    'INSERT OR IGNORE INTO documents (post_key, created_utc, subreddit, score, num_comments, url) '
+                    "SELECT post_id, CAST(strftime('%s', date) AS INTEGER), subreddit, score, num_comments, url "
+                    'FROM store.posts WHERE rowid > ? AND rowid <= ? ORDER BY rowid',
+                    (posts_after, posts_to)
+                )
+                self._conn.execute(
+                    'INSERT INTO document_text SELECT d.doc_id, p.title, p.description '
+                    'FROM documents d JOIN store.posts p ON p.post_id = d.post_key WHERE d.doc_id > ?',
+                    (first,)
+                )
+                self._conn.execute(
+                    'INSERT OR IGNORE INTO document_labels '
+                    'SELECT d.doc_id, l.disorder FROM store.post_labels l '
+                    'JOIN documents d ON d.post_key = l.post_id WHERE l.rowid > ? AND l.rowid <= ?',
+                    (labels_after, labels_to)
+                )
+                self._index_new_documents(first)
+                self._set_source_version(source, f'{posts_to}:{labels_to}')
+                return self._max_doc_id() - first
+        finally:
+            self._conn.execute('DETACH DATABASE store')
+
+    def _add_file(self, path, records, batch_size):
+        """
+        Index a file's records in batches, unless it is unchanged since the last build
+        """
+        source = f'file:{os.path.abspath(path)}'
+        version = _file_version(path)
+        if self._source_version(source) == version:
+            return 0
+
+        added = 0
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                added += self.add_posts(batch)
+                batch = []
+        if batch:
+            added += self.add_posts(batch)
+        with self._conn:
+            self._set_source_version(source, version)
+        return added
+
+    def add_csv(self, path, disorder, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Index one per-disorder corpus CSV, streamed in blocks
+        """
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+
+        from corpus_loader import CONVERT_OPTIONS, PARSE_OPTIONS
+
+        def records():
+            reader = pacsv.open_csv(path, parse_options=PARSE_OPTIONS, convert_options=CONVERT_OPTIONS)
+            for batch in reader:
+                columns = {name: batch.column(name) for name in batch.schema.names}
+                dates = columns['Date'].cast(pa.int64()).to_pylist()
+                urls = columns['URL'].to_pylist()
+                for row in zip(dates, columns['Subreddit'].to_pylist(), columns['Score'].to_pylist(),
+                               columns['Num_Comments'].to_pylist(), urls, columns['Title'].to_pylist(),
+                               columns['Description'].to_pylist()):
+                    yield (post_key_from_url(row[4], format_date(row[0]), row[5]),) + row + ((disorder,),)
+
+        return self._add_file(path, records(), batch_size)
+
+    def add_corpus(self, data_dir='.', files=None, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Index the shipped per-disorder CSVs found in `data_dir`
+        """
+        from corpus_loader import CORPUS_FILES
+
+        added = 0
+        for disorder, filename in (files or CORPUS_FILES).items():
+            path = os.path.join(data_dir, filename)
+            if os.path.exists(path):
+                added += self.add_csv(path, disorder, batch_size)
+        return added
+
+    def add_workbook(self, path, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Index an exported workbook; each sheet is named after its disorder
+        """
+        from openpyxl import load_workbook
+
+        def records():
+            wb = load_workbook(path, read_only=True)
+            try:
+                for ws in wb.worksheets:
+                    rows = ws.iter_rows(values_only=True)
+                    header = next(rows, None)
+                    if header is None:
+                        continue
+                    position = {name: i for i, name in enumerate(header)}
+                    for row in rows:
+                        url, date, title = row[position['URL']], row[position['Date']], row[position['Title']]
+                        yield (post_key_from_url(url, date, title), parse_date(date),
+                               row[position['Subreddit']], row[position['Score']],
+                               row[position['Num_Comments']], url, row[position['Title']],
+                               row[position['Description']], (ws.title,))
+            finally:
+                wb.close()
+
+        return self._add_file(path, records(), batch_size)
+
+    def optimize(self):
+        """
+        Merge the FTS segments into one; worth doing after a large build
+        """
+        with self._conn:
+            self._conn.execute("INSERT INTO documents_fts (documents_fts) VALUES ('optimize')")
+
+    def rebuild(self):
+        """
+        Drop every document and source high-water mark
+        """
+        with self._conn:
+            self._conn.execute("INSERT INTO documents_fts (documents_fts) VALUES ('delete-all')")
+            self._conn.execute('DELETE FROM document_labels')
+            self._conn.execute('DELETE FROM document_text')
+            self._conn.execute('DELETE FROM documents')
+            self._conn.execute('DELETE FROM sources')
+
+    def _filters(self, disorders, subreddits, since, before, min_score, max_score):
+        clauses, params = [], []
+        if disorders:
+            clauses.append('d.doc_id IN (SELECT doc_id FROM document_labels WHERE disorder IN (%s))'
+                           % ', '.join('?' * len(disorders)))
+            params.extend(disorders)
+        if subreddits:
+            clauses.append('d.subreddit COLLATE NOCASE IN (%s)' % ', '.join('?' * len(subreddits)))
+            params.extend(normalize_subreddit(name) for name in subreddits)
+        if since is not None:
+            clauses.append('d.created_utc >= ?')
+            params.append(parse_date(since))
+        if before is not None:
+            clauses.append('d.created_utc < ?')
+            params.append(parse_date(before))
+        if min_score is not None:
+            clauses.append('d.score >= ?')
+            params.append(min_score)
+        if max_score is not None:
+            clauses.append('d.score <= ?')
+            params.append(max_score)
+        return clauses, params
+
+    def search(self, query, disorders=None, subreddits=None, since=None, before=None,
+               min_score=None, max_score=None, order='rank', limit=20):
+        """
+        Return matching posts as row dicts, best match first by default
+
+        `since` and `before` are 'YYYY-MM-DD[ HH:MM:SS]' strings; `since` is
+        inclusive, `before` exclusive. `order` is one of ORDERS. Each row has
+        the output columns plus `Disorders` (list) and a highlighted
+        `Snippet` of the description.
+        """
+        clauses, params = self._filters(disorders, subreddits, since, before, min_score, max_score)
+        sql = (
+            'SELECT d.doc_id, d.created_utc, d.subreddit, d.score, d.num_comments, d.url '
+            'FROM documents_fts JOIN documents d ON d.doc_id = documents_fts.rowid '
+            'WHERE documents_fts MATCH ?'
+        )
+        sql += ''.join(f' AND {clause}' for clause in clauses)
+        sql += f' ORDER BY {ORDERS[order]} LIMIT ?'
+        rows = self._conn.execute(sql, [query] + params + [limit]).fetchall()
+        if not rows:
+            return []
+
+        # Text, snippets and labels only for the rows returned
+        doc_ids = [row[0] for row in rows]
+        marks = ', '.join('?' * len(doc_ids))
+        text = {doc_id: (title, snippet) for doc_id, title, snippet in self._conn.execute(
+            "SELECT rowid, title, snippet(documents_fts, 1, '[', ']', '...', 16) FROM documents_fts "
+            f'WHERE documents_fts MATCH ? AND rowid IN ({marks})', [query] + doc_ids)}
+        labels = {}
+        for doc_id, disorder in self._conn.execute(
+                f'SELECT doc_id, disorder FROM document_labels WHERE doc_id IN ({marks})', doc_ids):
+            labels.setdefault(doc_id, []).append(disorder)
+
+        return [{
+            'Date': format_date(created_utc),
+            'Title': text[doc_id][0],
+            'Subreddit': subreddit,
+            'Score': score,
+            'Num_Comments': num_comments,
+            'URL': url,
+            'Disorders': sorted(labels.get(doc_id, ())),
+            'Snippet': text[doc_id][1],
+        } for doc_id, created_utc, subreddit, score, num_comments, url in rows]
+
+    def count(self, query, disorders=None, subreddits=None, since=None, before=None,
+              min_score=None, max_score=None):
+        """
+        Number of posts matching a query and filters
+        """
+        clauses, params = self._filters(disorders, subreddits, since, before, min_score, max_score)
+        sql = ('SELECT COUNT(*) FROM documents_fts JOIN documents d ON d.doc_id = documents_fts.rowid '
+               'WHERE documents_fts MATCH ?')
+        sql += ''.join(f' AND {clause}' for clause in clauses)
+        return self._conn.execute(sql, [query] + params).fetchone()[0]
+
+
+def date_argument(value):
+    """
+    argparse type for --since/--before: the value, once it parses as a date
+    """
+    try:
+        parse_date(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {value!r}, expected YYYY-MM-DD[ HH:MM:SS]")
+    return value
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build and query a full-text index of collected posts")
+    parser.add_argument('--index', default=DEFAULT_INDEX_PATH, help="Index file")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help="Add new posts from stores, CSVs and workbooks")
+    build.add_argument('--store', action='append', default=[],
+                       help="Collection store to index (repeatable)")
+    build.add_argument('--csv-dir', default=None,
+                       help="Directory holding the per-disorder CSVs (ADHD.csv, ...)")
+    build.add_argument('--xlsx', action='append', default=[],
+                       help="Exported workbook to index (repeatable)")
+    build.add_argument('--rebuild', action='store_true',
+                       help="Empty the index first (e.g. after posts were relabelled)")
+    build.add_argument('--optimize', action='store_true',
+                       help="Merge the index into one segment afterwards")
+
+    search = commands.add_parser('search', help="Run a full-text query")
+    search.add_argument('query', help="FTS5 query, e.g. '\"was diagnosed\" adhd'")
+    search.add_argument('--disorder', action='append', default=None, help="Repeatable")
+    search.add_argument('--subreddit', action='append', default=None, help="Repeatable; with or without r/")
+    search.add_argument('--since', type=date_argument, default=None, help="YYYY-MM-DD, inclusive")
+    search.add_argument('--before', type=date_argument, default=None, help="YYYY-MM-DD, exclusive")
+    search.add_argument('--min-score', type=int, default=None)
+    search.add_argument('--max-score', type=int, default=None)
+    search.add_argument('--order', choices=sorted(ORDERS), default='rank')
+    search.add_argument('--limit', type=int, default=20)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    with PostIndex(args.index) as index:
+        if args.command == 'build':
+            start = time.perf_counter()
+            if args.rebuild:
+                index.rebuild()
+            added = 0
+            for store_path in args.store:
+                added += index.add_store(store_path)
+            if args.csv_dir is not None:
+                added += index.add_corpus(args.csv_dir)
+            for path in args.xlsx:
+                added += index.add_workbook(path)
+            if args.optimize:
+                index.optimize()
+            print(f"✓ Indexed {added} new post(s) in {time.perf_counter() - start:.1f}s; "
+                  f"{len(index)} in {args.index}")
+            return
+
+        filters = dict(disorders=args.disorder, subreddits=args.subreddit, since=args.since,
+                       before=args.before, min_score=args.min_score, max_score=args.max_score)
+        start = time.perf_counter()
+        try:
+            hits = index.search(args.query, order=args.order, limit=args.limit, **filters)
+            total = index.count(args.query, **filters)
+        except sqlite3.OperationalError as e:
+            print(f"✗ Invalid query: {e}")
+            return
+        elapsed = time.perf_counter() - start
+
+    print(f"✓ {total} matching post(s), showing {len(hits)} ({elapsed * 1000:.1f} ms)")
+    for hit in hits:
+        print(f"\n{hit['Date']}  {hit['Subreddit']}  score {hit['Score']}  [{', '.join(hit['Disorders'])}]")
+        print(f"  {hit['Title']}")
+        print(f"  {hit['Snippet']}")
+        print(f"  {hit['URL']}")
+
+
+if __name__ == "__main__":
+    main()
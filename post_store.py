@@ -0,0 +1,638 @@
+"""
+Durable Post Store
+SQLite store that the collector writes to as it goes: every accepted post
+and the `after` cursor of every (subreddit, sort) listing are committed
+together once per page, so an interrupted run can be resumed exactly
+where it stopped.
+
+Each post is stored once, with its author as a hashed id (author_ids.py);
+the disorders it was collected for are kept as labels in `post_labels`, and every post id the collector has classified is
+kept in `seen_posts` so later runs do not process it again.
+
+Comment threads of labelled posts can be harvested afterwards
+(comment_harvest.py): diagnosed comments are kept in `comments`, linked
+to their post, and every harvested thread is recorded in
+`comment_threads` so it is fetched only once.
+
+Subreddits whose listings keep failing, or that are private or banned,
+are recorded in `subreddit_circuits` (see fetch_retry.py), so later runs
+skip them until their cooldown passes.
+
+Optionally every fetched post, diagnosed or not, is also kept in compact
+raw form in `raw_posts` (text zlib-compressed), together with the
+disorders whose listings reached it, so the corpus can be reclassified
+offline with a new keyword set (see reclassify.py).
+"""
+
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+
+DEFAULT_STORE_PATH = 'mental_health_collection.sqlite'
+
+# Cursor sort name for archive dumps ingested by archive_ingest.py
+ARCHIVE_SORT = 'archive'
+
+# Output columns, in export order
+POST_COLUMNS = ['Date', 'Title', 'Description', 'Subreddit', 'Score', 'Num_Comments', 'URL']
+COMMENT_COLUMNS = ['Date', 'Comment', 'Score', 'Depth', 'By_Author', 'URL', 'Post_URL']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at TEXT NOT NULL,
+    finished_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS cursors (
+    run_id INTEGER NOT NULL,
+    disorder TEXT NOT NULL,
+    subreddit TEXT NOT NULL,
+    sort TEXT NOT NULL,
+    after TEXT,
+    fetched INTEGER NOT NULL DEFAULT 0,
+    done INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (run_id, disorder, subreddit, sort)
+);
+
+CREATE TABLE IF NOT EXISTS listing_state (
+    disorder TEXT NOT NULL,
+    subreddit TEXT NOT NULL,
+    sort TEXT NOT NULL,
+    newest_created_utc REAL,
+    newest_post_id TEXT,
+    refreshed_at REAL,
+    PRIMARY KEY (disorder, subreddit, sort)
+);
+
+CREATE TABLE IF NOT EXISTS posts (
+    post_id TEXT PRIMARY KEY,
+    run_id INTEGER NOT NULL,
+    date TEXT,
+    title TEXT,
+    description TEXT,
+    subreddit TEXT,
+    score INTEGER,
+    num_comments INTEGER,
+    url TEXT,
+    author_id TEXT
+);
+
+CREATE INDEX IF NOT EXISTS posts_author ON posts (author_id);
+
+CREATE TABLE IF NOT EXISTS post_labels (
+    post_id TEXT NOT NULL,
+    disorder TEXT NOT NULL,
+    run_id INTEGER NOT NULL,
+    PRIMARY KEY (post_id, disorder)
+);
+
+CREATE INDEX IF NOT EXISTS post_labels_disorder ON post_labels (disorder, run_id);
+
+CREATE TABLE IF NOT EXISTS seen_posts (
+    post_id TEXT PRIMARY KEY,
+    content_hash TEXT,
+    canonical_id TEXT NOT NULL,
+    diagnosed INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS raw_posts (
+    post_id TEXT PRIMARY KEY,
+    subreddit TEXT NOT NULL,
+    created_utc REAL NOT NULL,
+    score INTEGER,
+    num_comments INTEGER,
+    permalink TEXT,
+    body BLOB NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS raw_post_disorders (
+    post_id TEXT NOT NULL,
+    disorder TEXT NOT NULL,
+    PRIMARY KEY (post_id, disorder)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS comment_threads (
+    post_id TEXT PRIMARY KEY,
+    run_id INTEGER NOT NULL,
+    fetched INTEGER NOT NULL,
+    requests INTEGER NOT NULL,
+    unexpanded INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS comments (
+    comment_id TEXT PRIMARY KEY,
+    post_id TEXT NOT NULL,
+    parent_id TEXT,
+    run_id INTEGER NOT NULL,
+    date TEXT,
+    body TEXT,
+    score INTEGER,
+    depth INTEGER,
+    by_author INTEGER,
+    url TEXT
+);
+
+CREATE INDEX IF NOT EXISTS comments_post ON comments (post_id);
+
+CREATE TABLE IF NOT EXISTS subreddit_circuits (
+    subreddit TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    failures INTEGER NOT NULL,
+    opened_at REAL,
+    cooldown REAL,
+    reason TEXT
+);
+"""
+
+# Bumped whenever SCHEMA changes in a way _migrate has to handle
+SCHEMA_VERSION = 2
+
+
+# Level 6 is nearly as small as 9 for short texts, at a fraction of the CPU
+RAW_COMPRESSION_LEVEL = 6
+
+
+def pack_raw_post(post, subreddit_name):
+    """
+    Compact raw_posts record for a fetched post
+
+    Title and selftext are stored as one zlib-compressed blob, separated
+    by a NUL character.
+    """
+    body = zlib.compress(f"{post.title}\0{post.selftext}".encode('utf-8'), RAW_COMPRESSION_LEVEL)
+    return (post.id, subreddit_name, post.created_utc, post.score, post.num_comments, post.permalink, body)
+
+
+def unpack_raw_text(body):
+    """
+    Return (title, selftext) from a raw_posts body
+    """
+    title, _, selftext = zlib.decompress(body).decode('utf-8').partition('\0')
+    return title, selftext
+
+
+class ListingCursor:
+    """
+    Progress through one (subreddit, sort) listing
+    """
+
+    __slots__ = ('after', 'fetched', 'done')
+
+    def __init__(self, after=None, fetched=0, done=False):
+        self.after = after
+        self.fetched = fetched
+        self.done = done
+
+
+class ListingState:
+    """
+    What earlier runs already saw of one listing
+
+    For `new` listings the newest post seen is a high-water mark: anything
+    older was fetched by a previous run. `refreshed_at` is the Unix time the
+    listing was last traversed to the end or until its disorder's target
+    was reached.
+    """
+
+    __slots__ = ('newest_created_utc', 'newest_post_id', 'refreshed_at')
+
+    def __init__(self, newest_created_utc=None, newest_post_id=None, refreshed_at=None):
+        self.newest_created_utc = newest_created_utc
+        self.newest_post_id = newest_post_id
+        self.refreshed_at = refreshed_at
+
+    def is_crossed_by(self, post):
+        """
+        True once a newest-first traversal reaches posts already seen
+        """
+        if self.newest_created_utc is None:
+            return False
+        return post.id == self.newest_post_id or post.created_utc < self.newest_created_utc
+
+
+class PageResult:
+    """
+    What one listing page adds to the store, committed with its cursor
+
+    `posts` holds (post_id, row dict) pairs for newly accepted posts,
+    `labels` the post ids that gained the disorder's label, and `seen`
+    (post_id, content_hash, canonical_id, diagnosed) for every post
+    classified or recognised as a repost on the page. `raw` holds
+    pack_raw_post records for every fetched post when raw posts are kept.
+    """
+
+    __slots__ = ('posts', 'labels', 'seen', 'raw')
+
+    def __init__(self):
+        self.posts = []
+        self.labels = []
+        self.seen = []
+        self.raw = []
+
+
+class PostStore:
+    """
+    Append-only SQLite store of collected posts and listing cursors
+
+    One connection is shared by all collection workers behind a lock; WAL
+    journaling keeps each per-page commit cheap.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._migrate()
+        self._conn.executescript(SCHEMA)
+        self._conn.execute(f'PRAGMA user_version={SCHEMA_VERSION}')
+        self._conn.commit()
+
+    def _migrate(self):
+        """
+        Upgrade stores written before posts were deduplicated across
+        disorders (version 0) or had author ids (version 1)
+        """
+        version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(posts)')]
+        if version >= SCHEMA_VERSION or not columns:
+            return
+        if 'disorder' not in columns:
+            if 'author_id' not in columns:
+                with self._conn:
+                    self._conn.execute('ALTER TABLE posts ADD COLUMN author_id TEXT')
+            return
+        with self._conn:
+            self._conn.execute('ALTER TABLE posts RENAME TO posts_v0')
+            # executescript would commit mid-migration, so run statements one by one
+            for statement in SCHEMA.split(';'):
+                if statement.strip():
+                    self._conn.execute(statement)
+            self._conn.execute(
+                'INSERT OR IGNORE INTO posts (post_id, run_id, date, title, description, subreddit, '
+                'score, num_comments, url) SELECT post_id, run_id, date, title, description, '
+                'subreddit, score, num_comments, url FROM posts_v0 ORDER BY rowid'
+            )
+            self._conn.execute('INSERT OR IGNORE INTO post_labels SELECT post_id, disorder, run_id FROM posts_v0')
+            self._conn.execute('INSERT OR IGNORE INTO seen_posts SELECT post_id, NULL, post_id, 1 FROM posts_v0')
+            self._conn.execute('DROP TABLE posts_v0')
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start_run(self, resume=False):
+        """
+        Return the run id to collect under
+
+        With resume=True the most recent unfinished run is continued, if any.
+        """
+        with self._lock:
+            if resume:
+                row = self._conn.execute(
+                    'SELECT run_id FROM runs WHERE finished_at IS NULL ORDER BY run_id DESC LIMIT 1'
+                ).fetchone()
+                if row:
+                    return row[0]
+            cursor = self._conn.execute('INSERT INTO runs (started_at) VALUES (?)',
+                                        (datetime.now().isoformat(),))
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def finish_run(self, run_id):
+        with self._lock:
+            self._conn.execute('UPDATE runs SET finished_at = ? WHERE run_id = ?',
+                               (datetime.now().isoformat(), run_id))
+            self._conn.commit()
+
+    def load_cursor(self, run_id, disorder, subreddit, sort):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT after, fetched, done FROM cursors '
+                'WHERE run_id = ? AND disorder = ? AND subreddit = ? AND sort = ?',
+                (run_id, disorder, subreddit, sort)
+            ).fetchone()
+        if row is None:
+            return ListingCursor()
+        return ListingCursor(row[0], row[1], bool(row[2]))
+
+    def checkpoint(self, run_id, disorder, subreddit, sort, cursor, result=None):
+        """
+        Atomically record one page's PageResult and advance the listing cursor
+        """
+        with self._lock, self._conn:
+            self._write_result(run_id, disorder, result or PageResult())
+            self._conn.execute(
+                'INSERT OR REPLACE INTO cursors VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (run_id, disorder, subreddit, sort, cursor.after, cursor.fetched, int(cursor.done))
+            )
+
+    def checkpoint_archive(self, run_id, source, cursor, results):
+        """
+        Atomically record one chunk of an archive dump and advance its cursor
+
+        `results` maps disorder names to PageResults. The cursor is kept
+        under the dump's file name with sort 'archive' and no disorder;
+        `fetched` counts decompressed bytes read.
+        """
+        with self._lock, self._conn:
+            for disorder, result in results.items():
+                self._write_result(run_id, disorder, result)
+            self._conn.execute(
+                'INSERT OR REPLACE INTO cursors VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (run_id, '', source, ARCHIVE_SORT, cursor.after, cursor.fetched, int(cursor.done))
+            )
+
+    def _write_result(self, run_id, disorder, result):
+        posts, labels, seen = result.posts, result.labels, result.seen
+        if result.raw:
+            self._conn.executemany('INSERT OR IGNORE INTO raw_posts VALUES (?, ?, ?, ?, ?, ?, ?)', result.raw)
+            self._conn.executemany('INSERT OR IGNORE INTO raw_post_disorders VALUES (?, ?)',
+                                   [(record[0], disorder) for record in result.raw])
+        self._conn.executemany(
+            'INSERT OR IGNORE INTO seen_posts VALUES (?, ?, ?, ?)',
+            [(post_id, digest, canonical_id, None if diagnosed is None else int(diagnosed))
+             for post_id, digest, canonical_id, diagnosed in seen]
+        )
+        self._conn.executemany(
+            'INSERT OR IGNORE INTO posts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [(post_id, run_id, row['Date'], row['Title'], row['Description'],
+              row['Subreddit'], row['Score'], row['Num_Comments'], row['URL'],
+              row.get('Author_ID'))
+             for post_id, row in posts]
+        )
+        self._conn.executemany(
+            'INSERT OR IGNORE INTO post_labels VALUES (?, ?, ?)',
+            [(post_id, disorder, run_id) for post_id in labels]
+        )
+
+    def load_listing_state(self, disorder, subreddit, sort):
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT newest_created_utc, newest_post_id, refreshed_at FROM listing_state '
+                'WHERE disorder = ? AND subreddit = ? AND sort = ?',
+                (disorder, subreddit, sort)
+            ).fetchone()
+        if row is None:
+            return ListingState()
+        return ListingState(*row)
+
+    def save_listing_state(self, disorder, subreddit, sort, state):
+        """
+        Record a finished traversal; the high-water mark only moves forward
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                'SELECT newest_created_utc, newest_post_id FROM listing_state '
+                'WHERE disorder = ? AND subreddit = ? AND sort = ?',
+                (disorder, subreddit, sort)
+            ).fetchone()
+            newest_created_utc, newest_post_id = state.newest_created_utc, state.newest_post_id
+            if row and row[0] is not None and (newest_created_utc is None or row[0] > newest_created_utc):
+                newest_created_utc, newest_post_id = row
+            self._conn.execute(
+                'INSERT OR REPLACE INTO listing_state VALUES (?, ?, ?, ?, ?, ?)',
+                (disorder, subreddit, sort, newest_created_utc, newest_post_id, state.refreshed_at)
+            )
+
+    def load_circuits(self):
+        """
+        Map lowercased subreddit names to their stored circuit breaker
+        (state, failures, opened_at, cooldown, reason)
+        """
+        with self._lock:
+            return {row[0]: row[1:] for row in self._conn.execute('SELECT * FROM subreddit_circuits')}
+
+    def save_circuit(self, subreddit, state):
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO subreddit_circuits VALUES (?, ?, ?, ?, ?, ?)',
+                (subreddit, state.state, state.failures, state.opened_at, state.cooldown, state.reason)
+            )
+
+    def clear_circuits(self):
+        """
+        Forget every subreddit's failures; returns how many were recorded
+        """
+        with self._lock, self._conn:
+            return self._conn.execute('DELETE FROM subreddit_circuits').rowcount
+
+    def post_ids(self, disorder):
+        """
+        Ids of every stored post labelled with a disorder, across all runs
+        """
+        with self._lock:
+            return {row[0] for row in self._conn.execute(
+                'SELECT post_id FROM post_labels WHERE disorder = ?', (disorder,))}
+
+    def count_posts(self, disorder, run_id=None):
+        """
+        Number of posts labelled with a disorder (in one run, if given)
+        """
+        query = 'SELECT COUNT(*) FROM post_labels WHERE disorder = ?'
+        params = [disorder]
+        if run_id is not None:
+            query += ' AND run_id = ?'
+            params.append(run_id)
+        with self._lock:
+            return self._conn.execute(query, params).fetchone()[0]
+
+    def iter_seen(self):
+        """
+        Yield (post_id, content_hash, canonical_id, diagnosed, labels) for DedupIndex.load
+        """
+        with self._lock:
+            labels = {}
+            for post_id, disorder in self._conn.execute('SELECT post_id, disorder FROM post_labels'):
+                labels.setdefault(post_id, []).append(disorder)
+            rows = self._conn.execute(
+                'SELECT post_id, content_hash, canonical_id, diagnosed FROM seen_posts'
+            ).fetchall()
+        for post_id, digest, canonical_id, diagnosed in rows:
+            yield post_id, digest, canonical_id, diagnosed, labels.get(post_id, ())
+
+    def load_posts(self, disorder):
+        """
+        Return every stored post labelled with a disorder as output row dicts,
+        newest first
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT p.date, p.title, p.description, p.subreddit, p.score, p.num_comments, p.url '
+                'FROM post_labels l JOIN posts p ON p.post_id = l.post_id WHERE l.disorder = ? '
+                'ORDER BY p.date DESC',
+                (disorder,)
+            ).fetchall()
+        return [dict(zip(POST_COLUMNS, row)) for row in rows]
+
+    def load_all(self, disorders):
+        return {disorder: self.load_posts(disorder) for disorder in disorders}
+
+    def iter_post_rows(self, disorder, batch_size=5000):
+        """
+        Yield batches of POST_COLUMNS tuples for every post labelled with a
+        disorder, newest first
+
+        SQLite sorts with an external merge sort that spills to temporary
+        files, so memory use stays flat however many posts are stored.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT p.date, p.title, p.description, p.subreddit, p.score, p.num_comments, p.url '
+                'FROM post_labels l JOIN posts p ON p.post_id = l.post_id WHERE l.disorder = ? '
+                'ORDER BY p.date DESC',
+                (disorder,)
+            )
+        while True:
+            with self._lock:
+                batch = rows.fetchmany(batch_size)
+            if not batch:
+                break
+            yield batch
+
+    def count_raw_posts(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM raw_posts').fetchone()[0]
+
+    def iter_raw_posts(self, batch_size=5000):
+        """
+        Yield batches of (post_id, canonical_id, diagnosed, subreddit,
+        created_utc, score, num_comments, permalink, body) tuples for every
+        raw post; `diagnosed` is the stored verdict, if any
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT r.post_id, COALESCE(s.canonical_id, r.post_id), s.diagnosed, r.subreddit, '
+                'r.created_utc, r.score, r.num_comments, r.permalink, r.body '
+                'FROM raw_posts r LEFT JOIN seen_posts s ON s.post_id = r.post_id'
+            )
+        while True:
+            with self._lock:
+                batch = rows.fetchmany(batch_size)
+            if not batch:
+                break
+            yield batch
+
+    def raw_post_disorders(self):
+        """
+        Map every raw post id to the disorders whose listings reached it
+        """
+        disorders = {}
+        with self._lock:
+            for post_id, disorder in self._conn.execute('SELECT post_id, disorder FROM raw_post_disorders'):
+                disorders.setdefault(post_id, set()).add(disorder)
+        return disorders
+
+    def labels_by_post(self):
+        """
+        Map every labelled post id to its set of disorder labels
+        """
+        labels = {}
+        with self._lock:
+            for post_id, disorder in self._conn.execute('SELECT post_id, disorder FROM post_labels'):
+                labels.setdefault(post_id, set()).add(disorder)
+        return labels
+
+    def apply_label_changes(self, run_id, added, removed, rows, verdicts):
+        """
+        Atomically write back a reclassification
+
+        `added` and `removed` are (post_id, disorder) pairs, `rows` maps post
+        ids that gained a label to their output row dict (ignored if the post
+        is already stored), and `verdicts` is (post_id, diagnosed) pairs for
+        seen_posts. Posts left without any label are dropped from `posts`.
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO posts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(post_id, run_id, row['Date'], row['Title'], row['Description'],
+                  row['Subreddit'], row['Score'], row['Num_Comments'], row['URL'],
+                  row.get('Author_ID'))
+                 for post_id, row in rows.items()]
+            )
+            self._conn.executemany('INSERT OR IGNORE INTO post_labels VALUES (?, ?, ?)',
+                                   [(post_id, disorder, run_id) for post_id, disorder in added])
+            self._conn.executemany('DELETE FROM post_labels WHERE post_id = ? AND disorder = ?', removed)
+            self._conn.executemany(
+                'DELETE FROM posts WHERE post_id = ? '
+                'AND NOT EXISTS (SELECT 1 FROM post_labels l WHERE l.post_id = posts.post_id)',
+                [(post_id,) for post_id in {post_id for post_id, _ in removed}]
+            )
+            self._conn.executemany('UPDATE seen_posts SET diagnosed = ? WHERE post_id = ?',
+                                   [(int(diagnosed), post_id) for post_id, diagnosed in verdicts])
+
+    def posts_without_comments(self):
+        """
+        Ids of labelled posts with comments whose thread was not harvested yet
+        """
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                'SELECT p.post_id FROM posts p '
+                'WHERE p.num_comments > 0 '
+                'AND EXISTS (SELECT 1 FROM post_labels l WHERE l.post_id = p.post_id) '
+                'AND NOT EXISTS (SELECT 1 FROM comment_threads t WHERE t.post_id = p.post_id) '
+                'ORDER BY p.rowid'
+            )]
+
+    def save_comment_thread(self, run_id, post_id, rows, fetched, requests, unexpanded):
+        """
+        Atomically record a harvested thread and its kept comments
+
+        `rows` holds (comment_id, parent_id, row dict) for every kept comment.
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO comments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [(comment_id, post_id, parent_id, run_id, row['Date'], row['Comment'],
+                  row['Score'], row['Depth'], int(row['By_Author']), row['URL'])
+                 for comment_id, parent_id, row in rows]
+            )
+            self._conn.execute('INSERT OR REPLACE INTO comment_threads VALUES (?, ?, ?, ?, ?)',
+                               (post_id, run_id, fetched, requests, unexpanded))
+
+    def count_comments(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM comments').fetchone()[0]
+
+    def load_comments(self, disorder):
+        """
+        Return every stored comment on a post labelled with a disorder as
+        output row dicts, newest first
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT c.date, c.body, c.score, c.depth, c.by_author, c.url, p.url '
+                'FROM post_labels l JOIN comments c ON c.post_id = l.post_id '
+                'JOIN posts p ON p.post_id = l.post_id WHERE l.disorder = ? '
+                'ORDER BY c.date DESC',
+                (disorder,)
+            ).fetchall()
+        return [dict(zip(COMMENT_COLUMNS, row[:4] + (bool(row[4]),) + row[5:])) for row in rows]
+
+    def iter_author_posts(self, batch_size=50000):
+        """
+        Yield batches of (author_id, post_id, date, subreddit, score,
+        num_comments, disorders) for every labelled post with a known
+        author, ordered by author and date; `disorders` is comma-separated
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT p.author_id, p.post_id, p.date, p.subreddit, p.score, p.num_comments, '
+                'GROUP_CONCAT(l.disorder) FROM posts p JOIN post_labels l ON l.post_id = p.post_id '
+                'WHERE p.author_id IS NOT NULL GROUP BY p.post_id ORDER BY p.author_id, p.date, p.post_id'
+            )
+        while True:
+            with self._lock:
+                batch = rows.fetchmany(batch_size)
+            if not batch:
+                break
+            yield batch
@@ -0,0 +1,95 @@
+"""
+Shared Rate Limiter
+Token bucket used by every collection worker so that all concurrent
+listing fetches draw from one Reddit API budget
+"""
+
+import threading
+import time
+
+# Reddit allows 100 queries per minute per OAuth client id
+REDDIT_REQUESTS_PER_MINUTE = 100
+
+
+class TokenBucketRateLimiter:
+    """
+    Thread-safe token bucket driven by Reddit's rate-limit response headers
+
+    Every request takes one token. Tokens refill continuously at `rate` per
+    second up to `capacity`, which bounds how many requests may burst at
+    once. After each response, `update_from_headers` re-sizes the bucket to
+    the budget Reddit reports: the remaining requests are spread evenly over
+    the seconds left in the current window, and an exhausted budget blocks
+    all workers until the window resets.
+    """
+
+    def __init__(self, requests_per_minute=REDDIT_REQUESTS_PER_MINUTE, capacity=10,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.default_rate = requests_per_minute / 60.0
+        self.rate = self.default_rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self._clock = clock
+        self._sleep = sleep
+        self._last_refill = clock()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+        # Totals for reporting
+        self.requests_granted = 0
+        self.total_wait = 0.0
+
+    def _refill(self, now):
+        elapsed = now - self._last_refill
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self._last_refill = now
+
+    def acquire(self):
+        """
+        Block until a request may be sent; return the seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                if now >= self._blocked_until:
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        self.requests_granted += 1
+                        self.total_wait += waited
+                        return waited
+                    wait = (1 - self.tokens) / self.rate
+                else:
+                    wait = self._blocked_until - now
+            self._sleep(wait)
+            waited += wait
+
+    def update_from_headers(self, headers):
+        """
+        Re-size the bucket from X-Ratelimit-Remaining / X-Ratelimit-Reset
+        """
+        remaining = headers.get('X-Ratelimit-Remaining')
+        reset = headers.get('X-Ratelimit-Reset')
+        if remaining is None or reset is None:
+            return
+
+        try:
+            remaining = float(remaining)
+            reset = max(float(reset), 1.0)
+        except ValueError:
+            return
+
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            if remaining < 1:
+                # Budget exhausted: nobody sends until the window rolls over
+                self.tokens = 0.0
+                self._blocked_until = now + reset
+                self._last_refill = self._blocked_until
+                self.rate = self.default_rate
+            else:
+                self.tokens = min(self.tokens, remaining)
+                self.rate = remaining / reset
@@ -0,0 +1,199 @@
+"""
+Offline Reclassification
+Re-runs diagnosis detection over the raw posts kept in a collection store
+(collected with --keep-raw) instead of re-crawling Reddit. Posts are
+decompressed and classified in batches on a process pool, and only the
+disorder labels that change are written back.
+
+Usage:
+    python reclassify.py --keywords keywords.txt --dry-run
+    python reclassify.py --keywords keywords.txt
+
+The keyword file holds one regular expression per line, in the same form
+as DIAGNOSIS_KEYWORDS; blank lines and lines starting with '#' are
+ignored. Without --keywords the collector's current list is used.
+"""
+
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from diagnosis_matcher import DiagnosisMatcher
+from post_store import PostStore, DEFAULT_STORE_PATH, unpack_raw_text
+from reddit_client import RedditPost
+from reddit_mental_health_collector import DIAGNOSIS_KEYWORDS, CUTOFF_DATE, build_post_row
+
+# Raw posts sent to a worker process at once
+DEFAULT_BATCH_SIZE = 5000
+
+# Matcher for the current worker process, built once by _init_worker
+_matcher = None
+
+
+def load_keywords(path):
+    """
+    Read a keyword file: one pattern per line, '#' comments
+    """
+    with open(path, encoding='utf-8') as f:
+        lines = (line.strip() for line in f)
+        return [line for line in lines if line and not line.startswith('#')]
+
+
+def _init_worker(keywords):
+    global _matcher
+    _matcher = DiagnosisMatcher(keywords)
+
+
+def classify_raw_batch(batch):
+    """
+    Diagnosis verdicts for a batch of iter_raw_posts rows (runs in worker processes)
+    """
+    texts = []
+    for record in batch:
+        created_utc, body = record[4], record[8]
+        if created_utc < CUTOFF_DATE:
+            texts.append('')
+        else:
+            title, selftext = unpack_raw_text(body)
+            texts.append(f"{title} {selftext}")
+    return _matcher.classify_batch(texts)
+
+
+def _classify_batches(executor, batches, max_pending):
+    """
+    Yield (batch, verdicts) in order, with at most `max_pending` batches in flight
+    """
+    pending = deque()
+    for batch in batches:
+        pending.append((batch, executor.submit(classify_raw_batch, batch)))
+        if len(pending) >= max_pending:
+            batch, future = pending.popleft()
+            yield batch, future.result()
+    while pending:
+        batch, future = pending.popleft()
+        yield batch, future.result()
+
+
+def raw_to_row(record):
+    """
+    Build the output row for an iter_raw_posts row
+    """
+    post_id, _, _, subreddit_name, created_utc, score, num_comments, permalink, body = record
+    title, selftext = unpack_raw_text(body)
+    post = RedditPost(post_id, f"t3_{post_id}", title, selftext, created_utc, permalink,
+                      score, num_comments, subreddit_name, None)
+    return build_post_row(post, subreddit_name)
+
+
+def reclassify(store, keywords, processes=None, batch_size=DEFAULT_BATCH_SIZE, dry_run=False):
+    """
+    Reclassify every raw post in `store` with `keywords` and write back label changes
+
+    Reposts share their canonical post's verdict. A canonical post is
+    labelled with every disorder whose listings reached it (or one of its
+    reposts) if it is diagnosed, and loses those labels otherwise; labels
+    with no raw post behind them are left alone. Returns (added, removed)
+    lists of (post_id, disorder) pairs.
+    """
+    sources = store.raw_post_disorders()
+    reached = {}
+    diagnosed = {}
+    stored_verdicts = {}
+    records = {}
+
+    processes = processes or os.cpu_count() or 1
+    with ProcessPoolExecutor(processes, initializer=_init_worker, initargs=(keywords,)) as executor:
+        batches = store.iter_raw_posts(batch_size)
+        for batch, verdicts in _classify_batches(executor, batches, 2 * processes):
+            for record, verdict in zip(batch, verdicts):
+                post_id, canonical_id, stored = record[0], record[1], record[2]
+                reached.setdefault(canonical_id, set()).update(sources.get(post_id, ()))
+                # The canonical post's own text decides; a repost stands in if it is missing
+                if post_id == canonical_id or canonical_id not in diagnosed:
+                    diagnosed[canonical_id] = verdict
+                    if verdict:
+                        records[canonical_id] = record
+                    else:
+                        records.pop(canonical_id, None)
+                if post_id == canonical_id:
+                    stored_verdicts[canonical_id] = stored
+
+    labels = store.labels_by_post()
+    added, removed = [], []
+    for canonical_id, disorders in reached.items():
+        have = labels.get(canonical_id, set())
+        want = disorders if diagnosed[canonical_id] else set()
+        added.extend((canonical_id, disorder) for disorder in sorted(want - have))
+        removed.extend((canonical_id, disorder) for disorder in sorted((have & disorders) - want))
+
+    changed_verdicts = [
+        (post_id, verdict) for post_id, verdict in diagnosed.items()
+        if post_id in stored_verdicts
+        and (stored_verdicts[post_id] is None or bool(stored_verdicts[post_id]) != verdict)
+    ]
+
+    if not dry_run and (added or removed or changed_verdicts):
+        rows = {post_id: raw_to_row(records[post_id]) for post_id in {post_id for post_id, _ in added}}
+        run_id = store.start_run()
+        store.apply_label_changes(run_id, added, removed, rows, changed_verdicts)
+        store.finish_run(run_id)
+    return added, removed
+
+
+def print_changes(added, removed):
+    """
+    Print label changes per disorder
+    """
+    disorders = sorted({disorder for _, disorder in added + removed})
+    print(f"{'Disorder':20} {'added':>8} {'removed':>8}")
+    print(f"{'-'*38}")
+    for disorder in disorders:
+        gained = sum(1 for _, d in added if d == disorder)
+        lost = sum(1 for _, d in removed if d == disorder)
+        print(f"{disorder:20} {gained:>8} {lost:>8}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Reclassify stored raw posts with a new keyword set")
+    parser.add_argument('--store', default=DEFAULT_STORE_PATH,
+                        help="Collection store written with --keep-raw")
+    parser.add_argument('--keywords', default=None,
+                        help="File with one diagnosis keyword pattern per line (default: the collector's list)")
+    parser.add_argument('--processes', type=int, default=None,
+                        help="Worker processes (default: one per CPU)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Raw posts classified per task")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Report label changes without writing them")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    keywords = load_keywords(args.keywords) if args.keywords else DIAGNOSIS_KEYWORDS
+
+    print("="*60)
+    print("OFFLINE RECLASSIFICATION")
+    print("="*60)
+
+    with PostStore(args.store) as store:
+        total = store.count_raw_posts()
+        if not total:
+            print(f"✗ No raw posts in {args.store}. Collect with --keep-raw first.")
+            return
+        print(f"✓ Reclassifying {total} raw posts with {len(keywords)} keyword pattern(s)")
+
+        start = time.perf_counter()
+        added, removed = reclassify(store, keywords, args.processes, args.batch_size, args.dry_run)
+        elapsed = time.perf_counter() - start
+
+    print(f"✓ {len(added)} label(s) added, {len(removed)} removed in {elapsed:.1f}s"
+          + (" (dry run, nothing written)" if args.dry_run else ""))
+    if added or removed:
+        print_changes(added, removed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+"""
+Reddit Listing Client
+Minimal thread-safe client for Reddit's listing endpoints. Unlike PRAW it
+exposes the listing `after` cursor and the rate-limit response headers, so
+many workers can page through listings concurrently while sharing one
+rate limiter.
+"""
+
+import threading
+import time
+from collections import deque
+
+import requests
+
+from collector_metrics import Metrics
+from rate_limiter import TokenBucketRateLimiter
+
+REDDIT_API_URL = 'https://oauth.reddit.com'
+REDDIT_TOKEN_URL = 'https://www.reddit.com/api/v1/access_token'
+
+# Reddit returns at most 100 items per listing request
+LISTING_PAGE_SIZE = 100
+
+# Attempts per page when Reddit answers 429 Too Many Requests
+MAX_RATE_LIMIT_RETRIES = 5
+
+# Comments requested with a thread; Reddit serves at most 500
+COMMENT_LIMIT = 500
+
+# Comment ids Reddit expands per /api/morechildren request
+MORECHILDREN_BATCH_SIZE = 100
+
+# /api/morechildren requests allowed per thread by default
+DEFAULT_MORE_REQUESTS = 4
+
+
+class RedditPost:
+    """
+    Submission fields used by the collector, parsed from listing JSON
+
+    Attribute names match PRAW's Submission so collector code can treat
+    both the same way.
+    """
+
+    __slots__ = ('id', 'name', 'title', 'selftext', 'created_utc', 'permalink',
+                 'score', 'num_comments', 'subreddit', 'author')
+
+    def __init__(self, id, name, title, selftext, created_utc, permalink,
+                 score, num_comments, subreddit, author):
+        self.id = id
+        self.name = name
+        self.title = title
+        self.selftext = selftext
+        self.created_utc = created_utc
+        self.permalink = permalink
+        self.score = score
+        self.num_comments = num_comments
+        self.subreddit = subreddit
+        self.author = author
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(
+            id=data['id'],
+            name=data.get('name') or f"t3_{data['id']}",
+            title=data.get('title') or '',
+            selftext=data.get('selftext') or '',
+            created_utc=float(data.get('created_utc') or 0),
+            permalink=data.get('permalink') or '',
+            score=int(data.get('score') or 0),
+            num_comments=int(data.get('num_comments') or 0),
+            subreddit=data.get('subreddit') or '',
+            author=data.get('author')
+        )
+
+
+class RedditComment:
+    """
+    Comment fields used by the collector, parsed from comment JSON
+
+    `parent_id` is the fullname of the parent comment (t1_) or post (t3_).
+    """
+
+    __slots__ = ('id', 'name', 'parent_id', 'link_id', 'body', 'created_utc',
+                 'score', 'depth', 'is_submitter', 'permalink')
+
+    def __init__(self, id, name, parent_id, link_id, body, created_utc,
+                 score, depth, is_submitter, permalink):
+        self.id = id
+        self.name = name
+        self.parent_id = parent_id
+        self.link_id = link_id
+        self.body = body
+        self.created_utc = created_utc
+        self.score = score
+        self.depth = depth
+        self.is_submitter = is_submitter
+        self.permalink = permalink
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(
+            id=data['id'],
+            name=data.get('name') or f"t1_{data['id']}",
+            parent_id=data.get('parent_id'),
+            link_id=data.get('link_id'),
+            body=data.get('body') or '',
+            created_utc=float(data.get('created_utc') or 0),
+            score=int(data.get('score') or 0),
+            depth=int(data.get('depth') or 0),
+            is_submitter=bool(data.get('is_submitter')),
+            permalink=data.get('permalink') or ''
+        )
+
+
+class CommentTree:
+    """
+    Comments of one thread, as far as they were expanded
+
+    `requests` counts the API requests spent on the thread. `unexpanded`
+    is a lower bound on the comments left behind 'more' stubs, because
+    the request budget ran out or the thread went deeper than Reddit
+    serves at once.
+    """
+
+    __slots__ = ('post_id', 'comments', 'requests', 'unexpanded')
+
+    def __init__(self, post_id, comments, requests, unexpanded):
+        self.post_id = post_id
+        self.comments = comments
+        self.requests = requests
+        self.unexpanded = unexpanded
+
+
+def collect_comments(things, comments, more):
+    """
+    Flatten comment things (with nested `replies`) into `comments`, and
+    append the data of every 'more' stub to `more`
+    """
+    stack = list(reversed(things))
+    while stack:
+        thing = stack.pop()
+        kind, data = thing.get('kind'), thing.get('data', {})
+        if kind == 'more':
+            more.append(data)
+        elif kind == 't1':
+            comments.append(RedditComment.from_json(data))
+            replies = data.get('replies')
+            if isinstance(replies, dict):
+                stack.extend(reversed(replies.get('data', {}).get('children', [])))
+
+
+class ListingPage:
+    """
+    One page of a listing: the posts and the cursor for the next page
+    """
+
+    __slots__ = ('posts', 'after')
+
+    def __init__(self, posts, after):
+        self.posts = posts
+        self.after = after
+
+
+class RedditClient:
+    """
+    Read-only Reddit API client using application-only OAuth
+
+    `api_url` and `token_url` can point at a local stand-in server; with
+    `token_url=None` no authentication is performed. Every request is
+    recorded in `metrics` (latency, status, rate-limit wait and retries),
+    and every response is saved by `recorder` (an http_fixtures
+    FixtureRecorder), if given, for offline replay.
+    """
+
+    def __init__(self, client_id, client_secret, user_agent,
+                 api_url=REDDIT_API_URL, token_url=REDDIT_TOKEN_URL,
+                 rate_limiter=None, timeout=30, metrics=None, recorder=None):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.user_agent = user_agent
+        self.api_url = api_url.rstrip('/')
+        self.token_url = token_url
+        self.rate_limiter = rate_limiter or TokenBucketRateLimiter()
+        self.timeout = timeout
+        self.metrics = metrics or Metrics()
+        self.recorder = recorder
+
+        self._token = None
+        self._token_expires = 0.0
+        self._token_lock = threading.Lock()
+        self._local = threading.local()
+        # Reddit allows only one /api/morechildren request at a time per client
+        self._morechildren_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """
+        requests.Session per worker thread
+        """
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers['User-Agent'] = self.user_agent
+            self._local.session = session
+        return session
+
+    def authenticate(self):
+        """
+        Fetch (or reuse) an application-only OAuth token
+        """
+        if self.token_url is None:
+            return None
+        with self._token_lock:
+            if self._token and time.time() < self._token_expires - 60:
+                return self._token
+            response = self.session.post(
+                self.token_url,
+                auth=(self.client_id, self.client_secret),
+                data={'grant_type': 'client_credentials'},
+                timeout=self.timeout
+            )
+            response.raise_for_status()
+            payload = response.json()
+            if 'access_token' not in payload:
+                raise requests.HTTPError(f"Authentication failed: {payload}")
+            self._token = payload['access_token']
+            self._token_expires = time.time() + float(payload.get('expires_in', 3600))
+            return self._token
+
+    def _get(self, path, params, endpoint):
+        headers = {}
+        token = self.authenticate()
+        if token:
+            headers['Authorization'] = f'bearer {token}'
+
+        for _ in range(MAX_RATE_LIMIT_RETRIES):
+            waited = self.rate_limiter.acquire()
+            start = time.perf_counter()
+            try:
+                response = self.session.get(f'{self.api_url}{path}', params=params,
+                                            headers=headers, timeout=self.timeout)
+            except requests.RequestException as e:
+                self.metrics.error('request', e, endpoint=endpoint, path=path)
+                raise
+            self.metrics.request(endpoint, response.status_code, time.perf_counter() - start, waited)
+            self.rate_limiter.update_from_headers(response.headers)
+            remaining = response.headers.get('X-Ratelimit-Remaining')
+            if remaining is not None:
+                self.metrics.set('rate_limit_remaining', float(remaining))
+            if response.status_code != 429:
+                break
+            self.metrics.inc('api_retries_total', endpoint=endpoint, reason='429')
+        if self.recorder is not None:
+            self.recorder.record(endpoint, path, params, response.status_code, response.content)
+        response.raise_for_status()
+        return response.json()
+
+    def get_listing(self, subreddit, sort, after=None, limit=LISTING_PAGE_SIZE, time_filter=None):
+        """
+        Fetch one page of r/<subreddit>/<sort>
+        """
+        params = {'limit': min(limit, LISTING_PAGE_SIZE), 'raw_json': 1}
+        if after:
+            params['after'] = after
+        if time_filter:
+            params['t'] = time_filter
+
+        payload = self._get(f'/r/{subreddit}/{sort}', params, 'listing')
+        data = payload.get('data', {})
+        posts = [RedditPost.from_json(child['data'])
+                 for child in data.get('children', [])
+                 if child.get('kind') == 't3']
+        return ListingPage(posts, data.get('after'))
+
+    def iter_listing_pages(self, subreddit, sort, limit, time_filter=None, after=None):
+        """
+        Yield pages of a listing until `limit` posts were returned or it ends
+        """
+        fetched = 0
+        while fetched < limit:
+            page = self.get_listing(subreddit, sort, after=after,
+                                    limit=limit - fetched, time_filter=time_filter)
+            if not page.posts:
+                return
+            fetched += len(page.posts)
+            yield page
+            after = page.after
+            if not after:
+                return
+
+    def get_more_children(self, link_id, children, sort='top'):
+        """
+        Expand up to MORECHILDREN_BATCH_SIZE comment ids of one thread
+
+        Returns the flat list of comment and 'more' things Reddit sends back.
+        """
+        params = {'link_id': link_id, 'children': ','.join(children[:MORECHILDREN_BATCH_SIZE]),
+                  'api_type': 'json', 'sort': sort, 'raw_json': 1}
+        with self._morechildren_lock:
+            payload = self._get('/api/morechildren', params, 'morechildren')
+        data = payload.get('json', {})
+        if data.get('errors'):
+            raise requests.HTTPError(f"morechildren failed: {data['errors']}")
+        return data.get('data', {}).get('things', [])
+
+    def fetch_comment_tree(self, post_id, limit=COMMENT_LIMIT, max_more_requests=DEFAULT_MORE_REQUESTS,
+                           sort='top'):
+        """
+        Fetch a post's comments, expanding 'more' stubs in batches
+
+        Ids behind 'more' stubs are expanded shallowest first, up to
+        MORECHILDREN_BATCH_SIZE per request and `max_more_requests`
+        requests per thread, instead of one request per stub. 'Continue
+        this thread' stubs, which morechildren cannot expand, are counted
+        as unexpanded.
+        """
+        payload = self._get(f'/comments/{post_id}', {'limit': limit, 'sort': sort, 'raw_json': 1}, 'comments')
+        things = payload[1].get('data', {}).get('children', []) if len(payload) > 1 else []
+        comments = []
+        more = []
+        collect_comments(things, comments, more)
+        requests_made = 1
+
+        pending = deque()
+        unexpanded = 0
+
+        def queue_more(stubs):
+            nonlocal unexpanded
+            for stub in stubs:
+                if stub.get('children'):
+                    pending.extend(stub['children'])
+                else:
+                    unexpanded += int(stub.get('count') or 0)
+
+        queue_more(more)
+        while pending and requests_made - 1 < max_more_requests:
+            batch = [pending.popleft() for _ in range(min(MORECHILDREN_BATCH_SIZE, len(pending)))]
+            more = []
+            collect_comments(self.get_more_children(f't3_{post_id}', batch, sort), comments, more)
+            requests_made += 1
+            queue_more(more)
+        return CommentTree(post_id, comments, requests_made, unexpanded + len(pending))
@@ -4,20 +4,37 @@ Collects posts from diagnosed users across multiple mental health subreddits
 and exports to separate Excel sheets by disorder
 """
 
-import praw
-import pandas as pd
+import argparse
 from datetime import datetime
-import re
+from itertools import chain
+import multiprocessing
+import threading
 import time
-from openpyxl import load_workbook
-from openpyxl.styles import Font, PatternFill, Alignment
+from concurrent.futures import ProcessPoolExecutor
 import os
 
-# Configuration
+from author_ids import hash_author
+from collection_pipeline import CollectionPipeline, PipelineAborted
+from collector_metrics import Metrics, MetricsServer
+from comment_harvest import harvest_comments, export_comments
+from dedup_index import DedupIndex, NEW, REPOST
+from diagnosis_matcher import DiagnosisMatcher
+from excel_export import write_workbook, sort_newest_first
+from http_fixtures import FixtureRecorder
+from fetch_retry import (
+    CircuitBreaker, CircuitState, RetryPolicy, iter_pages_with_retry, unavailable_reason, failure_reason,
+)
+from listing_scheduler import ListingScheduler, LIMIT_REACHED, TARGET_REACHED
+from post_store import PostStore, PageResult, ListingCursor, ListingState, DEFAULT_STORE_PATH, pack_raw_post
+from reddit_client import (
+    RedditClient, REDDIT_API_URL, REDDIT_TOKEN_URL, LISTING_PAGE_SIZE, COMMENT_LIMIT, DEFAULT_MORE_REQUESTS,
+)
+
+# Configuration; REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET and REDDIT_USER_AGENT override it
 REDDIT_CONFIG = {
-    'client_id': 'lB95YTUsFXu3iahQJm8wRw',
-    'client_secret': 'sMMBGju4uPJSx7i8xcT9kfX_9dKC_g',
-    'user_agent': 'mental_health_research_bot/1.0'
+    'client_id': os.environ.get('REDDIT_CLIENT_ID', 'lB95YTUsFXu3iahQJm8wRw'),
+    'client_secret': os.environ.get('REDDIT_CLIENT_SECRET', 'sMMBGju4uPJSx7i8xcT9kfX_9dKC_g'),
+    'user_agent': os.environ.get('REDDIT_USER_AGENT', 'mental_health_research_bot/1.0')
 }
 
 # Mental health conditions and their corresponding subreddits
@@ -52,216 +69,629 @@ DIAGNOSIS_KEYWORDS = [
     r'\bmedical diagnosis\b'
 ]
 
+# Compiled once so each post is scanned a single time for all keywords
+DIAGNOSIS_MATCHER = DiagnosisMatcher(DIAGNOSIS_KEYWORDS)
+
+# Use multiple sorting methods to get diverse posts
+SORTING_METHODS = [
+    ('new', 1000),      # Recent posts
+    ('top', 1000),      # Top posts of all time
+    ('hot', 300),       # Currently hot posts
+]
+
+# Date filter - posts from 2015 onwards
+CUTOFF_DATE = datetime(2015, 1, 1).timestamp()
+
+# Listings fetched at once; all workers share one rate limiter
+DEFAULT_WORKERS = 8
+
+# Pages classified at once; classification can also be moved onto processes
+DEFAULT_CLASSIFIER_WORKERS = 2
+
+# Incremental runs re-traverse top/hot listings at most this often
+DEFAULT_REFRESH_HOURS = 24 * 7
+
 def check_if_diagnosed(text):
     """
     Check if the post/comment mentions being diagnosed
     """
-    if not text:
-        return False
-    
-    text_lower = text.lower()
-    
-    # Check for diagnosis keywords
-    for keyword in DIAGNOSIS_KEYWORDS:
-        if re.search(keyword, text_lower):
-            return True
-    
-    return False
+    return DIAGNOSIS_MATCHER.is_diagnosed(text)
 
-def initialize_reddit():
+def initialize_reddit(api_url=REDDIT_API_URL, token_url=REDDIT_TOKEN_URL, metrics=None, recorder=None):
     """
     Initialize Reddit API connection
     """
     try:
-        reddit = praw.Reddit(
+        reddit = RedditClient(
             client_id=REDDIT_CONFIG['client_id'],
             client_secret=REDDIT_CONFIG['client_secret'],
-            user_agent=REDDIT_CONFIG['user_agent']
+            user_agent=REDDIT_CONFIG['user_agent'],
+            api_url=api_url,
+            token_url=token_url,
+            metrics=metrics,
+            recorder=recorder
         )
+        reddit.authenticate()
         print("✓ Successfully connected to Reddit API")
         return reddit
     except Exception as e:
         print(f"✗ Error connecting to Reddit API: {e}")
         return None
 
-def collect_posts_for_disorder(reddit, disorder_name, subreddit_list, target_posts=2000):
+def is_diagnosed_post(post):
     """
-    Collect posts from subreddits for a specific disorder
-    Uses multiple sorting methods and date filtering to get historical data
+    Check a post's date and text
     """
-    posts_data = []
-    seen_post_ids = set()  # Avoid duplicates
+    # Check date - only posts from 2015 onwards
+    if post.created_utc < CUTOFF_DATE:
+        return False
     
-    # Date filter - posts from 2015 onwards
-    cutoff_date = datetime(2015, 1, 1).timestamp()
+    # Combine title and selftext for checking
+    full_text = f"{post.title} {post.selftext}"
     
-    print(f"\n{'='*60}")
-    print(f"Collecting data for: {disorder_name}")
-    print(f"Target: {target_posts} posts from 2015 onwards")
-    print(f"{'='*60}")
+    # Check if user mentions being diagnosed
+    return check_if_diagnosed(full_text)
+
+def build_post_row(post, subreddit_name):
+    """
+    Convert a fetched post into an output row
+    """
+    post_date = datetime.fromtimestamp(post.created_utc).strftime('%Y-%m-%d %H:%M:%S')
     
-    for subreddit_name in subreddit_list:
-        try:
-            subreddit = reddit.subreddit(subreddit_name)
-            print(f"\nSearching r/{subreddit_name}...")
-            
-            diagnosed_count = 0
-            
-            # Use multiple sorting methods to get diverse posts
-            sorting_methods = [
-                ('new', 1000),      # Recent posts
-                ('top', 1000),      # Top posts of all time
-                ('hot', 300),       # Currently hot posts
-            ]
-            
-            for sort_method, limit in sorting_methods:
-                print(f"  Fetching {sort_method} posts...")
-                
-                try:
-                    if sort_method == 'new':
-                        posts = subreddit.new(limit=limit)
-                    elif sort_method == 'top':
-                        posts = subreddit.top(time_filter='all', limit=limit)
-                    elif sort_method == 'hot':
-                        posts = subreddit.hot(limit=limit)
-                    
-                    for post in posts:
-                        # Skip if already processed
-                        if post.id in seen_post_ids:
-                            continue
-                        
-                        # Check date - only posts from 2015 onwards
-                        if post.created_utc < cutoff_date:
-                            continue
-                        
-                        seen_post_ids.add(post.id)
-                        
-                        # Combine title and selftext for checking
-                        full_text = f"{post.title} {post.selftext}"
-                        
-                        # Check if user mentions being diagnosed
-                        if check_if_diagnosed(full_text):
-                            diagnosed_count += 1
-                            
-                            # Extract post data
-                            post_date = datetime.fromtimestamp(post.created_utc).strftime('%Y-%m-%d %H:%M:%S')
-                            
-                            posts_data.append({
-                                'Date': post_date,
-                                'Title': post.title,
-                                'Description': post.selftext if post.selftext else '[No description]',
-                                'Subreddit': f"r/{subreddit_name}",
-                                'URL': f"https://reddit.com{post.permalink}",
-                                'Score': post.score,
-                                'Num_Comments': post.num_comments
-                            })
-                            
-                            if diagnosed_count % 50 == 0:
-                                print(f"    ✓ Found {diagnosed_count} diagnosed posts so far...")
-                    
-                    time.sleep(2)  # Rate limiting between sort methods
-                    
-                except Exception as e:
-                    print(f"    ✗ Error with {sort_method} sorting: {e}")
-                    continue
+    return {
+        'Date': post_date,
+        'Title': post.title,
+        'Description': post.selftext if post.selftext else '[No description]',
+        'Subreddit': f"r/{subreddit_name}",
+        'URL': f"https://reddit.com{post.permalink}",
+        'Score': post.score,
+        'Num_Comments': post.num_comments,
+        'Author_ID': hash_author(post.author)
+    }
+
+class PostVerdict:
+    """
+    Classifier stage output for one fetched post
+    
+    `row` is the output row if the post is diagnosed; `store_row` is set
+    when that row still has to be written to the store.
+    """
+    
+    __slots__ = ('post', 'entry', 'status', 'digest', 'diagnosed', 'row', 'store_row')
+    
+    def __init__(self, post, entry, status, digest):
+        self.post = post
+        self.entry = entry
+        self.status = status
+        self.digest = digest
+        self.diagnosed = None
+        self.row = None
+        self.store_row = False
+
+class ListingChunk:
+    """
+    One page of a listing on its way through the collection pipeline
+    
+    The fetcher fills in the posts and the cursor to save once they are
+    written; the classifier adds `verdicts` (and `raw` records, when raw
+    posts are kept). The last chunk of a listing
+    has `last` set and, if the listing was traversed to the end, the
+    `newest` post seen for its high-water mark.
+    """
+    
+    __slots__ = ('collection', 'subreddit_name', 'sort_method', 'posts', 'cursor',
+                 'newest', 'last', 'verdicts', 'raw')
+    
+    def __init__(self, collection, subreddit_name, sort_method, posts=(), cursor=None,
+                 newest=None, last=False):
+        self.collection = collection
+        self.subreddit_name = subreddit_name
+        self.sort_method = sort_method
+        self.posts = posts
+        self.cursor = cursor
+        self.newest = newest
+        self.last = last
+        self.verdicts = []
+        self.raw = []
+
+class DisorderCollection:
+    """
+    Posts collected for one disorder, shared by all of its listing workers
+    
+    All disorders share one DedupIndex: a post reached through several
+    disorders' listings is classified once and stored once, and each
+    disorder only adds its label to it.
+    
+    When a PostStore is given, accepted posts and listing cursors are
+    checkpointed to it page by page, posts stored by earlier runs are
+    skipped, and posts labelled earlier in the same (resumed) run count
+    towards the target. The rows then live only in the store; without
+    one they are kept in `posts_data`.
+    
+    With `adaptive` set, a ListingScheduler decides page by page whether
+    each of the disorder's listings keeps paging.
+    """
+    
+    def __init__(self, disorder_name, target_posts, index, store=None, run_id=None, adaptive=False):
+        self.disorder_name = disorder_name
+        self.target_posts = target_posts
+        self.index = index
+        self.store = store
+        self.run_id = run_id
+        self.posts_data = []
+        self.keep_rows = store is None
+        self.added_count = 0
+        self.stored_count = 0
+        self.lock = threading.Lock()
+        self.scheduler = ListingScheduler(self.target_reached) if adaptive else None
+        
+        if store is not None:
+            self.stored_count = store.count_posts(disorder_name, run_id)
+    
+    @property
+    def total_posts(self):
+        return self.stored_count + self.added_count
+    
+    def target_reached(self):
+        return self.total_posts >= self.target_posts
+    
+    def add_verdicts(self, verdicts, result):
+        """
+        Label a page's diagnosed posts with this disorder
+        
+        Returns the number of posts that gained the label. Whatever must be
+        persisted is appended to the page's PageResult. Once the target is
+        reached no more posts are labelled; the rest of the page is still
+        recorded as seen, so later runs can label it.
+        """
+        added = 0
+        for verdict in verdicts:
+            entry = verdict.entry
+            if verdict.status == NEW:
+                result.seen.append((verdict.post.id, verdict.digest, verdict.post.id, verdict.diagnosed))
+            elif verdict.status == REPOST:
+                result.seen.append((verdict.post.id, verdict.digest, entry.canonical_id, entry.diagnosed))
+            if verdict.store_row:
+                result.posts.append((entry.canonical_id, verdict.row))
             
-            print(f"  ✓ Completed r/{subreddit_name}: {diagnosed_count} diagnosed posts")
+            if not verdict.diagnosed or self.target_reached():
+                continue
+            if not self.index.add_label(entry, self.disorder_name):
+                continue
             
-            # Check if we've reached target
-            if len(posts_data) >= target_posts:
-                print(f"\n✓ Reached target of {target_posts} posts!")
-                break
+            result.labels.append(entry.canonical_id)
+            with self.lock:
+                self.added_count += 1
+                if self.keep_rows:
+                    self.posts_data.append(verdict.row)
+            added += 1
+        return added
+    
+    def load_cursor(self, subreddit_name, sort_method):
+        if self.store is None:
+            return ListingCursor()
+        return self.store.load_cursor(self.run_id, self.disorder_name, subreddit_name, sort_method)
+    
+    def checkpoint(self, subreddit_name, sort_method, cursor, result=None):
+        if self.store is not None:
+            self.store.checkpoint(self.run_id, self.disorder_name, subreddit_name, sort_method, cursor, result)
+    
+    def load_listing_state(self, subreddit_name, sort_method):
+        if self.store is None:
+            return ListingState()
+        return self.store.load_listing_state(self.disorder_name, subreddit_name, sort_method)
+    
+    def save_listing_state(self, subreddit_name, sort_method, state):
+        if self.store is not None:
+            self.store.save_listing_state(self.disorder_name, subreddit_name, sort_method, state)
+
+def classify_texts(texts):
+    """
+    Diagnosis verdicts for a batch of post texts
+    
+    Module-level so classifier processes can run it.
+    """
+    return DIAGNOSIS_MATCHER.classify_batch(texts)
+
+def classify_posts(index, posts, subreddit_name, classify_batch=classify_texts, keep_rows=True):
+    """
+    Classifier stage: claim a page's posts in the dedup index and classify them
+    
+    Only posts the index has not seen are classified, in one batch. A post
+    whose canonical copy is still being classified by another worker is
+    classified here too, rather than waiting for it.
+    
+    With `keep_rows`, diagnosed posts keep their output row in the index
+    so a later sighting reuses it. Otherwise rows are only built when they
+    still have to be stored, and are dropped once written.
+    """
+    verdicts = [PostVerdict(post, *index.claim(post.id, post.title, post.selftext)) for post in posts]
+    
+    pending = []
+    for verdict in verdicts:
+        if verdict.status == NEW or verdict.entry.diagnosed is None:
+            if verdict.post.created_utc < CUTOFF_DATE:
+                verdict.diagnosed = False
+            else:
+                pending.append(verdict)
+        else:
+            verdict.diagnosed = verdict.entry.diagnosed
+    
+    if pending:
+        texts = [f"{verdict.post.title} {verdict.post.selftext}" for verdict in pending]
+        for verdict, diagnosed in zip(pending, classify_batch(texts)):
+            verdict.diagnosed = diagnosed
+    
+    for verdict in verdicts:
+        entry = verdict.entry
+        if verdict.diagnosed:
+            verdict.store_row = verdict.status == NEW or entry.diagnosed is None
+            if keep_rows or verdict.store_row:
+                verdict.row = entry.row or build_post_row(verdict.post, subreddit_name)
+        if verdict.status == NEW:
+            # Publish the row before the verdict; other workers read them in that order
+            if keep_rows:
+                entry.row = verdict.row
+            entry.diagnosed = verdict.diagnosed
+    return verdicts
+
+def fetch_listing(reddit, collection, subreddit_name, sort_method, limit, emit,
+                  incremental=False, refresh_interval=DEFAULT_REFRESH_HOURS * 3600,
+                  retry_policy=None, breaker=None):
+    """
+    Fetch stage: page through one subreddit listing, emitting ListingChunks
+    
+    Starts from the listing's stored cursor, so a resumed run continues from
+    the last checkpointed page instead of the top of the listing. Each
+    chunk carries the cursor to save once its posts are written. A final
+    chunk with `last` set is always emitted.
+    
+    In incremental mode the `new` listing stops at the high-water mark left
+    by earlier runs, and `top`/`hot` are skipped unless they were last
+    refreshed more than `refresh_interval` seconds ago.
+    
+    If the collection has a scheduler, it is asked before every further
+    page: the listing stops as soon as the disorder's target is reached or
+    its yield drops too low, and may page past `limit` on budget released
+    by other listings.
+    
+    Failed page requests are retried with backoff from the last cursor
+    (see fetch_retry.py). With a CircuitBreaker, listings of subreddits
+    whose circuit is open are skipped without a request, and the
+    listing's outcome is recorded in it.
+    """
+    seq = 0
+    
+    def send(chunk):
+        nonlocal seq
+        emit((collection.disorder_name, subreddit_name, sort_method), seq, chunk, len(chunk.posts))
+        seq += 1
+    
+    time_filter = 'all' if sort_method == 'top' else None
+    
+    cursor = collection.load_cursor(subreddit_name, sort_method)
+    skip = cursor.done or collection.target_reached()
+    
+    previous = collection.load_listing_state(subreddit_name, sort_method)
+    stop_at = None
+    if incremental:
+        if sort_method == 'new':
+            stop_at = previous
+        elif previous.refreshed_at and time.time() - previous.refreshed_at < refresh_interval:
+            skip = True
+    
+    if not skip and breaker is not None and not breaker.allow(subreddit_name):
+        circuit = breaker.state(subreddit_name)
+        print(f"    ⊘ Skipped r/{subreddit_name} ({sort_method}): circuit open ({circuit.reason}) "
+              f"until {datetime.fromtimestamp(circuit.retry_at):%Y-%m-%d %H:%M}")
+        reddit.metrics.inc('listings_skipped_total', reason='circuit open')
+        skip = True
+    
+    if skip:
+        send(ListingChunk(collection, subreddit_name, sort_method, last=True))
+        return
+    
+    try:
+        def on_retry(attempt, error, seconds):
+            print(f"    ↻ r/{subreddit_name} ({sort_method}) after {cursor.fetched} posts: {failure_reason(error)}, "
+                  f"retry {attempt + 1} in {seconds:.1f}s")
+            reddit.metrics.inc('api_retries_total', endpoint='listing', reason=failure_reason(error))
+            reddit.metrics.event('retry', subreddit=subreddit_name, sort=sort_method, attempt=attempt + 1,
+                                 error=str(error), delay=round(seconds, 3), fetched=cursor.fetched)
+    
+        scheduler = collection.scheduler
+        max_items = max(limit, scheduler.max_listing_items) if scheduler is not None else limit
+        newest = ListingState()
+        stop = None
+        try:
+            pages = iter_pages_with_retry(reddit, subreddit_name, sort_method, max_items - cursor.fetched,
+                                          time_filter=time_filter, after=cursor.after,
+                                          policy=retry_policy, on_retry=on_retry)
+            for page in pages:
+                if breaker is not None and seq == 0:
+                    breaker.record_success(subreddit_name)
+                posts = page.posts
+                crossed = False
+                for i, post in enumerate(posts):
+                    if stop_at is not None and stop_at.is_crossed_by(post):
+                        posts = posts[:i]
+                        crossed = True
+                        break
+                    if newest.newest_created_utc is None or post.created_utc > newest.newest_created_utc:
+                        newest.newest_created_utc, newest.newest_post_id = post.created_utc, post.id
             
+                cursor = ListingCursor(page.after, cursor.fetched + len(page.posts))
+                send(ListingChunk(collection, subreddit_name, sort_method, posts, cursor))
+                if crossed or not page.after:
+                    break
+                if scheduler is not None:
+                    stop = scheduler.next_page(subreddit_name, sort_method, cursor.fetched, limit, LISTING_PAGE_SIZE)
+                elif cursor.fetched >= limit:
+                    break
+                if stop is not None:
+                    break
+        except PipelineAborted:
+            raise
         except Exception as e:
-            print(f"  ✗ Error accessing r/{subreddit_name}: {e}")
-            continue
+            print(f"    ✗ Error with r/{subreddit_name} {sort_method} sorting: {e}")
+            reddit.metrics.error('listing', e, disorder=collection.disorder_name,
+                                 subreddit=subreddit_name, sort=sort_method, fetched=cursor.fetched)
+            if breaker is not None:
+                reason = unavailable_reason(e)
+                if breaker.record_failure(subreddit_name, reason or failure_reason(e), unavailable=reason is not None):
+                    circuit = breaker.state(subreddit_name)
+                    print(f"    ⊘ Opened circuit for r/{subreddit_name} ({circuit.reason}) "
+                          f"until {datetime.fromtimestamp(circuit.retry_at):%Y-%m-%d %H:%M}")
+                    reddit.metrics.inc('circuits_opened_total', reason=circuit.reason)
+                    reddit.metrics.event('circuit_opened', subreddit=subreddit_name, reason=circuit.reason,
+                                         failures=circuit.failures, cooldown=circuit.cooldown)
+            send(ListingChunk(collection, subreddit_name, sort_method, last=True))
+            return
+    
+        if breaker is not None and seq == 0:
+            # An empty listing still answered
+            breaker.record_success(subreddit_name)
+        if stop == LIMIT_REACHED:
+            # Used up its own limit without spare budget to go further: a normal finish
+            stop = None
+        if stop is not None:
+            reddit.metrics.inc('listings_stopped_total', reason=stop)
+            reddit.metrics.event('listing_stopped', disorder=collection.disorder_name, subreddit=subreddit_name,
+                                 sort=sort_method, reason=stop, fetched=cursor.fetched)
+        newest.refreshed_at = time.time()
+        if stop == TARGET_REACHED:
+            # Not traversed to the end: a later run with a higher target continues from
+            # the cursor, while incremental runs stop at the posts seen so far
+            send(ListingChunk(collection, subreddit_name, sort_method, newest=newest, last=True))
+            return
+        if stop is not None:
+            listing = scheduler.listings[(subreddit_name, sort_method)]
+            print(f"    ↷ Stopped r/{subreddit_name} ({sort_method}) after {cursor.fetched} posts: {stop} "
+                  f"({listing.rate:.1%} vs {scheduler.rate:.1%} for {collection.disorder_name})")
+        elif scheduler is not None:
+            scheduler.release(limit - cursor.fetched)
+    
+        send(ListingChunk(collection, subreddit_name, sort_method,
+                          cursor=ListingCursor(cursor.after, cursor.fetched, done=True),
+                          newest=newest, last=True))
+    finally:
+        if breaker is not None:
+            # A half-open probe that ended without an outcome (e.g. the pipeline
+            # was aborted) must not keep other workers waiting in allow()
+            breaker.release(subreddit_name)
+
+def collect_all_disorders(reddit, disorders, target_posts=2000, max_workers=DEFAULT_WORKERS,
+                          store=None, run_id=None, incremental=False,
+                          refresh_interval=DEFAULT_REFRESH_HOURS * 3600, dedup_content=False,
+                          classifier_workers=DEFAULT_CLASSIFIER_WORKERS, classifier_processes=0,
+                          keep_raw=False, adaptive=True, retry_policy=None):
+    """
+    Collect posts for several disorders at once
+    
+    Collection runs as a CollectionPipeline: `max_workers` threads fetch
+    (subreddit, sort method) listings, sharing the client's rate limiter so
+    requests go out as fast as the API budget allows; `classifier_workers`
+    threads classify each page (on a pool of `classifier_processes`
+    processes, if given); and one writer checkpoints the results to the
+    store. A disorder stops scheduling new listings once its target is
+    reached.
+    
+    Posts are deduplicated across all disorders (and, with a store, across
+    runs) by post id, and also by normalized text when `dedup_content` is set.
+    
+    With `keep_raw`, every fetched post is also stored in compact raw form,
+    diagnosed or not, so it can be reclassified offline (reclassify.py).
+    
+    With `adaptive` (the default), listings stop paging as soon as their
+    disorder reaches its target or their diagnosed-post yield falls far
+    below the disorder's, and high-yield listings page further on the
+    budget freed (see listing_scheduler.py). Otherwise every listing is
+    paged to its SORTING_METHODS limit.
+    
+    Failed page requests are retried following `retry_policy` (a
+    RetryPolicy), and a CircuitBreaker skips subreddits that keep failing
+    or are unavailable; with a store, its state carries over between runs.
+    
+    Returns {disorder: row dicts labelled in this run}. With a store the
+    rows are only written to it, so memory use does not grow with the
+    target, and the lists are empty; export with export_store.
+    """
+    index = DedupIndex(hash_content=dedup_content)
+    if store is not None:
+        index.load(store.iter_seen())
+        breaker = CircuitBreaker({name: CircuitState(*row) for name, row in store.load_circuits().items()},
+                                 on_change=store.save_circuit)
+    else:
+        breaker = CircuitBreaker()
+    retry_policy = retry_policy or RetryPolicy()
+    
+    collections = {name: DisorderCollection(name, target_posts, index, store, run_id, adaptive)
+                   for name in disorders}
+    jobs = [
+        (collections[disorder_name], subreddit_name, sort_method, limit)
+        for disorder_name, subreddit_list in disorders.items()
+        for subreddit_name in subreddit_list
+        for sort_method, limit in SORTING_METHODS
+    ]
+    
+    process_pool = None
+    classify_batch = classify_texts
+    if classifier_processes:
+        # Spawned, not forked: the fetch threads are already running
+        process_pool = ProcessPoolExecutor(classifier_processes, mp_context=multiprocessing.get_context('spawn'))
+        classify_batch = lambda texts: process_pool.submit(classify_texts, texts).result()
+    
+    def fetch(job, emit):
+        collection, subreddit_name, sort_method, limit = job
+        fetch_listing(reddit, collection, subreddit_name, sort_method, limit, emit,
+                      incremental, refresh_interval, retry_policy, breaker)
+    
+    def classify(chunk):
+        chunk.verdicts = classify_posts(index, chunk.posts, chunk.subreddit_name, classify_batch, store is None)
+        if keep_raw:
+            chunk.raw = [pack_raw_post(post, chunk.subreddit_name) for post in chunk.posts]
+        chunk.posts = ()
+        return chunk
+    
+    diagnosed_counts = {}
+    metrics = reddit.metrics
+    
+    def write(key, chunk):
+        collection = chunk.collection
+        result = PageResult()
+        added = collection.add_verdicts(chunk.verdicts, result)
+        if chunk.verdicts:
+            diagnosed = sum(1 for verdict in chunk.verdicts if verdict.diagnosed)
+            metrics.inc('posts_fetched_total', len(chunk.verdicts),
+                        subreddit=chunk.subreddit_name, sort=chunk.sort_method)
+            metrics.inc('posts_diagnosed_total', diagnosed, subreddit=chunk.subreddit_name, sort=chunk.sort_method)
+            metrics.inc('posts_labelled_total', added, disorder=collection.disorder_name)
+            metrics.event('page', disorder=collection.disorder_name, subreddit=chunk.subreddit_name,
+                          sort=chunk.sort_method, posts=len(chunk.verdicts), diagnosed=diagnosed, labelled=added)
+        if collection.scheduler is not None:
+            collection.scheduler.record(chunk.subreddit_name, chunk.sort_method, len(chunk.verdicts), added)
+        result.raw = chunk.raw
+        if chunk.cursor is not None:
+            collection.checkpoint(chunk.subreddit_name, chunk.sort_method, chunk.cursor, result)
+        if chunk.newest is not None:
+            collection.save_listing_state(chunk.subreddit_name, chunk.sort_method, chunk.newest)
         
-        # Delay between subreddits
-        time.sleep(3)
+        before = diagnosed_counts.get(key, 0)
+        diagnosed_count = diagnosed_counts[key] = before + added
+        if diagnosed_count // 50 > before // 50:
+            print(f"    ✓ r/{chunk.subreddit_name} ({chunk.sort_method}): {diagnosed_count} diagnosed posts so far...")
+        if chunk.last:
+            print(f"  ✓ Completed r/{chunk.subreddit_name} ({chunk.sort_method}): {diagnosed_count} diagnosed posts "
+                  f"[{collection.disorder_name}: {collection.total_posts}]")
+            metrics.event('listing', disorder=collection.disorder_name, subreddit=chunk.subreddit_name,
+                          sort=chunk.sort_method, labelled=diagnosed_count, total=collection.total_posts)
     
-    print(f"\n✓ Total posts collected for {disorder_name}: {len(posts_data)}")
-    return posts_data
+    print(f"\n{'='*60}")
+    print(f"Collecting data for: {', '.join(disorders)}")
+    print(f"Target: {target_posts} posts per disorder from 2015 onwards")
+    print(f"Listings: {len(jobs)} across {max_workers} fetch worker(s), "
+          f"{classifier_workers} classifier(s)" + (f" on {classifier_processes} process(es)" if process_pool else ""))
+    print(f"{'='*60}")
+    
+    pipeline = CollectionPipeline(fetch, classify, write, max_workers, classifier_workers)
+    try:
+        pipeline.run(jobs)
+    finally:
+        if process_pool is not None:
+            process_pool.shutdown()
+    
+    for collection in collections.values():
+        print(f"\n✓ Total posts collected for {collection.disorder_name}: {collection.total_posts}")
+    print(f"✓ Skipped {index.duplicate_ids} repeated post ids and {index.reposts} reposts")
+    if adaptive:
+        stopped = sum(c.scheduler.stopped_early for c in collections.values())
+        extended = sum(c.scheduler.extended_items for c in collections.values())
+        print(f"✓ Stopped {stopped} low-yield listing(s) early; {extended} extra post(s) paged from high-yield ones")
+    print(f"✓ {reddit.rate_limiter.requests_granted} API requests")
+    retries = metrics.counter('api_retries_total', endpoint='listing')
+    if retries:
+        print(f"✓ Retried {retries} failed page request(s) from their last cursor")
+    open_circuits = breaker.open_circuits()
+    if open_circuits:
+        print(f"✓ Skipping {len(open_circuits)} failing subreddit(s) until their cooldown passes:")
+        for name, circuit in open_circuits:
+            print(f"    r/{name}: {circuit.reason}, {circuit.failures} failure(s), "
+                  f"retry after {datetime.fromtimestamp(circuit.retry_at):%Y-%m-%d %H:%M}")
+    print(f"✓ Pipeline throughput over {pipeline.elapsed:.1f}s:")
+    for line in pipeline.format_stats():
+        print(f"    {line}")
+    for stats in pipeline.stats.values():
+        metrics.set('stage_busy_seconds', stats.busy, stage=stats.name)
+        metrics.set('stage_waiting_seconds', stats.waiting, stage=stats.name)
+    
+    return {name: collection.posts_data for name, collection in collections.items()}
+
+def collect_posts_for_disorder(reddit, disorder_name, subreddit_list, target_posts=2000, max_workers=1):
+    """
+    Collect posts from subreddits for a specific disorder
+    Uses multiple sorting methods and date filtering to get historical data
+    """
+    all_data = collect_all_disorders(reddit, {disorder_name: subreddit_list}, target_posts, max_workers)
+    return all_data[disorder_name]
 
 def export_to_excel(all_data, output_file='mental_health_reddit_data.xlsx'):
     """
     Export collected data to Excel with separate sheets for each disorder
+    
+    Rows are sorted newest first and streamed into a write-only workbook
+    with all formatting applied on the way, in a single pass.
+    """
+    write_excel({name: sort_newest_first(posts_data) if posts_data else None
+                 for name, posts_data in all_data.items()}, output_file)
+
+def write_excel(sheets, output_file):
+    """
+    Write {disorder: rows, newest first} to a workbook, one sheet each;
+    disorders whose rows are None are skipped
     """
     print(f"\n{'='*60}")
     print("Exporting data to Excel...")
     print(f"{'='*60}")
     
-    with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-        for disorder_name, posts_data in all_data.items():
-            if posts_data:
-                # Create DataFrame
-                df = pd.DataFrame(posts_data)
-                
-                # Reorder columns
-                df = df[['Date', 'Title', 'Description', 'Subreddit', 'Score', 'Num_Comments', 'URL']]
-                
-                # Sort by date (newest first)
-                df['Date'] = pd.to_datetime(df['Date'])
-                df = df.sort_values('Date', ascending=False)
-                df['Date'] = df['Date'].dt.strftime('%Y-%m-%d %H:%M:%S')
-                
-                # Write to Excel
-                sheet_name = disorder_name[:31]  # Excel sheet name limit
-                df.to_excel(writer, sheet_name=sheet_name, index=False)
-                
-                print(f"✓ Created sheet: {sheet_name} ({len(posts_data)} posts)")
-            else:
-                print(f"✗ No data for {disorder_name}, skipping sheet")
+    for disorder_name, rows in sheets.items():
+        if rows is None:
+            print(f"✗ No data for {disorder_name}, skipping sheet")
     
-    # Format Excel file
-    format_excel_file(output_file)
+    counts = write_workbook([(name, rows) for name, rows in sheets.items() if rows is not None], output_file)
+    for sheet_name, count in counts.items():
+        print(f"✓ Created sheet: {sheet_name[:31]} ({count} posts)")
     
     print(f"\n✓ Data exported successfully to: {output_file}")
 
-def format_excel_file(filename):
+def export_store(store, disorders, output_name, output_format='xlsx'):
     """
-    Format the Excel file for better readability
-    """
-    wb = load_workbook(filename)
-    
-    # Header styling
-    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF")
-    
-    for sheet_name in wb.sheetnames:
-        ws = wb[sheet_name]
-        
-        # Format headers
-        for cell in ws[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-        
-        # Adjust column widths
-        ws.column_dimensions['A'].width = 20  # Date
-        ws.column_dimensions['B'].width = 50  # Title
-        ws.column_dimensions['C'].width = 80  # Description
-        ws.column_dimensions['D'].width = 20  # Subreddit
-        ws.column_dimensions['E'].width = 12  # Score
-        ws.column_dimensions['F'].width = 15  # Num_Comments
-        ws.column_dimensions['G'].width = 60  # URL
-        
-        # Wrap text in Description column
-        for row in ws.iter_rows(min_row=2, max_col=7):
-            row[2].alignment = Alignment(wrap_text=True, vertical='top')
+    Export every disorder's stored posts without loading them into memory
     
-    wb.save(filename)
+    Rows are read from the store newest first, a batch at a time, and
+    handed straight to the write-only workbook and/or the Parquet dataset
+    writer, so memory use stays flat however many posts were collected.
+    Returns {disorder: post count}.
+    """
+    counts = {name: store.count_posts(name) for name in disorders}
+    if output_format in ('xlsx', 'both'):
+        write_excel({name: chain.from_iterable(store.iter_post_rows(name)) if counts[name] else None
+                     for name in disorders}, f'{output_name}.xlsx')
+    if output_format in ('parquet', 'both'):
+        from parquet_export import export_store_to_parquet
+        count = export_store_to_parquet(store, disorders, output_name)
+        print(f"\n✓ Wrote {count} rows to Parquet dataset: {output_name}/")
+    return counts
 
-def print_summary(all_data):
+def print_summary(counts):
     """
-    Print summary statistics
+    Print summary statistics from {disorder: post count}
     """
     print(f"\n{'='*60}")
     print("COLLECTION SUMMARY")
     print(f"{'='*60}")
     
     total_posts = 0
-    for disorder_name, posts_data in all_data.items():
-        count = len(posts_data)
+    for disorder_name, count in counts.items():
         total_posts += count
         print(f"{disorder_name:20}: {count:4} posts")
     
@@ -269,41 +699,131 @@ def print_summary(all_data):
     print(f"{'TOTAL':20}: {total_posts:4} posts")
     print(f"{'='*60}")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Collect Reddit posts from diagnosed users")
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help="Number of listings fetched concurrently")
+    parser.add_argument('--classifier-workers', type=int, default=DEFAULT_CLASSIFIER_WORKERS,
+                        help="Number of threads classifying fetched pages")
+    parser.add_argument('--classifier-processes', type=int, default=0,
+                        help="Run diagnosis detection on this many worker processes (0: in the classifier threads)")
+    parser.add_argument('--target-posts', type=int, default=2000,
+                        help="Target number of posts per disorder")
+    parser.add_argument('--api-url', default=None,
+                        help="Listing API base URL (e.g. a local fake_reddit_server.py)")
+    parser.add_argument('--token-url', default=None,
+                        help="OAuth token URL (defaults to <api-url>/api/v1/access_token)")
+    parser.add_argument('--record-fixtures', default=None, metavar='DIR',
+                        help="Save every API response to DIR for offline replay (see http_fixtures.py)")
+    parser.add_argument('--store', default=DEFAULT_STORE_PATH,
+                        help="SQLite file that collected posts and listing cursors are written to")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continue the last unfinished run recorded in the store")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only fetch posts newer than earlier runs; refresh top/hot on a cadence")
+    parser.add_argument('--refresh-hours', type=float, default=DEFAULT_REFRESH_HOURS,
+                        help="In incremental mode, hours between top/hot refreshes")
+    parser.add_argument('--dedup-content', action='store_true',
+                        help="Also treat posts with identical text as duplicates (catches reposts)")
+    parser.add_argument('--keep-raw', action='store_true',
+                        help="Store every fetched post, diagnosed or not, for offline reclassification")
+    parser.add_argument('--fixed-limits', action='store_true',
+                        help="Page every listing to its full limit instead of adapting to its diagnosed-post yield")
+    parser.add_argument('--reset-circuits', action='store_true',
+                        help="Forget recorded subreddit failures and try every subreddit again")
+    parser.add_argument('--comments', action='store_true',
+                        help="Also harvest diagnosed comments from the threads of collected posts")
+    parser.add_argument('--comment-limit', type=int, default=COMMENT_LIMIT,
+                        help="Comments requested with each thread (Reddit serves at most 500)")
+    parser.add_argument('--comment-more-requests', type=int, default=DEFAULT_MORE_REQUESTS,
+                        help="Batched morechildren requests allowed per thread")
+    parser.add_argument('--metrics-log', default=None, metavar='PATH',
+                        help="Append JSON-lines metrics (requests, pages, listings, errors) to this file")
+    parser.add_argument('--metrics-port', type=int, default=None, metavar='PORT',
+                        help="Serve Prometheus-format metrics on http://127.0.0.1:PORT/metrics during the run")
+    parser.add_argument('--output-format', choices=['xlsx', 'parquet', 'both'], default='xlsx',
+                        help="Excel workbook, partitioned Parquet dataset (needs pyarrow), or both")
+    return parser.parse_args()
+
 def main():
     """
     Main execution function
     """
+    args = parse_args()
+    
     print("="*60)
     print("REDDIT MENTAL HEALTH DATA COLLECTOR")
     print("Collecting posts from DIAGNOSED users only")
-    print("Target: ~2000 posts per disorder (2015-present)")
+    print(f"Target: ~{args.target_posts} posts per disorder (2015-present)")
     print("="*60)
     
+    metrics = Metrics(args.metrics_log)
+    metrics_server = None
+    if args.metrics_port is not None:
+        metrics_server = MetricsServer(metrics, args.metrics_port).start()
+        print(f"✓ Serving metrics at {metrics_server.url}")
+    
     # Initialize Reddit connection
-    reddit = initialize_reddit()
+    api_url = args.api_url or REDDIT_API_URL
+    token_url = args.token_url or (f"{api_url.rstrip('/')}/api/v1/access_token" if args.api_url else REDDIT_TOKEN_URL)
+    recorder = FixtureRecorder(args.record_fixtures) if args.record_fixtures else None
+    reddit = initialize_reddit(api_url, token_url, metrics, recorder)
     if not reddit:
         print("\n✗ Failed to connect to Reddit. Please check your credentials.")
         return
     
+    # Every accepted post is checkpointed to the store as it is collected
+    store = PostStore(args.store)
+    run_id = store.start_run(resume=args.resume)
+    print(f"✓ Writing to {args.store} (run {run_id})")
+    if args.reset_circuits:
+        print(f"✓ Cleared recorded failures of {store.clear_circuits()} subreddit(s)")
+    
     # Collect data for all disorders
-    all_data = {}
-    
-    for disorder_name, subreddit_list in DISORDERS.items():
-        posts_data = collect_posts_for_disorder(
-            reddit, 
-            disorder_name, 
-            subreddit_list,
-            target_posts=2000  # Target 2000 posts per disorder
-        )
-        all_data[disorder_name] = posts_data
+    collect_all_disorders(
+        reddit,
+        DISORDERS,
+        target_posts=args.target_posts,
+        max_workers=args.workers,
+        store=store,
+        run_id=run_id,
+        incremental=args.incremental,
+        refresh_interval=args.refresh_hours * 3600,
+        dedup_content=args.dedup_content,
+        classifier_workers=args.classifier_workers,
+        classifier_processes=args.classifier_processes,
+        keep_raw=args.keep_raw,
+        adaptive=not args.fixed_limits
+    )
+    if args.comments:
+        harvest_comments(reddit, store, run_id, classify_texts, args.workers, args.classifier_workers,
+                         args.comment_limit, args.comment_more_requests)
+    store.finish_run(run_id)
+    
+    print(f"\n{'='*60}")
+    print("COLLECTION METRICS")
+    print(f"{'='*60}")
+    for line in metrics.report():
+        print(line)
+    metrics.event('run_finished', run_id=run_id)
+    metrics.close()
+    if metrics_server is not None:
+        metrics_server.stop()
+    if recorder is not None:
+        recorder.close()
+        print(f"\n✓ Recorded {recorder.recorded} API responses to {args.record_fixtures}")
+    
+    output_name = f'mental_health_reddit_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}'
+    if args.comments and store.count_comments():
+        count = export_comments(store, DISORDERS, f'{output_name}_comments.csv')
+        print(f"\n✓ Wrote {count} comments to {output_name}_comments.csv")
     
-    # Export to Excel
-    if any(all_data.values()):
-        output_file = f'mental_health_reddit_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-        export_to_excel(all_data, output_file)
-        print_summary(all_data)
+    # Export to Excel and/or Parquet, streamed from the store
+    if any(store.count_posts(name) for name in DISORDERS):
+        print_summary(export_store(store, DISORDERS, output_name, args.output_format))
     else:
         print("\n✗ No data collected. Please check your Reddit API connection and subreddit access.")
+    store.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,72 +1,82 @@
 """
 Test script to verify Reddit API credentials are working
 Run this before using the main collector script
+
+Uses the collector's own RedditClient and REDDIT_CONFIG, so credentials
+come from the same place: the values in reddit_mental_health_collector.py,
+overridden by the REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET and
+REDDIT_USER_AGENT environment variables.
 """
 
-import praw
+import argparse
+
+import requests
+
+from reddit_client import RedditClient, REDDIT_API_URL, REDDIT_TOKEN_URL
+from reddit_mental_health_collector import REDDIT_CONFIG
 
-# Replace with your credentials
-REDDIT_CONFIG = {
-    'client_id': 'YOUR_CLIENT_ID',
-    'client_secret': 'YOUR_CLIENT_SECRET',
-    'user_agent': 'mental_health_research_bot/1.0'
-}
 
-def test_connection():
+def test_connection(api_url=REDDIT_API_URL, token_url=REDDIT_TOKEN_URL):
     """
     Test Reddit API connection
     """
     print("="*60)
     print("Testing Reddit API Connection")
     print("="*60)
-    
+
     try:
-        # Initialize Reddit
-        reddit = praw.Reddit(
+        reddit = RedditClient(
             client_id=REDDIT_CONFIG['client_id'],
             client_secret=REDDIT_CONFIG['client_secret'],
-            user_agent=REDDIT_CONFIG['user_agent']
+            user_agent=REDDIT_CONFIG['user_agent'],
+            api_url=api_url,
+            token_url=token_url
         )
-        
+        reddit.authenticate()
         print("\n✓ Successfully connected to Reddit API!")
-        print(f"✓ Read-only mode: {reddit.read_only}")
-        
-        # Test by fetching a subreddit
-        print("\nTesting subreddit access...")
-        subreddit = reddit.subreddit('depression')
+
+        # Fetch a few posts to verify listing access
+        print("\nFetching sample posts from r/depression...")
+        page = reddit.get_listing('depression', 'hot', limit=3)
         print(f"✓ Successfully accessed r/depression")
-        print(f"  - Subscribers: {subreddit.subscribers:,}")
-        print(f"  - Description: {subreddit.public_description[:100]}...")
-        
-        # Fetch a few posts to verify
-        print("\nFetching sample posts...")
-        post_count = 0
-        for post in subreddit.hot(limit=3):
-            post_count += 1
+        for post_count, post in enumerate(page.posts, 1):
             print(f"\n  Post {post_count}:")
             print(f"    Title: {post.title[:60]}...")
             print(f"    Author: u/{post.author}")
             print(f"    Score: {post.score}")
-        
+
         print("\n" + "="*60)
         print("✓ ALL TESTS PASSED!")
         print("Your Reddit API credentials are working correctly.")
         print("You can now run the main collector script.")
         print("="*60)
-        
+
         return True
-        
-    except praw.exceptions.PRAWException as e:
-        print(f"\n✗ PRAW Error: {e}")
+
+    except requests.RequestException as e:
+        print(f"\n✗ Reddit API Error: {e}")
         print("\nPlease check:")
         print("  1. Your client_id and client_secret are correct")
         print("  2. Your Reddit app type is set to 'script'")
         print("  3. You have an active internet connection")
         return False
-        
+
     except Exception as e:
         print(f"\n✗ Unexpected Error: {e}")
         return False
 
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Check Reddit API credentials")
+    parser.add_argument('--api-url', default=None,
+                        help="Listing API base URL (e.g. a local fake_reddit_server.py)")
+    parser.add_argument('--token-url', default=None,
+                        help="OAuth token URL (defaults to <api-url>/api/v1/access_token)")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    test_connection()
+    args = parse_args()
+    api_url = args.api_url or REDDIT_API_URL
+    token_url = args.token_url or (f"{api_url.rstrip('/')}/api/v1/access_token" if args.api_url else REDDIT_TOKEN_URL)
+    test_connection(api_url, token_url)
@@ -0,0 +1,269 @@
+"""
+User Timelines
+Groups the collected posts by (hashed) author across all disorders, for
+individual-level rather than document-level datasets. The result is two
+Parquet files:
+
+    <output_dir>/posts.parquet   every post with a known author, sorted by
+                                 author and date
+    <output_dir>/users.parquet   one row per author: the offset and number
+                                 of their posts in posts.parquet, first and
+                                 last post date, the disorders they were
+                                 labelled with (as a bit mask over DISORDERS)
+                                 and other per-user counts
+
+A user's timeline is a contiguous slice of posts.parquet, so per-user
+statistics come from users.parquet alone and a user-level train/test
+split only takes the slices of the users on each side; neither re-scans
+the corpus. Splits are assigned by hashing the author id, so a user stays
+on the same side when the dataset is rebuilt with more users.
+
+Usage:
+    python user_timelines.py build --store mental_health_collection.sqlite
+    python user_timelines.py stats
+
+    from user_timelines import UserTimelines
+    timelines = UserTimelines.load('user_timelines')
+    train, test = timelines.split(test_fraction=0.2)
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from post_store import PostStore, DEFAULT_STORE_PATH
+from reddit_mental_health_collector import DISORDERS
+
+DEFAULT_OUTPUT_DIR = 'user_timelines'
+
+POSTS_FILE = 'posts.parquet'
+USERS_FILE = 'users.parquet'
+
+# Parquet metadata key holding the disorder order behind the bit masks
+DISORDERS_METADATA_KEY = b'disorders'
+
+# Split buckets per user; test_fraction is rounded to this resolution
+SPLIT_BUCKETS = 10000
+
+
+def disorder_masks(labels, disorders):
+    """
+    Bit masks (bit i = disorders[i]) for comma-separated label strings
+    """
+    bits = {name: 1 << i for i, name in enumerate(disorders)}
+    return np.array([sum(bits.get(name, 0) for name in set(label.split(','))) for label in labels],
+                    dtype=np.int32)
+
+
+def popcount(masks):
+    """
+    Number of set bits in each int32 mask
+    """
+    masks = np.asarray(masks, dtype=np.uint32)
+    return np.unpackbits(masks.view(np.uint8).reshape(-1, 4), axis=1).sum(axis=1).astype(np.int8)
+
+
+def load_author_posts(store, disorders=DISORDERS):
+    """
+    Every labelled post with a known author as a frame sorted by author and date
+    """
+    frames = []
+    for batch in store.iter_author_posts():
+        frame = pd.DataFrame(batch, columns=['author_id', 'post_id', 'date', 'subreddit',
+                                             'score', 'num_comments', 'disorders'])
+        frame['disorders'] = disorder_masks(frame['disorders'], list(disorders))
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=['author_id', 'post_id', 'date', 'subreddit',
+                                     'score', 'num_comments', 'disorders'])
+    posts = pd.concat(frames, ignore_index=True)
+    posts['date'] = pd.to_datetime(posts['date'], format='%Y-%m-%d %H:%M:%S')
+    posts['subreddit'] = posts['subreddit'].astype('category')
+    return posts
+
+
+def aggregate_users(posts):
+    """
+    One row per author of an author-sorted posts frame
+    """
+    authors = posts['author_id'].to_numpy()
+    if not len(authors):
+        return pd.DataFrame(columns=['author_id', 'offset', 'n_posts', 'first_date', 'last_date',
+                                     'disorders', 'n_disorders', 'n_subreddits'])
+    starts = np.flatnonzero(np.r_[True, authors[1:] != authors[:-1]])
+    lengths = np.diff(np.r_[starts, len(authors)])
+    masks = np.bitwise_or.reduceat(posts['disorders'].to_numpy(), starts)
+    dates = posts['date'].to_numpy()
+    # Distinct subreddits per user: count changes in the (author, subreddit) sorted order
+    codes = posts['subreddit'].cat.codes.to_numpy()
+    order = np.lexsort((codes, np.repeat(np.arange(len(starts)), lengths)))
+    sorted_codes = codes[order]
+    new_subreddit = np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]
+    new_subreddit[starts] = True
+    return pd.DataFrame({
+        'author_id': authors[starts],
+        'offset': starts.astype(np.int64),
+        'n_posts': lengths.astype(np.int32),
+        'first_date': dates[starts],
+        # Posts are sorted by date within each author
+        'last_date': dates[starts + lengths - 1],
+        'disorders': masks,
+        'n_disorders': popcount(masks),
+        'n_subreddits': np.add.reduceat(new_subreddit, starts).astype(np.int32),
+    })
+
+
+def _write_table(frame, path, disorders):
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[DISORDERS_METADATA_KEY] = json.dumps(list(disorders)).encode('utf-8')
+    pq.write_table(table.replace_schema_metadata(metadata), path)
+
+
+def build_timelines(store, output_dir=DEFAULT_OUTPUT_DIR, disorders=DISORDERS):
+    """
+    Write posts.parquet and users.parquet for every author in the store;
+    returns the users frame
+    """
+    posts = load_author_posts(store, disorders)
+    users = aggregate_users(posts)
+    os.makedirs(output_dir, exist_ok=True)
+    _write_table(posts, os.path.join(output_dir, POSTS_FILE), disorders)
+    _write_table(users, os.path.join(output_dir, USERS_FILE), disorders)
+    return users
+
+
+def _ranges(offsets, lengths):
+    """
+    Concatenated arange(offset, offset + length) for every pair, vectorized
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    ends = np.cumsum(lengths)
+    starts = np.asarray(offsets, dtype=np.int64) - ends + lengths
+    return np.repeat(starts, lengths) + np.arange(ends[-1] if len(ends) else 0)
+
+
+class UserTimelines:
+    """
+    posts.parquet and users.parquet, loaded memory-mapped
+    """
+
+    __slots__ = ('posts', 'users', 'disorders', '_positions')
+
+    def __init__(self, posts, users, disorders):
+        self.posts = posts
+        self.users = users
+        self.disorders = disorders
+        self._positions = None
+
+    @classmethod
+    def load(cls, path=DEFAULT_OUTPUT_DIR):
+        posts = pq.read_table(os.path.join(path, POSTS_FILE), memory_map=True)
+        users = pq.read_table(os.path.join(path, USERS_FILE), memory_map=True)
+        disorders = json.loads(users.schema.metadata[DISORDERS_METADATA_KEY])
+        return cls(posts, users, disorders)
+
+    def disorder_names(self, mask):
+        return [name for i, name in enumerate(self.disorders) if mask >> i & 1]
+
+    def user_posts(self, author_id):
+        """
+        One author's posts, oldest first
+        """
+        if self._positions is None:
+            self._positions = {author: i for i, author in enumerate(self.users.column('author_id').to_pylist())}
+        i = self._positions[author_id]
+        offset, length = self.users.column('offset')[i].as_py(), self.users.column('n_posts')[i].as_py()
+        return self.posts.slice(offset, length)
+
+    def split_mask(self, test_fraction=0.2, seed=0):
+        """
+        Boolean array over users, True for users in the test split
+        """
+        authors = self.users.column('author_id').to_numpy(zero_copy_only=False)
+        hash_key = f'{seed:016d}'[-16:]
+        buckets = pd.util.hash_array(authors.astype(object), hash_key=hash_key) % SPLIT_BUCKETS
+        return buckets < round(test_fraction * SPLIT_BUCKETS)
+
+    def split(self, test_fraction=0.2, seed=0):
+        """
+        User-level (train, test) post tables: every user's posts land on one side
+        """
+        test = self.split_mask(test_fraction, seed)
+        offsets = self.users.column('offset').to_numpy()
+        lengths = self.users.column('n_posts').to_numpy()
+        return tuple(self.posts.take(_ranges(offsets[side], lengths[side])) for side in (~test, test))
+
+    def stats(self):
+        """
+        Per-disorder user counts and timeline sizes, from users.parquet alone
+        """
+        users = self.users.to_pandas()
+        masks = users['disorders'].to_numpy()
+        rows = []
+        for i, name in enumerate(self.disorders):
+            selected = users[(masks >> i & 1).astype(bool)]
+            if selected.empty:
+                continue
+            rows.append({
+                'Disorder': name,
+                'Users': len(selected),
+                'Posts': int(selected['n_posts'].sum()),
+                'Median_Posts': float(selected['n_posts'].median()),
+                'Multi_Post_Users': int((selected['n_posts'] > 1).sum()),
+                'Other_Disorders': int((selected['n_disorders'] > 1).sum()),
+                'Median_Span_Days': float((selected['last_date'] - selected['first_date']).dt.days.median()),
+            })
+        return pd.DataFrame(rows)
+
+
+def print_stats(timelines):
+    users = timelines.users
+    print(f"✓ {users.num_rows} users, {timelines.posts.num_rows} posts")
+    stats = timelines.stats()
+    if not stats.empty:
+        print(stats.to_string(index=False))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Per-user post timelines for user-level datasets")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Aggregate the store's posts by author")
+    build.add_argument('--store', default=DEFAULT_STORE_PATH,
+                       help="SQLite file written by the collector")
+    build.add_argument('--output', default=DEFAULT_OUTPUT_DIR,
+                       help="Directory for posts.parquet and users.parquet")
+
+    stats = subparsers.add_parser('stats', help="Print per-disorder user statistics")
+    stats.add_argument('--input', default=DEFAULT_OUTPUT_DIR,
+                       help="Directory written by build")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    print("="*60)
+    print("USER TIMELINES")
+    print("="*60)
+
+    if args.command == 'build':
+        with PostStore(args.store) as store:
+            users = build_timelines(store, args.output)
+        if users.empty:
+            print(f"✗ No posts with author ids in {args.store}. Collect again to record authors.")
+            return
+        print(f"✓ Wrote {args.output}/{POSTS_FILE} and {args.output}/{USERS_FILE}")
+        print_stats(UserTimelines.load(args.output))
+    else:
+        print_stats(UserTimelines.load(args.input))
+
+
+if __name__ == "__main__":
+    main()